@@ -0,0 +1,91 @@
+"""
+Micro-benchmark: chapter list extraction with per-node parsel selectors vs
+the single-pass extractor in manga_scraper.spiders.common.chapter_list.
+
+    python -m benchmarks.chapter_list_benchmark                 # synthetic page
+    python -m benchmarks.chapter_list_benchmark saved/*.html    # saved manga pages
+    python -m benchmarks.chapter_list_benchmark --chapters 5000 --repeat 20
+"""
+
+import argparse
+import timeit
+from pathlib import Path
+
+from scrapy.http import HtmlResponse
+
+from manga_scraper.spiders.common.chapter_list import extract_chapter_list
+
+CHAPTER_TEMPLATE = (
+    '<div q:key="8t_8" class="flex items-center">'
+    '<a href="/title/12345-en-sample/{n}-chapter-{n}" class="link-hover">'
+    "Chapter {n}</a>"
+    '<span q:key="8t_1" class="opacity-80">: The {n}th title</span>'
+    '<time q:key="8t_2">{n} days ago</time>'
+    "</div>"
+)
+
+
+def synthetic_page(chapters):
+    """A manga page shaped like the live chapter list, newest chapter first."""
+    items = "".join(CHAPTER_TEMPLATE.format(n=n) for n in range(chapters, 0, -1))
+    return (
+        "<html><body><main>"
+        f'<div data-name="chapter-list">{items}</div>'
+        "</main></body></html>"
+    )
+
+
+def extract_with_selectors(response):
+    """The per-node parsel queries the spiders used before."""
+    chapters = []
+    for chapter in response.css("div[data-name='chapter-list'] [q\\:key='8t_8']"):
+        chapters.append(
+            (
+                chapter.css("a::attr(href)").get(),
+                chapter.css("a::text").get(),
+                chapter.css("span[q\\:key='8t_1']::text").get(),
+            )
+        )
+    return chapters
+
+
+def bench(name, html, repeat):
+    def fresh_response():
+        # A new response per run so parsing the HTML is included in both
+        return HtmlResponse(url="https://mangapark.io/title/1", body=html.encode())
+
+    expected = extract_with_selectors(fresh_response())
+    assert extract_chapter_list(fresh_response()) == expected, "results differ"
+
+    results = {}
+    for label, func in (
+        ("parsel selectors", extract_with_selectors),
+        ("single pass", extract_chapter_list),
+    ):
+        results[label] = min(
+            timeit.repeat(lambda: func(fresh_response()), number=1, repeat=repeat)
+        )
+
+    print(f"{name}: {len(expected)} chapters")
+    for label, seconds in results.items():
+        print(f"  {label:<17} {seconds * 1000:9.2f} ms")
+    speedup = results["parsel selectors"] / results["single pass"]
+    print(f"  speedup           {speedup:9.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("html", nargs="*", help="saved manga page HTML files")
+    parser.add_argument("--chapters", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.html:
+        for path in args.html:
+            bench(path, Path(path).read_text(encoding="utf-8"), args.repeat)
+    else:
+        bench("synthetic", synthetic_page(args.chapters), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
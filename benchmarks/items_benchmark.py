@@ -0,0 +1,143 @@
+"""
+Micro-benchmark: dict-backed scrapy.Item with an item_type tag and
+string/isinstance dispatch (the old items) vs the slotted dataclass items
+with type-keyed dispatch, on a synthetic stream of PageItems.
+
+    python -m benchmarks.items_benchmark                  # 1M pages
+    python -m benchmarks.items_benchmark --pages 200000
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+import scrapy
+
+from manga_scraper.items import (
+    ChapterItem,
+    ChapterPageLinkItem,
+    MangaChapterLinkItem,
+    MangaItem,
+    PageItem,
+    SearchKeywordMangaLinkItem,
+)
+
+
+class LegacyBaseItem(scrapy.Item):
+    item_type = scrapy.Field()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self["item_type"] = self.__class__.__name__
+
+
+class LegacyPageItem(LegacyBaseItem):
+    manga_id = scrapy.Field()
+    chapter_id = scrapy.Field()
+    page_id = scrapy.Field()
+    page_url = scrapy.Field()
+    page_number = scrapy.Field()
+    download_status = scrapy.Field()
+    file_path = scrapy.Field()
+    retry_count = scrapy.Field()
+
+
+LEGACY_ORDER = [
+    "SearchKeywordMangaLinkItem",
+    "MangaChapterLinkItem",
+    "ChapterPageLinkItem",
+    "MangaItem",
+    "ChapterItem",
+    "LegacyPageItem",
+]
+
+
+def make_pages(item_cls, count):
+    return [
+        item_cls(
+            manga_id="12345",
+            chapter_id=str(n // 40),
+            page_number=n % 40 + 1,
+            page_url=f"https://s01.mpqsc.org/media/mpup/{n}.webp",
+        )
+        for n in range(count)
+    ]
+
+
+def legacy_dispatch(items):
+    # The old pipelines: an item_type string compared down an if/elif chain
+    handled = 0
+    for item in items:
+        item_type = item["item_type"]
+        for name in LEGACY_ORDER:
+            if item_type == name:
+                handled += 1
+                break
+    return handled
+
+
+def typed_dispatch(items):
+    handlers = dict.fromkeys(
+        [
+            SearchKeywordMangaLinkItem,
+            MangaChapterLinkItem,
+            ChapterPageLinkItem,
+            MangaItem,
+            ChapterItem,
+            PageItem,
+        ],
+        True,
+    )
+    handled = 0
+    for item in items:
+        if handlers.get(type(item)):
+            handled += 1
+    return handled
+
+
+def measure(label, item_cls, dispatch, count):
+    # Allocation per item, traced on a sample (tracemalloc slows building)
+    sample = min(count, 100_000)
+    gc.collect()
+    tracemalloc.start()
+    items = make_pages(item_cls, sample)
+    allocated = tracemalloc.get_traced_memory()[0] / sample
+    tracemalloc.stop()
+    del items
+
+    gc.collect()
+    started = time.perf_counter()
+    items = make_pages(item_cls, count)
+    build_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    assert dispatch(items) == count
+    dispatch_seconds = time.perf_counter() - started
+
+    print(
+        f"  {label:<24} {allocated:6.0f} B/item"
+        f" {build_seconds:7.2f} s build {dispatch_seconds:7.2f} s dispatch"
+    )
+    return allocated, build_seconds, dispatch_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    print(f"{args.pages} PageItems")
+    legacy = measure(
+        "scrapy.Item + item_type", LegacyPageItem, legacy_dispatch, args.pages
+    )
+    slotted = measure("slotted dataclass", PageItem, typed_dispatch, args.pages)
+    print(
+        f"  memory {legacy[0] / slotted[0]:.1f}x less,"
+        f" build {legacy[1] / slotted[1]:.1f}x faster,"
+        f" dispatch {legacy[2] / slotted[2]:.1f}x faster"
+    )
+
+
+if __name__ == "__main__":
+    main()
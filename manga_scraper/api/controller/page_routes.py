@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 from manga_scraper.api.controller.auth_routes import get_current_user
 from manga_scraper.api.database import SessionLocal
 from manga_scraper.api.models import Page, User
+from manga_scraper.utils.image_store import read_page_image
 
 # Create a router for page routes
 page_router = APIRouter()
@@ -28,3 +31,29 @@ def get_pages_for_chapter(
 ):
     """Get all pages for a chapter in a manga. Login required."""
     return db.query(Page).filter(Page.chapter_id == chapter_id).all()
+
+
+@page_router.get(
+    "/{manga_id}/chapters/{chapter_id}/pages/{page_number}/image",
+)
+def get_page_image(
+    manga_id: str,
+    chapter_id: str,
+    page_number: int,
+    rendition: Literal["original", "webp", "thumbnail"] = "original",
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Serve a page image from the local store, re-fetching it if evicted. Login required."""
+    page = (
+        db.query(Page)
+        .filter(Page.chapter_id == chapter_id, Page.page_number == page_number)
+        .first()
+    )
+    if page is None:
+        raise HTTPException(status_code=404, detail="Page not found.")
+    try:
+        path = read_page_image(db, page, rendition)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return FileResponse(path)
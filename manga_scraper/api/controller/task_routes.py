@@ -1,11 +1,16 @@
+import json
+import tempfile
 from fastapi import APIRouter, HTTPException, Depends, Form
 from sqlalchemy.orm import Session
 from manga_scraper.utils.task_manager import (
-    start_async_scrapy_task,
+    dispatch_scrapy_task,
     get_task_status,
     stop_task,
     list_all_tasks,
+    list_failed_chapters,
+    resume_task,
 )
+from manga_scraper.utils.image_store import evict_to_quota, get_storage_status
 from manga_scraper.api.controller.auth_routes import get_current_user
 from manga_scraper.api.database import SessionLocal
 from manga_scraper.api.models import User
@@ -34,6 +39,11 @@ def dispatch_crawl_task(
     search_term: Optional[str] = Form(None),
     manga_id: Optional[str] = Form(None),
     chapter_ids: Optional[str] = Form(None),
+    incremental: bool = Form(False),
+    max_pages: Optional[int] = Form(None),
+    max_results: Optional[int] = Form(None),
+    distributed: bool = Form(False),
+    render_workers: int = Form(1),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
@@ -43,6 +53,14 @@ def dispatch_crawl_task(
     - `search_only`: search manga list only
     - `chapters_only`: get all chapters for a manga (no pages)
     - `chapters_select`: get selected chapters + pages
+
+    With `incremental`, chapters whose pages are already stored are skipped.
+    `max_pages` / `max_results` cap how many search result pages / mangas a
+    search mode crawls (defaults: SEARCH_MAX_PAGES / SEARCH_MAX_RESULTS).
+    With `distributed`, discovered chapters go to the shared chapter frontier
+    and `render_workers` frontier crawls are dispatched to render them; more
+    can be started on other nodes with
+    `scrapy crawl manga_park -a mode=frontier -a frontier_task=<task_id>`.
     """
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Only admins can dispatch tasks.")
@@ -66,12 +84,38 @@ def dispatch_crawl_task(
 
     if mode in ["search_all", "search_only"]:
         cmd += ["-a", f"search_term={search_term}"]
+        if max_pages:
+            cmd += ["-a", f"max_pages={max_pages}"]
+        if max_results:
+            cmd += ["-a", f"max_results={max_results}"]
     else:
         cmd += ["-a", f"manga_id={manga_id}"]
         if mode == "chapters_select":
             cmd += ["-a", f"chapter_ids={chapter_ids}"]
+    if incremental:
+        cmd += ["-a", "incremental=true"]
+    if distributed:
+        cmd += ["-a", "distributed=true"]
+
+    task_id = dispatch_scrapy_task(db, cmd)
 
-    task_id = start_async_scrapy_task(db, cmd)
+    render_task_ids = []
+    if distributed:
+        for _ in range(render_workers):
+            render_task_ids.append(
+                dispatch_scrapy_task(
+                    db,
+                    [
+                        "scrapy",
+                        "crawl",
+                        "manga_park",
+                        "-a",
+                        "mode=frontier",
+                        "-a",
+                        f"frontier_task={task_id}",
+                    ],
+                )
+            )
 
     response = {
         "status": "started",
@@ -79,12 +123,87 @@ def dispatch_crawl_task(
         "search_term": search_term,
         "manga_id": manga_id,
         "chapter_ids": chapter_ids.split(",") if chapter_ids else None,
+        "incremental": incremental,
+        "max_pages": max_pages,
+        "max_results": max_results,
+        "distributed": distributed,
+        "render_task_ids": render_task_ids,
         "task_id": task_id,
     }
 
     return response
 
 
+@task_router.post(
+    "/dispatch/bulk",
+)
+def dispatch_bulk_crawl_task(
+    mode: Literal["search_all", "search_only", "chapters_only"] = Form("search_all"),
+    search_terms: Optional[str] = Form(None),
+    manga_ids: Optional[str] = Form(None),
+    incremental: bool = Form(False),
+    max_pages: Optional[int] = Form(None),
+    max_results: Optional[int] = Form(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Crawl many search terms and/or manga ids in a single scrapy process,
+    sharing one browser, one DB connection and one dedup filter.
+
+    `search_terms` and `manga_ids` are newline-separated lists. Search terms
+    are crawled in the search modes; manga ids in `search_all` and
+    `chapters_only`.
+    """
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Only admins can dispatch tasks.")
+
+    terms = [t.strip() for t in (search_terms or "").splitlines() if t.strip()]
+    ids = [m.strip() for m in (manga_ids or "").splitlines() if m.strip()]
+    if mode == "search_only":
+        ids = []
+    elif mode == "chapters_only":
+        terms = []
+    if not terms and not ids:
+        raise HTTPException(
+            status_code=400, detail="Missing search_terms or manga_ids for bulk mode."
+        )
+
+    # Hand the lists over in a file; they can outgrow a command line. The
+    # spider deletes it once read and keeps the lists in its JOBDIR state
+    with tempfile.NamedTemporaryFile(
+        "w", suffix=".json", prefix="manga_batch_", delete=False, encoding="utf-8"
+    ) as f:
+        json.dump({"search_terms": terms, "manga_ids": ids}, f)
+
+    cmd = [
+        "scrapy",
+        "crawl",
+        "manga_park",
+        "-a",
+        f"mode={mode}",
+        "-a",
+        f"input_file={f.name}",
+    ]
+    if incremental:
+        cmd += ["-a", "incremental=true"]
+    if max_pages:
+        cmd += ["-a", f"max_pages={max_pages}"]
+    if max_results:
+        cmd += ["-a", f"max_results={max_results}"]
+
+    task_id = dispatch_scrapy_task(db, cmd)
+
+    return {
+        "status": "started",
+        "mode": mode,
+        "search_terms": terms,
+        "manga_ids": ids,
+        "incremental": incremental,
+        "task_id": task_id,
+    }
+
+
 @task_router.get(
     "/status/{task_id}",
 )
@@ -130,3 +249,111 @@ def stop_task_api(
             status_code=404, detail="Task not found or already finished."
         )
     return {"message": "Task terminated."}
+
+
+@task_router.post(
+    "/resume/{task_id}",
+)
+def resume_task_api(
+    task_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Continue a stopped or crashed task from its job directory, keeping its
+    request queue, seen requests and spider progress. Admins only.
+    """
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Only admins can resume tasks.")
+    if not resume_task(db, task_id):
+        raise HTTPException(
+            status_code=404, detail="Task not found, still running or not resumable."
+        )
+    return {"message": "Task resumed.", "task_id": task_id}
+
+
+@task_router.get(
+    "/dead_letters",
+)
+def list_dead_letters(
+    manga_id: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """List chapters whose render or parse failed. Admins only."""
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=403, detail="Only admins can list failed chapters."
+        )
+    return list_failed_chapters(db, manga_id)
+
+
+@task_router.post(
+    "/dead_letters/redispatch/{manga_id}",
+)
+def redispatch_dead_letters(
+    manga_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Re-crawl only the dead-lettered chapters of a manga in one
+    `chapters_select` task. Chapters leave the queue once they succeed.
+    """
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Only admins can dispatch tasks.")
+
+    chapter_ids = [f["chapter_id"] for f in list_failed_chapters(db, manga_id)]
+    if not chapter_ids:
+        raise HTTPException(
+            status_code=404, detail="No failed chapters for this manga."
+        )
+
+    cmd = [
+        "scrapy",
+        "crawl",
+        "manga_park",
+        "-a",
+        "mode=chapters_select",
+        "-a",
+        f"manga_id={manga_id}",
+        "-a",
+        f"chapter_ids={','.join(chapter_ids)}",
+    ]
+    task_id = dispatch_scrapy_task(db, cmd)
+
+    return {
+        "status": "started",
+        "mode": "chapters_select",
+        "manga_id": manga_id,
+        "chapter_ids": chapter_ids,
+        "task_id": task_id,
+    }
+
+
+@task_router.get(
+    "/storage",
+)
+def storage_status(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Image store usage, quota and hit/miss/evict counters. Admins only."""
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=403, detail="Only admins can view storage status."
+        )
+    return get_storage_status(db)
+
+
+@task_router.post(
+    "/storage/evict",
+)
+def evict_storage(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Evict least recently read chapters now if over quota. Admins only."""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Only admins can evict storage.")
+    return {"evicted": evict_to_quota(db)}
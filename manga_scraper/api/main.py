@@ -1,10 +1,16 @@
+import logging
+
 from fastapi import FastAPI
 from manga_scraper.api.controller.auth_routes import auth_router
 from manga_scraper.api.controller.task_routes import task_router
 from manga_scraper.api.controller.manga_routes import manga_router
 from manga_scraper.api.controller.chapter_routes import chapter_router
 from manga_scraper.api.controller.page_routes import page_router
-from manga_scraper.settings import VERSION
+from manga_scraper.api.database import SessionLocal
+from manga_scraper.settings import STORAGE_QUOTA_BYTES, VERSION
+from manga_scraper.utils.image_store import ensure_storage_tables, start_eviction_loop
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title="Manga Scraper API",
@@ -27,6 +33,17 @@ async def on_startup():
     print(
         f"INFO: API documentation available at http://127.0.0.1:8000/api/{VERSION}/docs"
     )
+    # Eviction and the storage status need these even before any crawl ran
+    db = SessionLocal()
+    try:
+        ensure_storage_tables(db)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Could not create storage tables: {e}")
+    finally:
+        db.close()
+    if STORAGE_QUOTA_BYTES:
+        start_eviction_loop(SessionLocal)
 
 
 # Include routers for authentication and API endpoints
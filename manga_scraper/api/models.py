@@ -1,6 +1,7 @@
 import uuid
 from sqlalchemy import (
     UUID,
+    BigInteger,
     Boolean,
     Column,
     DateTime,
@@ -34,7 +35,7 @@ class Task(Base):
     cmd = Column(Text, nullable=False)  # Command line used to start task
     status = Column(
         String, nullable=False, default="running"
-    )  # running, finished, terminated, failed
+    )  # queued, running, finished, terminated, failed
     start_time = Column(
         DateTime(timezone=True), server_default=func.now()
     )  # Start timestamp
@@ -42,6 +43,7 @@ class Task(Base):
         DateTime(timezone=True), nullable=True
     )  # End timestamp (nullable until finished)
     pid = Column(Integer, nullable=True)  # Process ID of running task (optional)
+    spider_args = Column(Text, nullable=True)  # JSON spider arguments of worker jobs
     is_admin_only = Column(Boolean, default=True)  # Only admins can manage this task
 
 
@@ -64,6 +66,12 @@ class Chapter(Base):
     url = Column(String)
     order_index = Column(Float)
     total_pages = Column(Integer, default=0)
+    cbz_path = Column(String)  # Chapter archive, relative to PACKAGES_STORE
+    pdf_path = Column(String)  # Chapter PDF, relative to PACKAGES_STORE
+    # Last page read or write; NULL once evicted (LRU order of the image store)
+    last_accessed_at = Column(DateTime(timezone=True))
+    # Lease of a running crawl that uses the chapter's stored images
+    in_use_until = Column(DateTime(timezone=True))
 
 
 class Page(Base):
@@ -71,6 +79,45 @@ class Page(Base):
     chapter_id = Column(String, ForeignKey("chapters.id"), primary_key=True)
     page_number = Column(Integer, primary_key=True)
     url = Column(String)
+    file_path = Column(String)  # Downloaded image, relative to IMAGES_STORE
+    download_status = Column(String)  # completed, failed, evicted
+    content_hash = Column(String)  # SHA-256 of the image bytes
+    webp_path = Column(String)  # WebP rendition, relative to IMAGES_STORE
+    thumbnail_path = Column(String)  # Fixed-width WebP thumbnail
+    phash = Column(BigInteger)  # 64-bit dHash, for near-duplicate images
+    # Last read (or download) time; least recently read chapters are evicted
+    last_accessed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class FailedChapter(Base):
+    __tablename__ = "failed_chapters"
+    chapter_id = Column(String, primary_key=True)
+    manga_id = Column(String, index=True)
+    url = Column(String)
+    error_class = Column(String)  # Exception class name, e.g. TimeoutError
+    last_error = Column(Text)
+    attempts = Column(Integer, default=1)  # Failures recorded so far
+    first_error_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_error_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class ChapterFrontier(Base):
+    __tablename__ = "chapter_frontier"
+    chapter_id = Column(String, primary_key=True)
+    manga_id = Column(String)
+    url = Column(String)
+    task_id = Column(String, index=True)  # Task that discovered the chapter
+    status = Column(String, default="pending")  # pending, claimed, done, failed
+    claimed_by = Column(String)  # host:pid:crawl of the render worker
+    lease_expires_at = Column(DateTime(timezone=True))
+    attempts = Column(Integer, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class StorageCounter(Base):
+    __tablename__ = "storage_counters"
+    name = Column(String, primary_key=True)  # hits, misses, evicted_pages, ...
+    value = Column(BigInteger, default=0)
 
 
 class SearchKeyword(Base):
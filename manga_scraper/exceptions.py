@@ -0,0 +1,10 @@
+# manga_scraper/exceptions.py
+from scrapy.exceptions import IgnoreRequest
+
+
+class RenderRetryScheduled(IgnoreRequest):
+    """A timed-out render was handed to the retry/deferred lane.
+
+    The failed request itself is dropped (its errback still runs so the page
+    is released); a copy will be scheduled again later.
+    """
@@ -2,89 +2,112 @@
 #
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/items.html
+#
+# Items are slotted dataclasses: no per-instance dict and no type tag, which
+# matters for PageItem (one per page image). Scrapy handles them through
+# itemadapter; pipelines dispatch on type(item).
 
-import scrapy
+from dataclasses import dataclass
 from enum import Enum
+from typing import Optional
 
 
 class DownloadStatus(Enum):
     COMPLETED = "completed"
     FAILED = "failed"
+    EVICTED = "evicted"  # Removed from IMAGES_STORE, re-fetched when read
 
 
-class BaseItem(scrapy.Item):
-    """Base class for all items that automatically adds item_type"""
-
-    item_type = scrapy.Field()  # Explicitly declare the field
-
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self["item_type"] = self.__class__.__name__
+@dataclass(slots=True)
+class BaseItem:
+    """Base class for all items"""
 
 
+@dataclass(slots=True)
 class SearchKeywordMangaLinkItem(BaseItem):
-    keyword = scrapy.Field()
-    manga_id = scrapy.Field()
-    total_mangas = scrapy.Field()
+    keyword: Optional[str] = None
+    manga_id: Optional[str] = None
+    total_mangas: Optional[int] = None
 
 
+@dataclass(slots=True)
 class MangaItem(BaseItem):
     # Basic info
-    keyword = scrapy.Field()
-    manga_id = scrapy.Field()
-    manga_name = scrapy.Field()
-    manga_url = scrapy.Field()
-    manga_follows = scrapy.Field()
-    total_chapters = scrapy.Field()
+    keyword: Optional[str] = None
+    manga_id: Optional[str] = None
+    manga_name: Optional[str] = None
+    manga_url: Optional[str] = None
+    manga_follows: Optional[int] = None  # "1.2K" as scraped, int once cleaned
 
     # Download progress
-    total_chapters = scrapy.Field()
-    downloaded_chapters = scrapy.Field()
-    download_status = scrapy.Field()
+    total_chapters: Optional[int] = None
+    downloaded_chapters: Optional[int] = None
+    download_status: Optional[DownloadStatus] = None
 
 
+@dataclass(slots=True)
 class MangaChapterLinkItem(BaseItem):
-    manga_id = scrapy.Field()
-    chapter_id = scrapy.Field()
-    total_chapters = scrapy.Field()
+    manga_id: Optional[str] = None
+    chapter_id: Optional[str] = None
+    total_chapters: Optional[int] = None
 
 
+@dataclass(slots=True)
 class ChapterItem(BaseItem):
     # Basic info
-    manga_id = scrapy.Field()
-    chapter_id = scrapy.Field()
-    chapter_number_name = scrapy.Field()
-    chapter_text_name = scrapy.Field()
-    chapter_name = scrapy.Field()
-    chapter_url = scrapy.Field()
-    total_pages = scrapy.Field()
+    manga_id: Optional[str] = None
+    chapter_id: Optional[str] = None
+    chapter_number_name: Optional[str] = None
+    chapter_text_name: Optional[str] = None
+    chapter_name: Optional[str] = None
+    chapter_url: Optional[str] = None
 
     # Download progress
-    chapter_number = scrapy.Field()
-    total_pages = scrapy.Field()
-    downloaded_pages = scrapy.Field()
-    download_status = scrapy.Field()
-    pdf_path = scrapy.Field()
+    chapter_number: Optional[float] = None
+    total_pages: Optional[int] = None
+    downloaded_pages: Optional[int] = None
+    download_status: Optional[DownloadStatus] = None
+    pdf_path: Optional[str] = None
 
 
+@dataclass(slots=True)
 class ChapterPageLinkItem(BaseItem):
-    manga_id = scrapy.Field()
-    chapter_id = scrapy.Field()
-    page_id = scrapy.Field()
-    total_pages = scrapy.Field()
+    manga_id: Optional[str] = None
+    chapter_id: Optional[str] = None
+    page_id: Optional[str] = None
+    total_pages: Optional[int] = None
+    # Chapter archives, relative to PACKAGES_STORE (set once packaged)
+    cbz_path: Optional[str] = None
+    pdf_path: Optional[str] = None
+
+
+@dataclass(slots=True)
+class FailedChapterItem(BaseItem):
+    """A chapter whose render or parse failed (stored in failed_chapters)"""
+
+    manga_id: Optional[str] = None
+    chapter_id: Optional[str] = None
+    chapter_url: Optional[str] = None
+    error_class: Optional[str] = None
+    error_message: Optional[str] = None
 
 
+@dataclass(slots=True)
 class PageItem(BaseItem):
     # Basic info
-    manga_id = scrapy.Field()
-    chapter_id = scrapy.Field()
-    page_id = scrapy.Field()
-    page_url = scrapy.Field()
+    manga_id: Optional[str] = None
+    chapter_id: Optional[str] = None
+    page_id: Optional[str] = None
+    page_url: Optional[str] = None
 
     # Download progress
-    page_number = scrapy.Field()
-    download_status = scrapy.Field()
-    file_path = scrapy.Field()
+    page_number: Optional[int] = None
+    download_status: Optional[DownloadStatus] = None
+    file_path: Optional[str] = None  # Relative to IMAGES_STORE
+    content_hash: Optional[str] = None  # SHA-256 of the image bytes
+    phash: Optional[int] = None  # 64-bit dHash (signed), for near-duplicates
+    webp_path: Optional[str] = None  # WebP rendition, relative to IMAGES_STORE
+    thumbnail_path: Optional[str] = None  # Fixed-width thumbnail, same store
 
     # For retry/failure handling
-    retry_count = scrapy.Field()
+    retry_count: Optional[int] = None
@@ -3,12 +3,38 @@
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
+import asyncio
+import logging
+import os
+import pickle
+from collections import defaultdict, deque
+from contextlib import suppress
 from urllib.parse import urlparse
-from scrapy import signals
+from scrapy import Request, signals
+from scrapy.exceptions import DontCloseSpider, NotConfigured
+from scrapy.utils.defer import deferred_from_coro
+from scrapy.utils.request import request_from_dict
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from twisted.internet import defer, task, threads
 
 # useful for handling different item types with a single interface
 from itemadapter import ItemAdapter
 
+from manga_scraper.utils.asset_cache import AssetCache, make_route_handler
+from manga_scraper.utils.browser_memory import browser_rss
+from manga_scraper.utils.db import connect, fetch_complete_chapter_ids
+from manga_scraper.utils.frontier import ChapterFrontier, frontier_worker_id
+from manga_scraper.utils.page_pool import DEFAULT_CONTEXT_NAME, PagePool
+from manga_scraper.utils.playwright_config import (
+    get_chapter_page_meta,
+    set_render_timeout,
+)
+from manga_scraper.exceptions import RenderRetryScheduled
+from manga_scraper.items import ChapterItem, ChapterPageLinkItem, FailedChapterItem
+from manga_scraper.pipelines.postgres_pipeline import PostgreSQLPipeline
+
+logger = logging.getLogger(__name__)
+
 
 class MangaScraperSpiderMiddleware:
     # Not all methods need to be defined. If a method is not defined,
@@ -99,3 +125,979 @@ class MangaScraperDownloaderMiddleware:
 
     def spider_opened(self, spider):
         spider.logger.info("Spider opened: %s" % spider.name)
+
+
+class DeltaCrawlMiddleware:
+    """
+    Drop chapter requests for chapters that are already fully stored.
+
+    Only active for spiders started with ``incremental=true``. The set of
+    complete chapter ids for the target mangas (and for the mangas previously
+    found for the search keywords) is loaded once, in a thread, when the
+    spider opens.
+    """
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self.complete_chapter_ids = set()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        mw = cls(crawler)
+        crawler.signals.connect(mw.spider_opened, signal=signals.spider_opened)
+        return mw
+
+    def spider_opened(self, spider):
+        if not getattr(spider, "incremental", False):
+            return None
+        # The crawl starts once the ids are loaded
+        d = threads.deferToThread(
+            self._load_complete_chapters, spider.manga_ids, spider.search_terms
+        )
+        return d.addCallback(self._complete_chapters_loaded)
+
+    def _load_complete_chapters(self, manga_ids, search_terms):
+        complete = set()
+        conn = connect(self.crawler.settings)
+        try:
+            for manga_id in manga_ids:
+                complete |= fetch_complete_chapter_ids(conn, manga_id=manga_id)
+            for keyword in search_terms:
+                complete |= fetch_complete_chapter_ids(conn, keyword=keyword)
+        finally:
+            conn.close()
+        return complete
+
+    def _complete_chapters_loaded(self, complete):
+        self.complete_chapter_ids = complete
+        self.crawler.stats.set_value(
+            "delta/complete_chapters_loaded", len(self.complete_chapter_ids)
+        )
+        logger.info(
+            f"Incremental mode: {len(self.complete_chapter_ids)} chapters already stored"
+        )
+
+    def process_spider_output(self, response, result, spider):
+        for i in result:
+            if (
+                isinstance(i, Request)
+                and i.meta.get("chapter_id") in self.complete_chapter_ids
+            ):
+                self.crawler.stats.inc_value("delta/renders_avoided")
+                continue
+            yield i
+
+    async def process_spider_output_async(self, response, result, spider):
+        async for i in result:
+            if (
+                isinstance(i, Request)
+                and i.meta.get("chapter_id") in self.complete_chapter_ids
+            ):
+                self.crawler.stats.inc_value("delta/renders_avoided")
+                continue
+            yield i
+
+
+class FrontierMiddleware:
+    """
+    Spread chapter renders over any number of processes via chapter_frontier.
+
+    Producers (``distributed=true``) queue the chapter requests they
+    discover under their ``task_id`` instead of rendering them. A chapter
+    is only queued once its ChapterItem has been through the pipelines and
+    the Postgres writer has committed it, so consumers never store pages
+    of a chapter row that does not exist yet.
+
+    Consumers (``mode=frontier``, ``frontier_task=<task id>``) claim
+    FRONTIER_BATCH_SIZE chapters when they start and top up to that size
+    whenever fewer than FRONTIER_LOW_WATER are in flight. They keep their
+    leases alive while rendering and mark chapters done/failed from the
+    items they produce, once the rows of those items are committed; a
+    chapter whose rows could not be written stays claimed and returns to
+    the queue when its lease runs out. A consumer exits once the producer
+    has finished and nothing is left to claim.
+
+    All chapter_frontier queries run in a thread, off the reactor.
+    """
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        settings = crawler.settings
+        self.batch_size = settings.getint("FRONTIER_BATCH_SIZE", 16)
+        self.low_water = min(settings.getint("FRONTIER_LOW_WATER", 4), self.batch_size)
+        self.lease = settings.getint("FRONTIER_LEASE_SECONDS", 600)
+        self.flush_interval = settings.getfloat("POSTGRESQL_FLUSH_INTERVAL", 5.0)
+        self.frontier = None
+        self.task_id = None
+        self.consumer = False
+        # Consumer: claimed chapters not finished yet
+        self.in_flight = set()
+        self.claiming = None
+        self.drained = False
+        # Producer: chapter_id -> (manga_id, chapter_id, url), until queued
+        self.unstored = {}
+        self.stored = {}
+        self.scraped_chapter_ids = set()
+        self.queue_loop = None
+        self.queuing = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        mw = cls(crawler)
+        crawler.signals.connect(mw.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(mw.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(mw.spider_idle, signal=signals.spider_idle)
+        crawler.signals.connect(mw.item_scraped, signal=signals.item_scraped)
+        return mw
+
+    def spider_opened(self, spider):
+        self.consumer = getattr(spider, "mode", None) == "frontier"
+        if self.consumer:
+            self.task_id = spider.frontier_task
+        elif getattr(spider, "distributed", False):
+            self.task_id = spider.task_id
+        if not self.task_id:
+            return None
+        d = threads.deferToThread(
+            lambda: ChapterFrontier(
+                connect(self.crawler.settings), frontier_worker_id(), lease=self.lease
+            )
+        )
+        return d.addCallback(self._start_frontier)
+
+    def _start_frontier(self, frontier):
+        self.frontier = frontier
+        if self.consumer:
+            self.renew_loop = task.LoopingCall(self._renew)
+            self.renew_loop.start(self.lease / 3, now=False)
+        else:
+            self.queue_loop = task.LoopingCall(self._queue_stored)
+            self.queue_loop.start(self.flush_interval, now=False)
+        logger.info(
+            f"Frontier {'consumer' if self.consumer else 'producer'} for task "
+            f"{self.task_id} ({self.frontier.worker_id})"
+        )
+
+    def spider_closed(self, spider):
+        if self.frontier is None:
+            return None
+        d = defer.succeed(None)
+        if self.consumer:
+            self.renew_loop.stop()
+        else:
+            self.queue_loop.stop()
+            if self.queuing is not None:
+                # Let a queueing round that is still running finish first
+                d = defer.DeferredList([self.queuing])
+        return d.addCallback(lambda _: threads.deferToThread(self._close_frontier))
+
+    def _close_frontier(self):
+        if self.consumer:
+            released = self.frontier.release()
+            if released:
+                logger.info(f"Returned {released} unfinished chapters to the frontier")
+        else:
+            # The item pipelines are closed (and flushed) by now
+            if self.stored:
+                self.frontier.add(self.task_id, list(self.stored.values()))
+                self.crawler.stats.inc_value("frontier/queued", len(self.stored))
+            if self.unstored:
+                self.crawler.stats.inc_value("frontier/unstored", len(self.unstored))
+                logger.warning(
+                    f"{len(self.unstored)} chapters were not queued: "
+                    "their chapter rows were never stored"
+                )
+        self.frontier.close()
+
+    def _renew(self):
+        d = threads.deferToThread(self.frontier.renew)
+        d.addErrback(
+            lambda f: logger.error(
+                f"Frontier lease renewal failed: {f.getErrorMessage()}"
+            )
+        )
+        return d
+
+    def spider_idle(self, spider):
+        if self.frontier is None or not self.consumer:
+            return
+        if self.claiming is None:
+            self._claim(spider)
+        if not self.drained:
+            # Claimed chapters are on their way, more may still arrive, or
+            # expired leases come back
+            raise DontCloseSpider
+
+    def _claim(self, spider):
+        self.claiming = threads.deferToThread(
+            self._claim_batch, self.batch_size - len(self.in_flight)
+        )
+        self.claiming.addCallback(self._crawl_claimed, spider)
+        self.claiming.addErrback(
+            lambda f: logger.error(f"Frontier claim failed: {f.getErrorMessage()}")
+        )
+        self.claiming.addBoth(lambda _: setattr(self, "claiming", None))
+
+    def _claim_batch(self, limit):
+        """(claimed chapters, whether the frontier is done); runs in a thread."""
+        claimed = self.frontier.claim(self.task_id, limit) if limit > 0 else []
+        drained = (
+            not claimed
+            and not self.frontier.producer_running(self.task_id)
+            and self.frontier.is_drained(self.task_id)
+        )
+        return claimed, drained
+
+    def _crawl_claimed(self, result, spider):
+        claimed, self.drained = result
+        for chapter_id, manga_id, url in claimed:
+            self.in_flight.add(chapter_id)
+            self.crawler.engine.crawl(
+                Request(
+                    url,
+                    callback=spider.parse_chapter_page,
+                    errback=spider.errback_chapter_page,
+                    meta=get_chapter_page_meta(
+                        manga_id=manga_id,
+                        chapter_id=chapter_id,
+                        render=not self.crawler.settings.getbool(
+                            "CHAPTER_HTTP_FAST_PATH"
+                        ),
+                        settings=self.crawler.settings,
+                    ),
+                    dont_filter=True,
+                )
+            )
+        self.crawler.stats.inc_value("frontier/claimed", len(claimed))
+
+    def item_scraped(self, item, spider):
+        if self.frontier is None:
+            return None
+        if not self.consumer:
+            if isinstance(item, ChapterItem):
+                self._chapter_stored(item.chapter_id)
+            return None
+
+        if isinstance(item, ChapterPageLinkItem):
+            status = "done"
+        elif isinstance(item, FailedChapterItem):
+            status = "failed"
+        else:
+            return None
+        if item.chapter_id not in self.in_flight:
+            return None
+        self.in_flight.discard(item.chapter_id)
+        self.crawler.stats.inc_value(f"frontier/{status}")
+        if len(self.in_flight) < self.low_water and self.claiming is None:
+            self._claim(spider)
+        # Commit the chapter's buffered rows first: a chapter marked done is
+        # never claimed again, even if this worker dies before its next flush
+        d = self._sync_postgres()
+        d.addCallback(
+            lambda _: threads.deferToThread(
+                self.frontier.finish, item.chapter_id, status
+            )
+        )
+        d.addErrback(
+            lambda f: logger.error(
+                f"Chapter {item.chapter_id} left claimed in the frontier: "
+                f"{f.getErrorMessage()}"
+            )
+        )
+        return d
+
+    def _chapter_stored(self, chapter_id):
+        """A ChapterItem left the pipelines (buffered or written)."""
+        chapter = self.unstored.pop(chapter_id, None)
+        if chapter is None:
+            # The item can get through before its request reaches us
+            self.scraped_chapter_ids.add(chapter_id)
+            return
+        self.stored[chapter_id] = chapter
+
+    def _queue_stored(self):
+        """Commit the buffered chapter rows, then queue their chapters."""
+        if not self.stored:
+            return None
+        chapters = list(self.stored.values())
+        self.stored = {}
+        d = self._sync_postgres()
+        d.addCallback(
+            lambda _: threads.deferToThread(self.frontier.add, self.task_id, chapters)
+        )
+        d.addCallbacks(
+            lambda _: self.crawler.stats.inc_value("frontier/queued", len(chapters)),
+            lambda f: self._queue_failed(f, chapters),
+        )
+        d.addBoth(lambda _: setattr(self, "queuing", None))
+        self.queuing = d
+        return d
+
+    def _queue_failed(self, failure, chapters):
+        self.crawler.stats.inc_value("frontier/unstored", len(chapters))
+        logger.error(
+            f"{len(chapters)} chapters not queued in the frontier: "
+            f"{failure.getErrorMessage()}"
+        )
+
+    def _sync_postgres(self):
+        for pipeline in self.crawler.engine.scraper.itemproc.middlewares:
+            if isinstance(pipeline, PostgreSQLPipeline):
+                return pipeline.sync()
+        return defer.succeed(None)
+
+    def _collect_chapter(self, request):
+        chapter_id = request.meta["chapter_id"]
+        chapter = (request.meta["manga_id"], chapter_id, request.url)
+        if chapter_id in self.scraped_chapter_ids:
+            self.scraped_chapter_ids.discard(chapter_id)
+            self.stored[chapter_id] = chapter
+        else:
+            self.unstored[chapter_id] = chapter
+
+    def _is_chapter_request(self, i, spider):
+        return (
+            isinstance(i, Request)
+            and "chapter_id" in i.meta
+            and i.callback == spider.parse_chapter_page
+        )
+
+    def process_spider_output(self, response, result, spider):
+        if self.frontier is None or self.consumer:
+            yield from result
+            return
+        for i in result:
+            if self._is_chapter_request(i, spider):
+                self._collect_chapter(i)
+                continue
+            yield i
+
+    async def process_spider_output_async(self, response, result, spider):
+        if self.frontier is None or self.consumer:
+            async for i in result:
+                yield i
+            return
+        async for i in result:
+            if self._is_chapter_request(i, spider):
+                self._collect_chapter(i)
+                continue
+            yield i
+
+
+class PagePoolMiddleware:
+    """
+    Hand warm pages from the spider's PagePool to chapter renders.
+
+    Applies to Playwright requests that keep their page
+    (``playwright_include_page``); the spider callback or errback is
+    responsible for handing the page back (see ``release_page``).
+    """
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        self.pool = PagePool(
+            crawler.stats,
+            max_pages=settings.getint("PLAYWRIGHT_MAX_PAGES_PER_CONTEXT")
+            or settings.getint("CONCURRENT_REQUESTS"),
+            max_uses=settings.getint("PLAYWRIGHT_PAGE_MAX_USES", 50),
+        )
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        mw = cls(crawler)
+        crawler.signals.connect(mw.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(mw.spider_closed, signal=signals.spider_closed)
+        return mw
+
+    def spider_opened(self, spider):
+        spider.page_pool = self.pool
+
+    def spider_closed(self, spider):
+        return deferred_from_coro(self.pool.close())
+
+    async def process_request(self, request, spider):
+        meta = request.meta
+        if (
+            not meta.get("playwright")
+            or not meta.get("playwright_include_page")
+            or meta.get("playwright_page") is not None
+        ):
+            return None
+
+        page = await self.pool.acquire(
+            meta.get("playwright_context", DEFAULT_CONTEXT_NAME)
+        )
+        if page is None:
+            meta["page_pool_reserved"] = True
+        else:
+            meta["playwright_page"] = page
+        return None
+
+    def process_response(self, request, response, spider):
+        self._track(request)
+        return response
+
+    def process_exception(self, request, exception, spider):
+        if not self._track(request) and request.meta.pop("page_pool_reserved", False):
+            self.pool.cancel(
+                request.meta.get("playwright_context", DEFAULT_CONTEXT_NAME)
+            )
+        return None
+
+    def _track(self, request):
+        page = request.meta.get("playwright_page")
+        if page is None:
+            return False
+        self.pool.track(
+            page, request.meta.get("playwright_context", DEFAULT_CONTEXT_NAME)
+        )
+        return True
+
+
+class BrowserMemoryGovernorMiddleware:
+    """
+    Bound Chromium memory by recycling browser contexts and the browser.
+
+    Playwright requests are assigned to a numbered context
+    (``chapters-<n>``). Once that context has served
+    BROWSER_CONTEXT_MAX_PAGES renders, or browser RSS passes
+    BROWSER_MAX_RSS_MB, new requests move to a fresh context and the old
+    one is closed as soon as its in-flight requests finish. Past
+    BROWSER_RESTART_RSS_MB new renders are held until nothing is in flight,
+    then the browser is closed and scrapy-playwright relaunches it.
+    """
+
+    context_prefix = "chapters"
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.max_pages_served = settings.getint("BROWSER_CONTEXT_MAX_PAGES", 500)
+        self.max_rss = settings.getint("BROWSER_MAX_RSS_MB", 2048) * 1024 * 1024
+        self.restart_rss = settings.getint("BROWSER_RESTART_RSS_MB", 4096) * 1024 * 1024
+        self.check_interval = settings.getfloat("BROWSER_MEMORY_CHECK_INTERVAL", 30)
+
+        self.generation = 0
+        self.served = defaultdict(int)  # context name -> renders served
+        self.inflight = defaultdict(int)  # context name -> renders in flight
+        self.contexts = {}  # context name -> BrowserContext seen on a response
+        self.draining = set()
+        self.restart_done = None  # asyncio.Event while a restart is pending
+        self.restarting = False
+        self.check_loop = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        mw = cls(crawler)
+        crawler.signals.connect(mw.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(mw.spider_closed, signal=signals.spider_closed)
+        return mw
+
+    @property
+    def context_name(self):
+        return f"{self.context_prefix}-{self.generation}"
+
+    def spider_opened(self, spider):
+        self.check_loop = task.LoopingCall(self.check_memory)
+        self.check_loop.start(self.check_interval, now=False)
+
+    def spider_closed(self, spider):
+        if self.check_loop and self.check_loop.running:
+            self.check_loop.stop()
+
+    async def process_request(self, request, spider):
+        meta = request.meta
+        if not meta.get("playwright"):
+            return None
+
+        if self.restart_done is not None:
+            await self.restart_done.wait()
+
+        page = meta.get("playwright_page")
+        if page is not None and page.is_closed():
+            # e.g. a retry of a request whose context has been recycled
+            meta.pop("playwright_page")
+            page = None
+        if page is None:
+            meta["playwright_context"] = self.context_name
+
+        context_name = meta.get("playwright_context", self.context_name)
+        meta["governor_context"] = context_name
+        self.inflight[context_name] += 1
+        return None
+
+    def process_response(self, request, response, spider):
+        context_name = self._finish(request)
+        if context_name is not None:
+            self.served[context_name] += 1
+            self.stats.inc_value("browser/pages_served")
+            if (
+                context_name == self.context_name
+                and self.served[context_name] >= self.max_pages_served
+            ):
+                self.recycle_context(f"served {self.served[context_name]} pages")
+            self._maybe_close(context_name)
+        return response
+
+    def process_exception(self, request, exception, spider):
+        context_name = self._finish(request)
+        if context_name is not None:
+            self._maybe_close(context_name)
+        return None
+
+    def _finish(self, request):
+        context_name = request.meta.pop("governor_context", None)
+        if context_name is None:
+            return None
+        self.inflight[context_name] -= 1
+        page = request.meta.get("playwright_page")
+        if page is not None and not page.is_closed():
+            self.contexts[context_name] = page.context
+        return context_name
+
+    def check_memory(self):
+        rss = browser_rss()
+        self.stats.set_value("browser/rss_mb", rss // (1024 * 1024))
+        self.stats.max_value("browser/rss_mb_max", rss // (1024 * 1024))
+
+        if rss >= self.restart_rss and self.restart_done is None:
+            logger.info(
+                f"Browser RSS {rss // (1024 * 1024)} MB over restart threshold, "
+                "holding new renders until in-flight ones finish"
+            )
+            self.restart_done = asyncio.Event()
+            self.recycle_context("browser restart")
+            self._maybe_restart()
+        elif rss >= self.max_rss and self.served[self.context_name]:
+            self.recycle_context(f"browser RSS {rss // (1024 * 1024)} MB")
+
+    def recycle_context(self, reason):
+        old_name = self.context_name
+        self.generation += 1
+        self.draining.add(old_name)
+        self.stats.inc_value("browser/context_recycles")
+        logger.info(
+            f"Recycling context {old_name} ({reason}), new renders use {self.context_name}"
+        )
+        self._maybe_close(old_name)
+
+    def _maybe_close(self, context_name):
+        if context_name in self.draining and self.inflight[context_name] <= 0:
+            self.draining.discard(context_name)
+            self.served.pop(context_name, None)
+            self.inflight.pop(context_name, None)
+            context = self.contexts.pop(context_name, None)
+            if context is not None:
+                deferred_from_coro(self._close_context(context_name, context))
+        self._maybe_restart()
+
+    async def _close_context(self, context_name, context):
+        rss_before = browser_rss()
+        with suppress(Exception):
+            await context.close()
+        self._log_reclaimed(f"context {context_name}", rss_before)
+
+    def _maybe_restart(self):
+        if (
+            self.restart_done is None
+            or self.restarting
+            or any(n > 0 for n in self.inflight.values())
+        ):
+            return
+        self.restarting = True
+        browser = next(
+            (c.browser for c in self.contexts.values() if c.browser is not None), None
+        )
+        deferred_from_coro(self._restart_browser(browser))
+
+    async def _restart_browser(self, browser):
+        rss_before = browser_rss()
+        self.contexts.clear()
+        self.draining.clear()
+        if browser is not None:
+            with suppress(Exception):
+                # scrapy-playwright relaunches it for the next render
+                await browser.close()
+        self.stats.inc_value("browser/restarts")
+        self._log_reclaimed("browser restart", rss_before)
+        self.restarting = False
+        restart_done, self.restart_done = self.restart_done, None
+        restart_done.set()
+
+    def _log_reclaimed(self, what, rss_before):
+        reclaimed = max(0, rss_before - browser_rss()) // (1024 * 1024)
+        self.stats.inc_value("browser/reclaimed_mb", reclaimed)
+        logger.info(f"Closed {what}, reclaimed {reclaimed} MB of browser memory")
+
+
+class AssetCacheMiddleware:
+    """
+    Serve repeat JS/JSON bundles of Playwright renders from a local cache.
+
+    Installs a route on each rendered page (through
+    ``playwright_page_init_callback``) backed by an AssetCache, and aborts
+    requests to PLAYWRIGHT_BLOCKED_DOMAINS. Bytes served from the cache and
+    the render-time difference between renders with and without cache hits
+    are recorded in the crawl stats.
+    """
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        self.stats = crawler.stats
+        self.cache = AssetCache(
+            settings.get("ASSET_CACHE_DIR", ".asset_cache"),
+            max_bytes=settings.getint("ASSET_CACHE_MAX_BYTES", 200 * 1024 * 1024),
+            ttl=settings.getint("ASSET_CACHE_TTL", 86400),
+        )
+        self.blocked_domains = settings.getlist("PLAYWRIGHT_BLOCKED_DOMAINS")
+        # [total seconds, renders] for renders with / without cache hits
+        self.render_times = {True: [0.0, 0], False: [0.0, 0]}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        mw = cls(crawler)
+        crawler.signals.connect(mw.spider_closed, signal=signals.spider_closed)
+        return mw
+
+    def spider_closed(self, spider):
+        # Waits for the index lock if another crawl is saving
+        return threads.deferToThread(self.cache.save)
+
+    async def init_page(self, page, request):
+        await page.route(
+            "**",
+            make_route_handler(
+                self.cache, self.blocked_domains, self.stats, request.meta
+            ),
+        )
+
+    def process_request(self, request, spider):
+        if request.meta.get("playwright"):
+            request.meta["asset_cache_bytes"] = 0
+            request.meta.setdefault("playwright_page_init_callback", self.init_page)
+        return None
+
+    def process_response(self, request, response, spider):
+        latency = request.meta.get("download_latency")
+        if not request.meta.get("playwright") or latency is None:
+            return response
+
+        cached_bytes = request.meta.get("asset_cache_bytes", 0)
+        totals = self.render_times[cached_bytes > 0]
+        totals[0] += latency
+        totals[1] += 1
+        spider.logger.debug(
+            f"Rendered {request.url} in {latency:.2f}s, "
+            f"{cached_bytes // 1024} KB from asset cache"
+        )
+
+        (hit_time, hits), (miss_time, misses) = (
+            self.render_times[True],
+            self.render_times[False],
+        )
+        if hits and misses:
+            self.stats.set_value(
+                "asset_cache/render_time_reduction_avg",
+                round(miss_time / misses - hit_time / hits, 3),
+            )
+        return response
+
+
+class AdaptiveThrottleMiddleware:
+    """
+    Adjust concurrency and delay per download slot, separately per lane.
+
+    Plain HTTP fetches and Playwright renders of a host get their own slot
+    (``<host>:http`` / ``<host>:render``), configured by
+    ADAPTIVE_THROTTLE_LANES. A 429/503 or a Cloudflare challenge halves the
+    slot's concurrency and doubles its delay (honouring Retry-After);
+    responses faster than the lane's target latency slowly raise
+    concurrency and shrink the delay again. Every change is logged.
+    """
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        if not settings.getbool("ADAPTIVE_THROTTLE_ENABLED"):
+            raise NotConfigured
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.lanes = settings.getdict("ADAPTIVE_THROTTLE_LANES")
+        self.successes = defaultdict(int)  # slot key -> fast responses in a row
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def process_request(self, request, spider):
+        if "download_slot" in request.meta:
+            return None  # Slot chosen elsewhere (e.g. the image downloads)
+
+        lane = "render" if request.meta.get("playwright") else "http"
+        key = f"{urlparse(request.url).hostname or ''}:{lane}"
+        request.meta["download_slot"] = key
+        request.meta["throttle_lane"] = lane
+
+        # Slots are created (and garbage collected) by the downloader, which
+        # takes their initial values from DOWNLOAD_SLOTS-style settings
+        per_slot_settings = self.crawler.engine.downloader.per_slot_settings
+        if key not in per_slot_settings:
+            config = self.lanes[lane]
+            per_slot_settings[key] = {
+                "concurrency": config["start_concurrency"],
+                "delay": config["start_delay"],
+            }
+        return None
+
+    def process_response(self, request, response, spider):
+        lane = request.meta.get("throttle_lane")
+        if lane is None:
+            return response
+
+        key = request.meta["download_slot"]
+        config = self.lanes[lane]
+        current = self.crawler.engine.downloader.per_slot_settings[key]
+        concurrency, delay = current["concurrency"], current["delay"]
+
+        if response.status in (429, 503) or self._is_challenge(response):
+            self.successes[key] = 0
+            concurrency = max(config.get("min_concurrency", 1), concurrency // 2)
+            delay = min(config["max_delay"], max(delay * 2, config["start_delay"], 0.5))
+            retry_after = response.headers.get("Retry-After", b"").decode()
+            if retry_after.isdigit():
+                delay = min(config["max_delay"], max(delay, float(retry_after)))
+            self.stats.inc_value(f"throttle/{lane}/backoffs")
+            self._apply(key, concurrency, delay, f"got {response.status}")
+            return response
+
+        latency = request.meta.get("download_latency")
+        if latency is None:
+            return response
+
+        if latency > 2 * config["target_latency"]:
+            self.successes[key] = 0
+            if concurrency > config.get("min_concurrency", 1):
+                self._apply(
+                    key, concurrency - 1, delay, f"latency {latency:.1f}s over target"
+                )
+        elif latency <= config["target_latency"]:
+            self.successes[key] += 1
+            # Additive increase once a full window of requests was fast
+            if self.successes[key] >= concurrency:
+                self.successes[key] = 0
+                self._apply(
+                    key,
+                    min(config["max_concurrency"], concurrency + 1),
+                    max(config.get("min_delay", 0), round(delay * 0.8, 3)),
+                    f"latency {latency:.1f}s under target",
+                )
+        return response
+
+    def _is_challenge(self, response):
+        if response.headers.get("cf-mitigated") == b"challenge":
+            return True
+        return response.status == 403 and b"challenge-platform" in response.body[:20000]
+
+    def _apply(self, key, concurrency, delay, reason):
+        downloader = self.crawler.engine.downloader
+        current = downloader.per_slot_settings[key]
+        if (concurrency, delay) == (current["concurrency"], current["delay"]):
+            return
+
+        logger.info(
+            f"Throttle {key}: concurrency {current['concurrency']} -> {concurrency}, "
+            f"delay {current['delay']}s -> {delay}s ({reason})"
+        )
+        current.update(concurrency=concurrency, delay=delay)
+        slot = downloader.slots.get(key)
+        if slot is not None:
+            slot.concurrency = concurrency
+            slot.delay = delay
+        lane = key.rpartition(":")[2]
+        self.stats.set_value(f"throttle/{lane}/concurrency", concurrency)
+        self.stats.set_value(f"throttle/{lane}/delay", delay)
+
+
+class RenderTimeoutMiddleware:
+    """
+    Derive render timeouts from recent render latencies and retry fast.
+
+    Each Playwright render gets a timeout of RENDER_TIMEOUT_MULTIPLIER times
+    the RENDER_TIMEOUT_PERCENTILE of the last RENDER_TIMEOUT_WINDOW
+    successful renders, clamped to [RENDER_TIMEOUT_MIN, RENDER_TIMEOUT_MAX]
+    (seconds). A timed-out render is retried up to RENDER_RETRY_TIMES with
+    exponential backoff; after that it joins a deferred lane that only runs,
+    with the maximum timeout, once the main crawl has gone idle.
+
+    Neither lane is part of the scheduler queue, so with a JOBDIR both are
+    saved to ``render_retries.pickle`` on close and restored on resume.
+    """
+
+    STATE_FILE = "render_retries.pickle"
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.latencies = deque(maxlen=settings.getint("RENDER_TIMEOUT_WINDOW", 50))
+        self.percentile = settings.getfloat("RENDER_TIMEOUT_PERCENTILE", 95)
+        self.multiplier = settings.getfloat("RENDER_TIMEOUT_MULTIPLIER", 3)
+        self.min_timeout = settings.getfloat("RENDER_TIMEOUT_MIN", 30)
+        self.max_timeout = settings.getfloat("RENDER_TIMEOUT_MAX", 600)
+        self.initial_timeout = settings.getfloat("RENDER_TIMEOUT_INITIAL", 120)
+        self.retry_times = settings.getint("RENDER_RETRY_TIMES", 2)
+        self.backoff_base = settings.getfloat("RENDER_RETRY_BACKOFF", 5)
+        self.retry_calls = {}  # id(request) -> (DelayedCall, request)
+        self.deferred = []
+        jobdir = settings.get("JOBDIR")
+        self.state_path = os.path.join(jobdir, self.STATE_FILE) if jobdir else None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        mw = cls(crawler)
+        crawler.signals.connect(mw.spider_idle, signal=signals.spider_idle)
+        crawler.signals.connect(mw.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(mw.spider_closed, signal=signals.spider_closed)
+        return mw
+
+    @property
+    def pending_retries(self):
+        return len(self.retry_calls)
+
+    @property
+    def timeout(self):
+        """Current render timeout in seconds."""
+        if len(self.latencies) < 10:
+            return self.initial_timeout
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return max(
+            self.min_timeout, min(self.max_timeout, ordered[index] * self.multiplier)
+        )
+
+    def process_request(self, request, spider):
+        if not request.meta.get("playwright"):
+            return None
+        if request.meta.get("render_deferred"):
+            timeout = self.max_timeout
+        else:
+            timeout = self.timeout
+        set_render_timeout(request.meta, timeout * 1000)
+        self.stats.set_value("render/timeout_s", round(self.timeout, 1))
+        return None
+
+    def process_response(self, request, response, spider):
+        latency = request.meta.get("download_latency")
+        if request.meta.get("playwright") and latency is not None:
+            self.latencies.append(latency)
+        return response
+
+    def process_exception(self, request, exception, spider):
+        if not request.meta.get("playwright") or not isinstance(
+            exception, PlaywrightTimeoutError
+        ):
+            return None
+        if request.meta.get("render_deferred"):
+            return None  # Out of chances; let the errback see the failure
+
+        attempts = request.meta.get("render_attempts", 0) + 1
+        retry = request.copy()
+        for key in ("playwright_page", "page_pool_reserved", "governor_context"):
+            retry.meta.pop(key, None)
+        retry.meta["render_attempts"] = attempts
+        retry.dont_filter = True
+
+        if attempts <= self.retry_times:
+            backoff = self.backoff_base * 2 ** (attempts - 1)
+            self.stats.inc_value("render/retries")
+            self._delay_retry(retry, backoff)
+            logger.info(f"Render of {request.url} timed out, retry in {backoff:.0f}s")
+        else:
+            retry.meta["render_deferred"] = True
+            self.deferred.append(retry)
+            self.stats.inc_value("render/deferred")
+            logger.info(f"Render of {request.url} timed out again, deferred")
+        raise RenderRetryScheduled(f"Render timed out after {attempts} attempt(s)")
+
+    def _delay_retry(self, request, delay):
+        from twisted.internet import reactor
+
+        call = reactor.callLater(delay, self._schedule_retry, request)
+        self.retry_calls[id(request)] = (call, request)
+
+    def _schedule_retry(self, request):
+        del self.retry_calls[id(request)]
+        self.crawler.engine.crawl(request)
+
+    def spider_opened(self, spider):
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+        with open(self.state_path, "rb") as f:
+            saved = pickle.load(f)
+        os.remove(self.state_path)
+        for data in saved["retries"]:
+            self._delay_retry(self._restore(data, spider), 0)
+        self.deferred.extend(self._restore(data, spider) for data in saved["deferred"])
+        logger.info(
+            f"Restored {len(saved['retries'])} render retries and "
+            f"{len(saved['deferred'])} deferred renders"
+        )
+
+    def spider_closed(self, spider):
+        retries = [request for call, request in self.retry_calls.values()]
+        for call, _ in self.retry_calls.values():
+            if call.active():
+                call.cancel()
+        self.retry_calls = {}
+        if not retries and not self.deferred:
+            return
+        if not self.state_path:
+            self.stats.inc_value(
+                "render/lost_on_close", len(retries) + len(self.deferred)
+            )
+            logger.warning(
+                f"{len(retries) + len(self.deferred)} render retries dropped "
+                "on close (no JOBDIR to keep them in)"
+            )
+            return
+        saved = {
+            "retries": [self._persistable(r, spider) for r in retries],
+            "deferred": [self._persistable(r, spider) for r in self.deferred],
+        }
+        with open(self.state_path, "wb") as f:
+            pickle.dump(saved, f)
+        logger.info(
+            f"Saved {len(retries)} render retries and {len(self.deferred)} "
+            f"deferred renders to {self.state_path}"
+        )
+
+    def _persistable(self, request, spider):
+        """Request dict without the render meta (pages, handlers, captures)."""
+        meta = {
+            key: request.meta[key]
+            for key in ("manga_id", "chapter_id", "render_attempts", "render_deferred")
+            if key in request.meta
+        }
+        return request.replace(meta=meta).to_dict(spider=spider)
+
+    def _restore(self, data, spider):
+        request = request_from_dict(data, spider=spider)
+        meta = get_chapter_page_meta(
+            manga_id=request.meta.get("manga_id"),
+            chapter_id=request.meta.get("chapter_id"),
+            settings=self.crawler.settings,
+        )
+        meta.update(request.meta)
+        return request.replace(meta=meta)
+
+    def spider_idle(self, spider):
+        if self.pending_retries:
+            raise DontCloseSpider
+        if self.deferred:
+            logger.info(
+                f"Main crawl done, running {len(self.deferred)} deferred renders"
+            )
+            for request in self.deferred:
+                self.crawler.engine.crawl(request)
+            self.deferred = []
+            raise DontCloseSpider
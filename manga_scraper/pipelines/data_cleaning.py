@@ -1,47 +1,36 @@
 # manga_scraper/pipelines/data_cleaning.py
 from urllib.parse import urljoin
-from manga_scraper.items import (
-    ChapterItem,
-    ChapterPageLinkItem,
-    MangaChapterLinkItem,
-    MangaItem,
-    PageItem,
-    SearchKeywordMangaLinkItem,
-)
+from manga_scraper.items import ChapterItem, MangaItem, PageItem
 from manga_scraper.settings import BASE_URL
 
 
 class MangaDataCleaningPipeline:
+    def __init__(self):
+        # Item type -> cleaner; link/count items pass through untouched
+        self.cleaners = {
+            MangaItem: self._clean_manga_data,
+            ChapterItem: self._clean_chapter_data,
+            PageItem: self._clean_image_data,
+        }
+
     def process_item(self, item, spider):
-        if isinstance(item, SearchKeywordMangaLinkItem):
-            return item
-        elif isinstance(item, MangaChapterLinkItem):
-            return item
-        elif isinstance(item, ChapterPageLinkItem):
-            return item
-        elif isinstance(item, MangaItem):
-            self._clean_manga_data(item)
-        elif isinstance(item, ChapterItem):
-            self._clean_chapter_data(item)
-        elif isinstance(item, PageItem):
-            self._clean_image_data(item)
+        cleaner = self.cleaners.get(type(item))
+        if cleaner is not None:
+            cleaner(item)
         return item
 
     def _clean_manga_data(self, item):
         """Clean and process manga data."""
-        item["manga_name"] = item["manga_name"].strip()
-        item["manga_url"] = self._get_full_url(item["manga_url"])
-        for field in [
-            "manga_follows",
-        ]:
-            if field in item:
-                item[field] = self._convert_numeric_string(item[field])
+        item.manga_name = item.manga_name.strip()
+        item.manga_url = self._get_full_url(item.manga_url)
+        if item.manga_follows is not None:
+            item.manga_follows = self._convert_numeric_string(item.manga_follows)
         return item
 
     def _clean_chapter_data(self, item):
         """Clean and process chapter data."""
-        item["chapter_name"] = self._generate_chapter_name(item)
-        item["chapter_url"] = self._get_full_url(item["chapter_url"])
+        item.chapter_name = self._generate_chapter_name(item)
+        item.chapter_url = self._get_full_url(item.chapter_url)
         return item
 
     def _clean_image_data(self, item):
@@ -78,8 +67,8 @@ class MangaDataCleaningPipeline:
 
     def _generate_chapter_name(self, item):
         """Combine chapter number and text to create full chapter name."""
-        number = item.get("chapter_number_name", "").strip()
-        text = item.get("chapter_text_name")
+        number = (item.chapter_number_name or "").strip()
+        text = item.chapter_text_name
         if text is None or not str(text).strip():
             return number
         return f"{number} {text.strip()}"
@@ -0,0 +1,406 @@
+# pipelines/image_download.py
+import asyncio
+import hashlib
+import logging
+import mimetypes
+import os
+import tempfile
+from urllib.parse import urlparse
+
+import psycopg2
+from scrapy import Request, signals
+from scrapy.exceptions import NotConfigured
+from scrapy.utils.defer import maybe_deferred_to_future
+from twisted.internet import task, threads
+
+from manga_scraper.items import DownloadStatus, PageItem
+from manga_scraper.utils.db import connect, lease_chapters
+from manga_scraper.utils.phash import BandIndex, dhash, same_image
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".gif", ".avif"}
+
+
+def content_path(digest, extension):
+    """Sharded, content-addressed path of an image, relative to IMAGES_STORE."""
+    return os.path.join(digest[:2], digest[2:4], f"{digest}{extension}")
+
+
+def image_extension(url, content_type=None):
+    """File extension of an image, from its URL or else its Content-Type."""
+    extension = os.path.splitext(urlparse(url).path)[1].lower()
+    if extension in IMAGE_EXTENSIONS:
+        return extension
+    content_type = (content_type or "").split(";")[0]
+    return mimetypes.guess_extension(content_type) or ".bin"
+
+
+class _ImageSink:
+    """Temp file + running SHA-256 for one download attempt."""
+
+    def __init__(self, tmp_dir):
+        fd, self.path = tempfile.mkstemp(dir=tmp_dir, suffix=".part")
+        self.file = os.fdopen(fd, "wb")
+        self.hash = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.file.write(data)
+        self.hash.update(data)
+        self.size += len(data)
+
+    def discard(self):
+        self.file.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class PageImageDownloadPipeline:
+    """
+    Download page images over plain HTTP into content-addressed storage.
+
+    Every PageItem's image is fetched with ``engine.download`` (Scrapy's HTTP
+    handler, not Playwright) in its own download slot. Body chunks are
+    also written to a temp file and hashed as they arrive
+    (``bytes_received``), so the image is not hashed or written out again
+    afterwards. Scrapy still buffers the whole body for the response, which
+    is dropped unread; image size is bounded by DOWNLOAD_MAXSIZE. The file
+    is then moved to ``IMAGES_STORE/ab/cd/<sha256>.<ext>``, or dropped if
+    that hash is already stored. The item leaves with ``file_path``, ``content_hash``
+    and ``download_status`` set, for the Postgres pipeline to store.
+
+    With IMAGES_DEDUP_ENABLED, stored images are also looked up by URL and
+    content hash in ``pages`` (both indexed), and by a perceptual hash
+    (``phash``) in an index loaded in a thread at start. A page whose URL is
+    already stored is not downloaded at all. A new image within
+    IMAGES_PHASH_DISTANCE bits of a stored one (scanlator credits, banners,
+    re-encoded covers) is linked to that file instead of being kept, but
+    only if both images also match pixel for pixel on a 64x64 greyscale
+    downscale, within IMAGES_PIXEL_TOLERANCE.
+
+    Every chapter whose stored images a page uses (its own, and the chapter
+    a deduplicated file comes from) is leased in ``chapters.in_use_until``
+    before the file is checked, and the leases are renewed while the crawl
+    runs, so image store eviction cannot delete files a crawl is linking,
+    rendering or packaging.
+    """
+
+    def __init__(
+        self,
+        crawler,
+        store,
+        slot,
+        concurrency,
+        phash_distance=None,
+        pixel_tolerance=0.5,
+        lease=0,
+    ):
+        self.crawler = crawler
+        self.store = store
+        self.slot = slot
+        self.concurrency = concurrency
+        self.tmp_dir = os.path.join(store, ".tmp")
+        # Lookups of stored pages and chapter leases (autocommit, in threads)
+        self.conn = None
+        # Chapter leases against eviction (0 disables)
+        self.lease = lease
+        self.leased = set()
+        self.lease_loop = None
+        # Images stored by this crawl, not flushed to pages yet:
+        # url / sha256 -> (content_hash, file_path, phash, chapter_id)
+        self.dedup = phash_distance is not None
+        self.pixel_tolerance = pixel_tolerance
+        self.known_urls = {}
+        self.known_hashes = {}
+        # phash -> content_hash of every stored image
+        self.phashes = BandIndex(phash_distance) if self.dedup else None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool("IMAGES_DOWNLOAD_ENABLED"):
+            raise NotConfigured
+        pipeline = cls(
+            crawler,
+            store=settings.get("IMAGES_STORE"),
+            slot=settings.get("IMAGES_DOWNLOAD_SLOT", "page-images"),
+            concurrency=settings.getint("IMAGES_CONCURRENCY", 32),
+            phash_distance=(
+                settings.getint("IMAGES_PHASH_DISTANCE", 3)
+                if settings.getbool("IMAGES_DEDUP_ENABLED")
+                else None
+            ),
+            pixel_tolerance=settings.getfloat("IMAGES_PIXEL_TOLERANCE", 0.5),
+            lease=settings.getint("STORAGE_CHAPTER_LEASE"),
+        )
+        crawler.signals.connect(pipeline.bytes_received, signal=signals.bytes_received)
+        return pipeline
+
+    def open_spider(self, spider):
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        # Image CDNs are not the site; give them their own, wider slot
+        self.crawler.engine.downloader.per_slot_settings[self.slot] = {
+            "concurrency": self.concurrency,
+            "delay": 0,
+            "randomize_delay": False,
+        }
+        if self.dedup or self.lease:
+            d = threads.deferToThread(self._open_db)
+            return d.addCallbacks(self._start_leases, self._db_unavailable)
+
+    def _open_db(self):
+        """Connect and load the phash index (runs in a thread)."""
+        conn = connect(self.crawler.settings)
+        if self.dedup:
+            self._load_phashes(conn)
+        conn.autocommit = True
+        return conn
+
+    def _load_phashes(self, conn):
+        """Index the perceptual hash of every stored page image."""
+        try:
+            with conn.cursor(name="image_dedup_index") as cur:
+                cur.itersize = 10000
+                cur.execute(
+                    """
+                    SELECT DISTINCT ON (content_hash) phash, content_hash
+                    FROM pages
+                    WHERE download_status = 'completed' AND phash IS NOT NULL
+                      AND content_hash IS NOT NULL AND file_path IS NOT NULL
+                    """
+                )
+                for phash, digest in cur:
+                    self.phashes.add(phash, digest)
+            conn.commit()
+        except psycopg2.Error as e:
+            # First run: the pages table does not exist yet
+            conn.rollback()
+            logger.warning(f"Image dedup index not loaded: {e}")
+        logger.info(f"Image dedup index: {len(self.phashes)} stored images")
+
+    def _start_leases(self, conn):
+        self.conn = conn
+        if self.lease:
+            self.lease_loop = task.LoopingCall(self._renew_leases)
+            self.lease_loop.start(self.lease / 3, now=False)
+
+    def _db_unavailable(self, failure):
+        failure.trap(psycopg2.Error)
+        logger.warning(
+            f"Image dedup and chapter leases disabled: {failure.getErrorMessage()}"
+        )
+
+    def close_spider(self, spider):
+        if self.lease_loop is not None:
+            self.lease_loop.stop()
+        if self.conn is not None:
+            # Leases run out on their own, after the last rows are flushed
+            return threads.deferToThread(self.conn.close)
+
+    async def _hold(self, *chapter_ids):
+        """Lease chapters (once per crawl) before using their stored files."""
+        if not self.lease or self.conn is None:
+            return
+        new = {c for c in chapter_ids if c and c not in self.leased}
+        if not new:
+            return
+        try:
+            await asyncio.to_thread(lease_chapters, self.conn, new, self.lease)
+        except psycopg2.Error as e:
+            logger.warning(f"Could not lease chapters {sorted(new)}: {e}")
+            return
+        self.leased |= new
+
+    def _renew_leases(self):
+        if not self.leased:
+            return None
+        d = threads.deferToThread(
+            lease_chapters, self.conn, set(self.leased), self.lease
+        )
+        return d.addErrback(
+            lambda f: logger.warning(
+                f"Chapter lease renewal failed: {f.getErrorMessage()}"
+            )
+        )
+
+    async def _find(self, column, value):
+        """Index entry of a stored image by url or content_hash, or None."""
+        known = (self.known_urls if column == "url" else self.known_hashes).get(value)
+        if known is not None or not self.dedup or self.conn is None:
+            return known
+        try:
+            return await asyncio.to_thread(self._find_stored, column, value)
+        except psycopg2.Error as e:
+            logger.warning(f"Stored image lookup by {column} failed: {e}")
+            return None
+
+    def _find_stored(self, column, value):
+        # Served by pages_url_idx / pages_content_hash_idx
+        with self.conn.cursor() as cur:
+            cur.execute(
+                f"""
+                SELECT content_hash, file_path, phash, chapter_id FROM pages
+                WHERE {column} = %s AND download_status = 'completed'
+                  AND content_hash IS NOT NULL AND file_path IS NOT NULL
+                LIMIT 1
+                """,
+                (value,),
+            )
+            row = cur.fetchone()
+        return tuple(row) if row else None
+
+    def _remember(self, url, digest, entry):
+        """Index an image; entry is the (content_hash, file_path, phash, chapter_id) used."""
+        self.known_urls[url] = entry
+        if digest not in self.known_hashes:
+            self.known_hashes[digest] = entry
+            # Only canonical files go into the phash index
+            if entry[2] is not None and entry[0] == digest:
+                self.phashes.add(entry[2], digest)
+
+    def bytes_received(self, data, request, spider):
+        sinks = request.meta.get("page_image_sinks")
+        if sinks is None:
+            return
+        # Retries and redirects are new Request objects sharing this list
+        if not sinks or sinks[-1][0] is not request:
+            sinks.append((request, _ImageSink(self.tmp_dir)))
+        sinks[-1][1].write(data)
+
+    async def process_item(self, item, spider):
+        if type(item) is not PageItem or not item.page_url:
+            return item
+        stats = self.crawler.stats
+        # A re-crawl links and packages the chapter's own stored files
+        await self._hold(item.chapter_id)
+
+        known = await self._find("url", item.page_url)
+        if known is not None and await self._usable(known):
+            # Same image URL as a stored page: no need to download it again
+            self._link(item, known)
+            stats.inc_value("images/duplicates/url")
+            stats.inc_value("images/bytes_saved", self._size(known))
+            return item
+
+        sinks = []
+        request = Request(
+            item.page_url,
+            headers={"Accept-Encoding": "identity"},  # Hash the bytes as stored
+            meta={
+                "download_slot": self.slot,
+                "page_image_sinks": sinks,
+            },
+            dont_filter=True,
+        )
+        try:
+            response = await maybe_deferred_to_future(
+                self.crawler.engine.download(request)
+            )
+            sink = next((s for r, s in sinks if r is response.request), None)
+            if response.status != 200 or sink is None:
+                raise ValueError(f"HTTP {response.status}, {len(sinks)} attempts")
+            item.retry_count = response.request.meta.get("retry_times", 0)
+            await self._store(item, sink, response)
+            sinks.remove((response.request, sink))
+        except Exception as e:
+            item.download_status = DownloadStatus.FAILED
+            stats.inc_value("images/failed")
+            logger.warning(f"Page image {item.page_url} failed: {e}")
+        finally:
+            for _, leftover in sinks:
+                leftover.discard()
+        return item
+
+    async def _store(self, item, sink, response):
+        sink.file.close()
+        stats = self.crawler.stats
+        stats.inc_value("images/downloaded")
+        digest = sink.hash.hexdigest()
+        content_type = response.headers.get("Content-Type", b"").decode()
+        relative_path = content_path(
+            digest, image_extension(response.url, content_type)
+        )
+        entry = await self._find("content_hash", digest)
+        if entry is None or not await self._usable(entry):
+            entry = (digest, relative_path, None, item.chapter_id)
+
+        if self._exists(entry):
+            os.remove(sink.path)
+            stats.inc_value("images/duplicates/exact")
+            stats.inc_value("images/bytes_saved", sink.size)
+        else:
+            # Decoded once; the hash is stored with the page either way
+            phash = await self._phash(sink.path) if self.dedup else None
+            match = await self._near_duplicate(sink.path, phash)
+            if match is not None:
+                entry = match
+                os.remove(sink.path)
+                stats.inc_value("images/duplicates/perceptual")
+                stats.inc_value("images/bytes_saved", sink.size)
+                item.phash = phash
+            else:
+                entry = (digest, relative_path, phash, item.chapter_id)
+                path = os.path.join(self.store, relative_path)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(sink.path, path)
+                stats.inc_value("images/stored")
+                stats.inc_value("images/bytes", sink.size)
+
+        if self.dedup:
+            self._remember(item.page_url, digest, entry)
+        self._link(item, entry)
+
+    async def _near_duplicate(self, path, phash):
+        """Index entry of a stored look-alike of the image at path, or None."""
+        if phash is None:
+            return None
+        match = self.phashes.nearest(phash)
+        if match is None:
+            return None
+        entry = await self._find("content_hash", match[1])
+        if entry is None or not await self._usable(entry):
+            return None
+        # Close hashes can still be different pages with a similar layout:
+        # compare the pixels before dropping the new image
+        stored_path = os.path.join(self.store, entry[1])
+        try:
+            same = await asyncio.to_thread(
+                same_image, path, stored_path, self.pixel_tolerance
+            )
+        except Exception as e:
+            logger.debug(f"Could not compare {path} with {stored_path}: {e}")
+            return None
+        if not same:
+            self.crawler.stats.inc_value("images/duplicates/phash_rejected")
+            return None
+        return entry
+
+    async def _phash(self, path):
+        try:
+            return await asyncio.to_thread(dhash, path)
+        except Exception as e:
+            logger.debug(f"No perceptual hash for {path}: {e}")
+            return None
+
+    def _link(self, item, entry):
+        item.content_hash, item.file_path, phash, _ = entry
+        if item.phash is None:
+            item.phash = phash
+        item.download_status = DownloadStatus.COMPLETED
+
+    async def _usable(self, entry):
+        """Lease the chapter an indexed file came from, then check the file."""
+        await self._hold(entry[3])
+        return self._exists(entry)
+
+    def _exists(self, entry):
+        return os.path.exists(os.path.join(self.store, entry[1]))
+
+    def _size(self, entry):
+        try:
+            return os.path.getsize(os.path.join(self.store, entry[1]))
+        except OSError:
+            return 0
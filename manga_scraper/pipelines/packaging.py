@@ -0,0 +1,176 @@
+# pipelines/packaging.py
+import asyncio
+import logging
+import os
+import time
+
+from scrapy.exceptions import NotConfigured
+from twisted.internet import task
+
+from manga_scraper.items import ChapterPageLinkItem, DownloadStatus, PageItem
+from manga_scraper.utils.packaging import package_chapter, package_digest
+from manga_scraper.utils.process_pool import shared_process_pool
+
+logger = logging.getLogger(__name__)
+
+PACKAGE_FORMATS = ("cbz", "pdf")
+
+
+class _ChapterPages:
+    """Downloaded pages of one chapter, collected until its page count is known."""
+
+    __slots__ = ("pages", "total", "complete", "touched")
+
+    def __init__(self):
+        self.pages = {}  # page_number -> PageItem
+        self.total = None
+        self.complete = asyncio.get_running_loop().create_future()
+        self.touched = time.monotonic()
+
+    def add(self, item):
+        self.pages[item.page_number] = item
+        self.touched = time.monotonic()
+        if self.total is not None and len(self.pages) >= self.total:
+            if not self.complete.done():
+                self.complete.set_result(None)
+
+
+class ChapterPackagingPipeline:
+    """
+    Package each chapter as CBZ (and optionally PDF) once its pages are on disk.
+
+    Page items pass straight through and are only remembered. The chapter's
+    ChapterPageLinkItem, which carries the page count, waits until every page
+    has come out of the image download pipeline; the archives are then built
+    in a process pool, off the reactor, and their paths are set on the item
+    for the Postgres pipeline to store on the chapter.
+
+    Archives are written page by page (stored zip, streamed PDF), so memory
+    does not grow with the page count. Each archive carries a digest of its
+    page hashes; an archive whose digest still matches is not rebuilt.
+
+    Pages whose chapter gets no ChapterPageLinkItem within PACKAGING_PAGE_WAIT
+    (late pages of a chapter already packaged or timed out, chapters that
+    failed) are forgotten, so they are not held for the rest of the crawl.
+    """
+
+    def __init__(self, crawler, images_store, store, formats, processes, page_wait):
+        self.crawler = crawler
+        self.images_store = images_store
+        self.store = store
+        self.formats = formats
+        self.processes = processes
+        self.page_wait = page_wait
+        self.chapters = {}  # chapter_id -> _ChapterPages
+        self.pool = None
+        self.expire_loop = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        # Packages are built from the downloaded images
+        if not settings.getbool("PACKAGING_ENABLED") or not settings.getbool(
+            "IMAGES_DOWNLOAD_ENABLED"
+        ):
+            raise NotConfigured
+        formats = settings.getlist("PACKAGING_FORMATS", ["cbz"])
+        unknown = set(formats) - set(PACKAGE_FORMATS)
+        if unknown:
+            raise ValueError(f"Unknown PACKAGING_FORMATS: {sorted(unknown)}")
+        return cls(
+            crawler,
+            images_store=settings.get("IMAGES_STORE"),
+            store=settings.get("PACKAGES_STORE"),
+            formats=formats,
+            processes=settings.getint("PACKAGING_PROCESSES", 2),
+            page_wait=settings.getfloat("PACKAGING_PAGE_WAIT", 600),
+        )
+
+    def open_spider(self, spider):
+        self.pool = shared_process_pool("packaging", self.processes)
+        self.expire_loop = task.LoopingCall(self._expire_chapters)
+        self.expire_loop.start(max(self.page_wait / 2, 1), now=False)
+
+    def close_spider(self, spider):
+        self.expire_loop.stop()
+        if self.chapters:
+            logger.info(f"{len(self.chapters)} chapters left unpackaged")
+
+    async def process_item(self, item, spider):
+        item_type = type(item)
+        if item_type is PageItem:
+            self._chapter(item.chapter_id).add(item)
+        elif item_type is ChapterPageLinkItem and item.total_pages:
+            await self._package(item)
+        return item
+
+    def _chapter(self, chapter_id):
+        chapter = self.chapters.get(chapter_id)
+        if chapter is None:
+            chapter = self.chapters[chapter_id] = _ChapterPages()
+        return chapter
+
+    def _expire_chapters(self):
+        """Drop pages still waiting for their chapter after page_wait seconds."""
+        deadline = time.monotonic() - self.page_wait
+        stale = [
+            chapter_id
+            for chapter_id, chapter in self.chapters.items()
+            if chapter.total is None and chapter.touched < deadline
+        ]
+        for chapter_id in stale:
+            del self.chapters[chapter_id]
+        if stale:
+            self.crawler.stats.inc_value("packaging/expired", len(stale))
+            logger.debug(f"Forgot the pages of {len(stale)} unpackaged chapters")
+
+    async def _package(self, item):
+        stats = self.crawler.stats
+        chapter = self._chapter(item.chapter_id)
+        chapter.total = item.total_pages
+        if len(chapter.pages) >= chapter.total and not chapter.complete.done():
+            chapter.complete.set_result(None)
+        try:
+            await asyncio.wait_for(chapter.complete, self.page_wait)
+        except asyncio.TimeoutError:
+            stats.inc_value("packaging/timed_out")
+            logger.warning(
+                f"Chapter {item.chapter_id}: only {len(chapter.pages)}/"
+                f"{chapter.total} pages after {self.page_wait}s, not packaging"
+            )
+            return
+        finally:
+            self.chapters.pop(item.chapter_id, None)
+
+        pages = [chapter.pages[n] for n in sorted(chapter.pages)]
+        if not all(p.download_status is DownloadStatus.COMPLETED for p in pages):
+            stats.inc_value("packaging/skipped_incomplete")
+            logger.info(f"Chapter {item.chapter_id}: missing images, not packaging")
+            return
+
+        paths = {
+            f: os.path.join(item.manga_id, f"{item.chapter_id}.{f}")
+            for f in self.formats
+        }
+        try:
+            built = await asyncio.get_running_loop().run_in_executor(
+                self.pool,
+                package_chapter,
+                [os.path.join(self.images_store, p.file_path) for p in pages],
+                self._absolute(paths.get("cbz")),
+                self._absolute(paths.get("pdf")),
+                package_digest([p.content_hash for p in pages]),
+            )
+        except Exception as e:
+            stats.inc_value("packaging/failed")
+            logger.error(f"Packaging chapter {item.chapter_id} failed: {e}")
+            return
+
+        for package_format, written in built.items():
+            outcome = "built" if written else "unchanged"
+            stats.inc_value(f"packaging/{package_format}/{outcome}")
+        item.cbz_path = paths.get("cbz")
+        item.pdf_path = paths.get("pdf")
+
+    def _absolute(self, path):
+        return os.path.join(self.store, path) if path else None
@@ -1,37 +1,231 @@
 # pipelines/postgres_pipeline.py
+import io
+import json
 import logging
+import time
 import psycopg2
 from psycopg2 import sql
-from itemadapter import ItemAdapter
+from twisted.internet import defer, task, threads
+from twisted.python.threadpool import ThreadPool
+from manga_scraper.items import (
+    ChapterItem,
+    ChapterPageLinkItem,
+    FailedChapterItem,
+    MangaChapterLinkItem,
+    MangaItem,
+    PageItem,
+    SearchKeywordMangaLinkItem,
+)
+from manga_scraper.utils.db import CREATE_STORAGE_COUNTERS_TABLE, connect
+from manga_scraper.utils.frontier import CREATE_FRONTIER_TABLE
 import re
 
 logger = logging.getLogger(__name__)
 
 
+# Buffers used by the bulk writer, in flush order (parents before children).
+# Each entry: (buffer name, staging table columns, set-based merge statement).
+BULK_TABLES = [
+    (
+        "manga",
+        "id TEXT, title TEXT, url TEXT, follows INTEGER",
+        """
+            INSERT INTO manga (id, title, url, follows)
+            SELECT id, title, url, follows FROM stage_manga
+            ON CONFLICT (id) DO UPDATE SET
+                title = EXCLUDED.title,
+                follows = COALESCE(EXCLUDED.follows, manga.follows)
+        """,
+    ),
+    (
+        "search_keywords",
+        "keyword TEXT, manga_id TEXT, total_hits INTEGER",
+        """
+            INSERT INTO search_keywords (keyword, manga_id, total_hits)
+            SELECT keyword, manga_id, total_hits FROM stage_search_keywords
+            ON CONFLICT (keyword, manga_id) DO UPDATE SET
+                total_hits = EXCLUDED.total_hits
+        """,
+    ),
+    (
+        "chapters",
+        "id TEXT, manga_id TEXT, number_name TEXT, text_name TEXT, "
+        "full_name TEXT, url TEXT, order_index FLOAT",
+        """
+            INSERT INTO chapters (
+                id, manga_id, number_name, text_name,
+                full_name, url, order_index
+            )
+            SELECT id, manga_id, number_name, text_name,
+                   full_name, url, order_index
+            FROM stage_chapters
+            ON CONFLICT (id) DO UPDATE SET
+                text_name = EXCLUDED.text_name,
+                full_name = EXCLUDED.full_name
+        """,
+    ),
+    (
+        "pages",
+        "chapter_id TEXT, page_number INTEGER, url TEXT, "
+        "file_path TEXT, download_status TEXT, content_hash TEXT, "
+        "webp_path TEXT, thumbnail_path TEXT, phash BIGINT",
+        """
+            INSERT INTO pages (
+                chapter_id, page_number, url,
+                file_path, download_status, content_hash,
+                webp_path, thumbnail_path, phash
+            )
+            SELECT chapter_id, page_number, url,
+                   file_path, download_status, content_hash,
+                   webp_path, thumbnail_path, phash
+            FROM stage_pages
+            ON CONFLICT (chapter_id, page_number) DO UPDATE SET
+                url = EXCLUDED.url,
+                file_path = COALESCE(EXCLUDED.file_path, pages.file_path),
+                download_status = COALESCE(
+                    EXCLUDED.download_status, pages.download_status
+                ),
+                content_hash = COALESCE(EXCLUDED.content_hash, pages.content_hash),
+                webp_path = COALESCE(EXCLUDED.webp_path, pages.webp_path),
+                thumbnail_path = COALESCE(
+                    EXCLUDED.thumbnail_path, pages.thumbnail_path
+                ),
+                phash = COALESCE(EXCLUDED.phash, pages.phash),
+                last_accessed_at = NOW();
+
+            UPDATE chapters c
+            SET last_accessed_at = NOW()
+            WHERE c.id IN (SELECT chapter_id FROM stage_pages)
+        """,
+    ),
+    (
+        "manga_counts",
+        "id TEXT, total_chapters INTEGER",
+        """
+            UPDATE manga m
+            SET total_chapters = s.total_chapters
+            FROM stage_manga_counts s
+            WHERE m.id = s.id
+        """,
+    ),
+    (
+        "failed_chapters",
+        "manga_id TEXT, chapter_id TEXT, url TEXT, error_class TEXT, last_error TEXT",
+        """
+            INSERT INTO failed_chapters (
+                manga_id, chapter_id, url, error_class, last_error
+            )
+            SELECT manga_id, chapter_id, url, error_class, last_error
+            FROM stage_failed_chapters
+            ON CONFLICT (chapter_id) DO UPDATE SET
+                url = EXCLUDED.url,
+                error_class = EXCLUDED.error_class,
+                last_error = EXCLUDED.last_error,
+                attempts = failed_chapters.attempts + 1,
+                last_error_at = NOW()
+        """,
+    ),
+    (
+        "chapter_counts",
+        "id TEXT, total_pages INTEGER, cbz_path TEXT, pdf_path TEXT",
+        """
+            UPDATE chapters c
+            SET total_pages = s.total_pages,
+                cbz_path = COALESCE(s.cbz_path, c.cbz_path),
+                pdf_path = COALESCE(s.pdf_path, c.pdf_path)
+            FROM stage_chapter_counts s
+            WHERE c.id = s.id;
+
+            DELETE FROM failed_chapters f
+            USING stage_chapter_counts s
+            WHERE f.chapter_id = s.id
+        """,
+    ),
+]
+
+
+def _copy_text(value):
+    """Encode a value for COPY ... FROM STDIN in text format."""
+    if value is None:
+        return "\\N"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
 class PostgreSQLPipeline:
-    def __init__(self):
+    def __init__(self, batch_size=0, flush_interval=5.0, max_inflight=4):
         self.conn = None
         self.cur = None
         self.tables_created = False
+        # Last count committed per parent, used to drop redundant count updates
+        self.applied_counts = {}
+
+        # All database calls run on a single writer thread, so the psycopg2
+        # connection is never shared and the reactor never blocks on a commit.
+        # The semaphore bounds queued writes; once it is exhausted the returned
+        # Deferreds stay pending and Scrapy stops feeding new items.
+        self.writer = ThreadPool(minthreads=1, maxthreads=1, name="postgres-writer")
+        self.inflight = defer.DeferredSemaphore(max_inflight)
+
+        # Bulk writer state (disabled when batch_size is 0)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.buffers = {name: {} for name, _, _ in BULK_TABLES}
+        self.pending_rows = 0
+        # Buffered count updates: parent key -> (buffer name, count)
+        self.pending_counts = {}
+        self.flush_loop = None
+        self.write_seconds = {name: 0.0 for name, _, _ in BULK_TABLES}
+
+        # Item type -> per-item writer / bulk row builder
+        self.writers = {
+            MangaItem: self._upsert_manga,
+            SearchKeywordMangaLinkItem: self._insert_search_keyword,
+            ChapterItem: self._upsert_chapter,
+            PageItem: self._insert_page,
+            MangaChapterLinkItem: self._update_manga_chapter_count,
+            ChapterPageLinkItem: self._update_chapter_page_count,
+            FailedChapterItem: self._record_failed_chapter,
+        }
+        self.bulk_rows = {
+            MangaItem: self._manga_row,
+            SearchKeywordMangaLinkItem: self._search_keyword_row,
+            ChapterItem: self._chapter_row,
+            PageItem: self._page_row,
+            MangaChapterLinkItem: self._manga_count_row,
+            ChapterPageLinkItem: self._chapter_count_row,
+            FailedChapterItem: self._failed_chapter_row,
+        }
 
     @classmethod
     def from_crawler(cls, crawler):
-        pipeline = cls()
+        pipeline = cls(
+            batch_size=crawler.settings.getint("POSTGRESQL_BATCH_SIZE", 0),
+            flush_interval=crawler.settings.getfloat("POSTGRESQL_FLUSH_INTERVAL", 5.0),
+            max_inflight=crawler.settings.getint("POSTGRESQL_MAX_INFLIGHT", 4),
+        )
         pipeline.crawler = crawler
         return pipeline
 
+    @property
+    def bulk_mode(self):
+        return self.batch_size > 0
+
     def open_spider(self, spider):
         try:
-            self.conn = psycopg2.connect(
-                dbname=self.crawler.settings.get("POSTGRESQL_DB"),
-                user=self.crawler.settings.get("POSTGRESQL_USER"),
-                password=self.crawler.settings.get("POSTGRESQL_PASSWORD"),
-                host=self.crawler.settings.get("POSTGRESQL_HOST"),
-                port=self.crawler.settings.get("POSTGRESQL_PORT"),
-            )
-            self.conn.autocommit = False  # Enable transactions
+            self.conn = connect(self.crawler.settings)
             self.cur = self.conn.cursor()
             self._ensure_tables()
+            if self.bulk_mode:
+                self._create_staging_tables()
+                self.flush_loop = task.LoopingCall(self._flush_on_interval)
+                self.flush_loop.start(self.flush_interval, now=False)
+            self.writer.start()
             logger.info("Connected to PostgreSQL database")
         except Exception as e:
             logger.error(f"Failed to connect to PostgreSQL: {e}")
@@ -100,7 +294,11 @@ class PostgreSQLPipeline:
                 full_name TEXT,
                 url TEXT,
                 order_index FLOAT,
-                total_pages INTEGER DEFAULT 0
+                total_pages INTEGER DEFAULT 0,
+                cbz_path TEXT,
+                pdf_path TEXT,
+                last_accessed_at TIMESTAMPTZ,
+                in_use_until TIMESTAMPTZ
             )
         """
         )
@@ -111,11 +309,74 @@ class PostgreSQLPipeline:
                 chapter_id TEXT REFERENCES chapters(id),
                 page_number INTEGER,
                 url TEXT,
+                file_path TEXT,
+                download_status TEXT,
+                content_hash TEXT,
+                webp_path TEXT,
+                thumbnail_path TEXT,
+                phash BIGINT,
+                last_accessed_at TIMESTAMPTZ DEFAULT NOW(),
                 PRIMARY KEY (chapter_id, page_number)
             )
         """
         )
 
+        self._create_failed_chapters_table()
+        self._create_failed_rows_table()
+        self._create_storage_tables()
+        self._create_storage_indexes()
+
+    def _create_storage_tables(self):
+        """Frontier and counter tables read by image store eviction"""
+        self.cur.execute(CREATE_FRONTIER_TABLE)
+        self.cur.execute(CREATE_STORAGE_COUNTERS_TABLE)
+
+    def _create_storage_indexes(self):
+        """Indexes behind image store eviction and content-hash lookups"""
+        self.cur.execute(
+            "CREATE INDEX IF NOT EXISTS pages_content_hash_idx ON pages (content_hash)"
+        )
+        # Image dedup looks stored pages up by URL
+        self.cur.execute("CREATE INDEX IF NOT EXISTS pages_url_idx ON pages (url)")
+        # Evicted chapters have no access time and drop out of the LRU order
+        self.cur.execute(
+            """
+            CREATE INDEX IF NOT EXISTS chapters_last_accessed_idx
+            ON chapters (last_accessed_at) WHERE last_accessed_at IS NOT NULL
+        """
+        )
+
+    def _create_failed_chapters_table(self):
+        """Dead-letter table for chapters whose render or parse failed"""
+        self.cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS failed_chapters (
+                chapter_id TEXT PRIMARY KEY,
+                manga_id TEXT,
+                url TEXT,
+                error_class TEXT,
+                last_error TEXT,
+                attempts INTEGER DEFAULT 1,
+                first_error_at TIMESTAMPTZ DEFAULT NOW(),
+                last_error_at TIMESTAMPTZ DEFAULT NOW()
+            )
+        """
+        )
+
+    def _create_failed_rows_table(self):
+        """Dead-letter table for bulk rows the database rejected"""
+        self.cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS failed_rows (
+                id SERIAL PRIMARY KEY,
+                table_name TEXT,
+                row_data TEXT,
+                error TEXT,
+                failed_at TIMESTAMPTZ DEFAULT NOW()
+            )
+        """
+        )
+
     def _migrate_tables(self):
         """Migrate existing tables if schema changes"""
         try:
@@ -134,53 +395,346 @@ class PostgreSQLPipeline:
                 logger.info("Added total_chapters column to manga table")
 
             # Similarly check for other schema changes
+            self._create_failed_chapters_table()
+            self._create_failed_rows_table()
+            for column in (
+                "file_path",
+                "download_status",
+                "content_hash",
+                "webp_path",
+                "thumbnail_path",
+            ):
+                self.cur.execute(
+                    f"ALTER TABLE pages ADD COLUMN IF NOT EXISTS {column} TEXT"
+                )
+            # Read time used for LRU eviction of the image store
+            self.cur.execute(
+                "ALTER TABLE pages ADD COLUMN IF NOT EXISTS "
+                "last_accessed_at TIMESTAMPTZ DEFAULT NOW()"
+            )
+            self.cur.execute("ALTER TABLE pages ADD COLUMN IF NOT EXISTS phash BIGINT")
+            for column in ("cbz_path", "pdf_path"):
+                self.cur.execute(
+                    f"ALTER TABLE chapters ADD COLUMN IF NOT EXISTS {column} TEXT"
+                )
+            self._migrate_chapter_access()
+            self._create_storage_tables()
+            self._create_storage_indexes()
             self.conn.commit()
         except Exception as e:
             self.conn.rollback()
             logger.error(f"Error migrating tables: {e}")
             raise
 
+    def _migrate_chapter_access(self):
+        """Per-chapter access time and crawl lease used by image store eviction"""
+        self.cur.execute(
+            """
+            SELECT column_name
+            FROM information_schema.columns
+            WHERE table_name='chapters' AND column_name='last_accessed_at'
+        """
+        )
+        if not self.cur.fetchone():
+            self.cur.execute(
+                "ALTER TABLE chapters ADD COLUMN last_accessed_at TIMESTAMPTZ"
+            )
+            # Start from the pages still on disk
+            self.cur.execute(
+                """
+                UPDATE chapters c
+                SET last_accessed_at = p.last_accessed_at
+                FROM (
+                    SELECT chapter_id, MAX(last_accessed_at) AS last_accessed_at
+                    FROM pages
+                    WHERE download_status = 'completed'
+                    GROUP BY chapter_id
+                ) p
+                WHERE c.id = p.chapter_id
+            """
+            )
+            logger.info("Added last_accessed_at column to chapters table")
+        self.cur.execute(
+            "ALTER TABLE chapters ADD COLUMN IF NOT EXISTS in_use_until TIMESTAMPTZ"
+        )
+
+    def _create_staging_tables(self):
+        """Create session-local staging tables used by the bulk writer"""
+        for name, columns, _ in BULK_TABLES:
+            self.cur.execute(
+                f"CREATE TEMP TABLE IF NOT EXISTS stage_{name} ({columns}) "
+                "ON COMMIT DELETE ROWS"
+            )
+        self.conn.commit()
+
     def process_item(self, item, spider):
         if not self.tables_created:
             logger.error("Tables not created, skipping item processing")
             return item
 
-        adapter = ItemAdapter(item)
-        try:
-            if adapter["item_type"] == "MangaItem":
-                self._upsert_manga(adapter)
-            elif adapter["item_type"] == "SearchKeywordMangaLinkItem":
-                self._insert_search_keyword(adapter)
-            elif adapter["item_type"] == "ChapterItem":
-                self._upsert_chapter(adapter)
-            elif adapter["item_type"] == "PageItem":
-                self._insert_page(adapter)
-            elif adapter["item_type"] == "MangaChapterLinkItem":
-                self._update_manga_chapter_count(adapter)
-            elif adapter["item_type"] == "ChapterPageLinkItem":
-                self._update_chapter_page_count(adapter)
+        if type(item) not in self.writers:
+            return item
+        counted = self._count_update(item)
+        if counted is not None and self.applied_counts.get(counted[0]) == counted[1]:
+            self.crawler.stats.inc_value("postgres/count_updates_collapsed")
+            return item
 
+        if self.bulk_mode:
+            name = self._buffer_item(item)
+            if counted is not None:
+                key, count = counted
+                self.pending_counts[key] = (name, count)
+            if self.pending_rows >= self.batch_size:
+                return self.flush().addCallback(lambda _: item)
             return item
+
+        d = self._run_on_writer(self._write_item, item)
+        if counted is not None:
+            key, count = counted
+            d.addCallback(lambda _: self.applied_counts.update({key: count}))
+        return d.addCallback(lambda _: item)
+
+    def _count_update(self, item):
+        """(parent key, count) of a count update item, or None.
+
+        Older spiders emit one link item per child, all carrying the same
+        total; only the first one (or a changed total) needs a write. A
+        count is recorded as applied only once its write has committed.
+        """
+        item_type = type(item)
+        if item_type is MangaChapterLinkItem:
+            return ("manga", item.manga_id), item.total_chapters
+        if item_type is ChapterPageLinkItem:
+            # Packaging adds archive paths to an otherwise repeated count
+            key = ("chapters", item.chapter_id)
+            return key, (item.total_pages, item.cbz_path, item.pdf_path)
+        return None
+
+    def _run_on_writer(self, func, *args):
+        """Run func on the writer thread once an in-flight slot is free."""
+        from twisted.internet import reactor
+
+        def _submit():
+            self.crawler.stats.max_value(
+                "postgres/max_inflight", self.inflight.limit - self.inflight.tokens
+            )
+            return threads.deferToThreadPool(reactor, self.writer, func, *args)
+
+        return self.inflight.run(_submit)
+
+    def _write_item(self, item):
+        """Write a single item in its own transaction (runs on the writer thread)."""
+        try:
+            self.writers[type(item)](item)
         except Exception as e:
             self.conn.rollback()
-            logger.error(f"Error processing item {adapter['item_type']}: {e}")
+            logger.error(f"Error processing item {type(item).__name__}: {e}")
             raise
 
+    def _buffer_item(self, item):
+        """Queue an item for the next bulk flush, keyed by its primary key."""
+        name, key, row = self.bulk_rows[type(item)](item)
+        buffer = self.buffers[name]
+        if key not in buffer:
+            self.pending_rows += 1
+        buffer[key] = row
+        return name
+
+    # Bulk row builders: (buffer name, primary key, staging table row)
+
+    def _manga_row(self, item):
+        row = (item.manga_id, item.manga_name, item.manga_url, item.manga_follows)
+        return "manga", item.manga_id, row
+
+    def _search_keyword_row(self, item):
+        row = (item.keyword, item.manga_id, item.total_mangas)
+        return "search_keywords", (item.keyword, item.manga_id), row
+
+    def _chapter_row(self, item):
+        row = (
+            item.chapter_id,
+            item.manga_id,
+            item.chapter_number_name,
+            item.chapter_text_name,
+            item.chapter_name,
+            item.chapter_url,
+            self._parse_chapter_index(item.chapter_number_name),
+        )
+        return "chapters", item.chapter_id, row
+
+    def _page_row(self, item):
+        return "pages", (item.chapter_id, item.page_number), self._page_values(item)
+
+    def _page_values(self, item):
+        return (
+            item.chapter_id,
+            item.page_number,
+            item.page_url,
+            item.file_path,
+            item.download_status.value if item.download_status else None,
+            item.content_hash,
+            item.webp_path,
+            item.thumbnail_path,
+            item.phash,
+        )
+
+    def _manga_count_row(self, item):
+        return "manga_counts", item.manga_id, (item.manga_id, item.total_chapters)
+
+    def _chapter_count_row(self, item):
+        row = (item.chapter_id, item.total_pages, item.cbz_path, item.pdf_path)
+        return "chapter_counts", item.chapter_id, row
+
+    def _failed_chapter_row(self, item):
+        row = (
+            item.manga_id,
+            item.chapter_id,
+            item.chapter_url,
+            item.error_class,
+            item.error_message,
+        )
+        return "failed_chapters", item.chapter_id, row
+
+    def _flush_on_interval(self):
+        # Errors are already logged by _write_buffers(); keep the timer running
+        self.flush().addErrback(lambda _: None)
+
+    def flush(self):
+        """Hand the buffered rows to the writer thread; returns a Deferred."""
+        if not self.pending_rows:
+            return defer.succeed(None)
+
+        buffers = self.buffers
+        self.buffers = {name: {} for name, _, _ in BULK_TABLES}
+        self.pending_rows = 0
+        counts = self.pending_counts
+        self.pending_counts = {}
+
+        d = self._run_on_writer(self._write_buffers, buffers)
+        d.addCallback(self._apply_counts, counts)
+        return d.addCallbacks(self._record_flush_stats, self._record_flush_failure)
+
+    def sync(self):
+        """Flush; fires once every write handed over so far has committed."""
+        if self.pending_rows:
+            return self.flush()
+        # The writer runs jobs in order, so an empty one waits for the rest
+        return self._run_on_writer(lambda: None)
+
+    def _apply_counts(self, written, counts):
+        """Remember the counts of a committed flush (not dead-lettered ones)."""
+        for key, (name, count) in counts.items():
+            if name in written and not written[name][1]:
+                self.applied_counts[key] = count
+        return written
+
+    def _write_buffers(self, buffers):
+        """Write rows with COPY + set-based upserts in one transaction (writer thread).
+
+        Each table is merged under its own savepoint. If the database rejects
+        the batch (FK miss, NUL byte, ...), that table is retried row by row
+        and only the offending rows go to failed_rows.
+        """
+        written = {}
+        try:
+            for name, _, merge_query in BULK_TABLES:
+                rows = list(buffers[name].values())
+                if not rows:
+                    continue
+                started = time.monotonic()
+                self.cur.execute("SAVEPOINT bulk_table")
+                try:
+                    self._merge_rows(name, merge_query, rows)
+                    failed = 0
+                except psycopg2.Error as e:
+                    self.cur.execute("ROLLBACK TO SAVEPOINT bulk_table")
+                    logger.warning(
+                        f"Bulk merge of {len(rows)} {name} rows failed, "
+                        f"retrying row by row: {e}"
+                    )
+                    failed = self._merge_rows_one_by_one(name, merge_query, rows)
+                self.cur.execute("RELEASE SAVEPOINT bulk_table")
+                written[name] = (
+                    len(rows) - failed,
+                    failed,
+                    time.monotonic() - started,
+                )
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            dropped = sum(len(rows) for rows in buffers.values())
+            logger.error(f"Error flushing {dropped} buffered rows: {e}")
+            e.dropped_rows = dropped
+            raise
+        return written
+
+    def _merge_rows(self, name, merge_query, rows):
+        data = io.StringIO(
+            "".join(
+                "\t".join(_copy_text(value) for value in row) + "\n" for row in rows
+            )
+        )
+        self.cur.copy_expert(f"COPY stage_{name} FROM STDIN", data)
+        self.cur.execute(merge_query)
+        # Staging rows only go away on commit; clear them for the next merge
+        self.cur.execute(f"DELETE FROM stage_{name}")
+
+    def _merge_rows_one_by_one(self, name, merge_query, rows):
+        """Merge rows one at a time, dead-lettering the rejected ones."""
+        failed = 0
+        for row in rows:
+            self.cur.execute("SAVEPOINT bulk_row")
+            try:
+                self._merge_rows(name, merge_query, [row])
+            except psycopg2.Error as e:
+                self.cur.execute("ROLLBACK TO SAVEPOINT bulk_row")
+                self.cur.execute(
+                    "INSERT INTO failed_rows (table_name, row_data, error) "
+                    "VALUES (%s, %s, %s)",
+                    (name, json.dumps(row, default=str), str(e)),
+                )
+                failed += 1
+            self.cur.execute("RELEASE SAVEPOINT bulk_row")
+        if failed:
+            logger.error(f"Dead-lettered {failed} {name} rows into failed_rows")
+        return failed
+
+    def _record_flush_failure(self, failure):
+        self.crawler.stats.inc_value(
+            "postgres/bulk_rows_dropped", getattr(failure.value, "dropped_rows", 0)
+        )
+        return failure
+
+    def _record_flush_stats(self, written):
+        stats = self.crawler.stats
+        stats.inc_value("postgres/bulk_flushes")
+        for name, (rows, failed, seconds) in written.items():
+            stats.inc_value(f"postgres/{name}/rows", rows)
+            if failed:
+                stats.inc_value(f"postgres/{name}/rows_dead_lettered", failed)
+            self.write_seconds[name] += seconds
+            if self.write_seconds[name]:
+                total_rows = stats.get_value(f"postgres/{name}/rows", 0)
+                stats.set_value(
+                    f"postgres/{name}/rows_per_sec",
+                    round(total_rows / self.write_seconds[name], 1),
+                )
+
     def _upsert_manga(self, item):
         query = """
             INSERT INTO manga (id, title, url, follows)
             VALUES (%s, %s, %s, %s)
             ON CONFLICT (id) DO UPDATE SET
                 title = EXCLUDED.title,
-                follows = EXCLUDED.follows
+                follows = COALESCE(EXCLUDED.follows, manga.follows)
         """
         self.cur.execute(
             query,
             (
-                item["manga_id"],
-                item["manga_name"],
-                item["manga_url"],
-                item.get("manga_follows"),
+                item.manga_id,
+                item.manga_name,
+                item.manga_url,
+                item.manga_follows,
             ),
         )
         self.conn.commit()
@@ -191,7 +745,7 @@ class PostgreSQLPipeline:
             SET total_chapters = %s 
             WHERE id = %s
         """
-        self.cur.execute(query, (item["total_chapters"], item["manga_id"]))
+        self.cur.execute(query, (item.total_chapters, item.manga_id))
         self.conn.commit()
 
     def _upsert_chapter(self, item):
@@ -207,13 +761,13 @@ class PostgreSQLPipeline:
         self.cur.execute(
             query,
             (
-                item["chapter_id"],
-                item["manga_id"],
-                item["chapter_number_name"],
-                item.get("chapter_text_name"),
-                item["chapter_name"],
-                item["chapter_url"],
-                self._parse_chapter_index(item["chapter_number_name"]),
+                item.chapter_id,
+                item.manga_id,
+                item.chapter_number_name,
+                item.chapter_text_name,
+                item.chapter_name,
+                item.chapter_url,
+                self._parse_chapter_index(item.chapter_number_name),
             ),
         )
         self.conn.commit()
@@ -221,31 +775,79 @@ class PostgreSQLPipeline:
     def _update_chapter_page_count(self, item):
         query = """
             UPDATE chapters 
-            SET total_pages = %s 
+            SET total_pages = %s,
+                cbz_path = COALESCE(%s, cbz_path),
+                pdf_path = COALESCE(%s, pdf_path)
             WHERE id = %s
         """
-        self.cur.execute(query, (item["total_pages"], item["chapter_id"]))
+        self.cur.execute(
+            query, (item.total_pages, item.cbz_path, item.pdf_path, item.chapter_id)
+        )
+        # The chapter made it after all; drop it from the dead-letter queue
+        self.cur.execute(
+            "DELETE FROM failed_chapters WHERE chapter_id = %s", (item.chapter_id,)
+        )
+        self.conn.commit()
+
+    def _record_failed_chapter(self, item):
+        query = """
+            INSERT INTO failed_chapters (
+                manga_id, chapter_id, url, error_class, last_error
+            ) VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT (chapter_id) DO UPDATE SET
+                url = EXCLUDED.url,
+                error_class = EXCLUDED.error_class,
+                last_error = EXCLUDED.last_error,
+                attempts = failed_chapters.attempts + 1,
+                last_error_at = NOW()
+        """
+        self.cur.execute(
+            query,
+            (
+                item.manga_id,
+                item.chapter_id,
+                item.chapter_url,
+                item.error_class,
+                item.error_message,
+            ),
+        )
         self.conn.commit()
 
     def _insert_search_keyword(self, item):
         query = """
             INSERT INTO search_keywords (keyword, manga_id, total_hits)
             VALUES (%s, %s, %s)
-            ON CONFLICT (keyword, manga_id) DO NOTHING
+            ON CONFLICT (keyword, manga_id) DO UPDATE SET
+                total_hits = EXCLUDED.total_hits
         """
-        self.cur.execute(
-            query, (item["keyword"], item["manga_id"], item["total_mangas"])
-        )
+        self.cur.execute(query, (item.keyword, item.manga_id, item.total_mangas))
         self.conn.commit()
 
     def _insert_page(self, item):
         query = """
-            INSERT INTO pages (chapter_id, page_number, url)
-            VALUES (%s, %s, %s)
-            ON CONFLICT (chapter_id, page_number) DO NOTHING
+            INSERT INTO pages (
+                chapter_id, page_number, url,
+                file_path, download_status, content_hash,
+                webp_path, thumbnail_path, phash
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ON CONFLICT (chapter_id, page_number) DO UPDATE SET
+                url = EXCLUDED.url,
+                file_path = COALESCE(EXCLUDED.file_path, pages.file_path),
+                download_status = COALESCE(
+                    EXCLUDED.download_status, pages.download_status
+                ),
+                content_hash = COALESCE(EXCLUDED.content_hash, pages.content_hash),
+                webp_path = COALESCE(EXCLUDED.webp_path, pages.webp_path),
+                thumbnail_path = COALESCE(
+                    EXCLUDED.thumbnail_path, pages.thumbnail_path
+                ),
+                phash = COALESCE(EXCLUDED.phash, pages.phash),
+                last_accessed_at = NOW()
         """
+        self.cur.execute(query, self._page_values(item))
         self.cur.execute(
-            query, (item["chapter_id"], item["page_number"], item["page_url"])
+            "UPDATE chapters SET last_accessed_at = NOW() WHERE id = %s",
+            (item.chapter_id,),
         )
         self.conn.commit()
 
@@ -257,6 +859,21 @@ class PostgreSQLPipeline:
             return 0.0
 
     def close_spider(self, spider):
+        if self.flush_loop and self.flush_loop.running:
+            self.flush_loop.stop()
+        d = self.flush() if self.bulk_mode and self.conn else defer.succeed(None)
+        d.addErrback(lambda _: None)
+        # Queued behind every pending write on the single writer thread
+        d.addCallback(lambda _: self._run_on_writer(self._close_connection))
+        # ThreadPool.stop() joins the writer thread; keep it off the reactor
+        d.addBoth(
+            lambda _: (
+                threads.deferToThread(self.writer.stop) if self.writer.started else None
+            )
+        )
+        return d
+
+    def _close_connection(self):
         if self.cur:
             self.cur.close()
         if self.conn:
@@ -0,0 +1,108 @@
+# pipelines/renditions.py
+import asyncio
+import logging
+import os
+import time
+
+from scrapy.exceptions import NotConfigured
+
+from manga_scraper.items import DownloadStatus, PageItem
+from manga_scraper.utils.process_pool import shared_process_pool
+from manga_scraper.utils.renditions import render_page, rendition_paths
+
+logger = logging.getLogger(__name__)
+
+
+class PageRenditionPipeline:
+    """
+    Transcode downloaded pages to WebP and cut fixed-width thumbnails.
+
+    Runs after the image download pipeline on every PageItem it stored.
+    Images are decoded and encoded in a process pool, off the reactor, and
+    written next to the original (``<sha256>-q<quality>.webp`` and
+    ``<sha256>-w<width>.webp``); renditions that already exist are not
+    redone. The item leaves with ``webp_path`` and ``thumbnail_path`` set.
+
+    Throughput is reported as ``renditions/pages_per_sec_per_core``: pages
+    rendered per CPU second spent in the workers.
+    """
+
+    def __init__(self, crawler, store, quality, thumbnail_width, processes):
+        self.crawler = crawler
+        self.store = store
+        self.quality = quality
+        self.thumbnail_width = thumbnail_width
+        self.processes = processes
+        self.pool = None
+        self.pages = 0
+        self.cpu_seconds = 0.0
+        self.started = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        # Renditions are made from the downloaded originals
+        if not settings.getbool("RENDITIONS_ENABLED") or not settings.getbool(
+            "IMAGES_DOWNLOAD_ENABLED"
+        ):
+            raise NotConfigured
+        return cls(
+            crawler,
+            store=settings.get("IMAGES_STORE"),
+            quality=settings.getint("RENDITION_WEBP_QUALITY", 80),
+            thumbnail_width=settings.getint("RENDITION_THUMBNAIL_WIDTH", 320),
+            processes=settings.getint("RENDITION_PROCESSES") or os.cpu_count(),
+        )
+
+    def open_spider(self, spider):
+        self.pool = shared_process_pool("renditions", self.processes)
+        self.started = time.monotonic()
+
+    async def process_item(self, item, spider):
+        if (
+            type(item) is not PageItem
+            or item.download_status is not DownloadStatus.COMPLETED
+        ):
+            return item
+
+        webp_path, thumbnail_path = rendition_paths(
+            item.file_path, self.quality, self.thumbnail_width
+        )
+        stats = self.crawler.stats
+        try:
+            written, cpu_seconds = await asyncio.get_running_loop().run_in_executor(
+                self.pool,
+                render_page,
+                os.path.join(self.store, item.file_path),
+                os.path.join(self.store, webp_path),
+                os.path.join(self.store, thumbnail_path),
+                self.quality,
+                self.thumbnail_width,
+            )
+        except Exception as e:
+            stats.inc_value("renditions/failed")
+            logger.warning(f"Renditions of {item.file_path} failed: {e}")
+            return item
+
+        item.webp_path = webp_path
+        item.thumbnail_path = thumbnail_path
+        if not written:
+            stats.inc_value("renditions/reused")
+            return item
+        stats.inc_value("renditions/pages")
+        stats.inc_value("renditions/written", written)
+        self._record_throughput(cpu_seconds)
+        return item
+
+    def _record_throughput(self, cpu_seconds):
+        self.pages += 1
+        self.cpu_seconds += cpu_seconds
+        stats = self.crawler.stats
+        if self.cpu_seconds:
+            stats.set_value(
+                "renditions/pages_per_sec_per_core",
+                round(self.pages / self.cpu_seconds, 2),
+            )
+        elapsed = time.monotonic() - self.started
+        if elapsed:
+            stats.set_value("renditions/pages_per_sec", round(self.pages / elapsed, 2))
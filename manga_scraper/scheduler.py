@@ -0,0 +1,101 @@
+# manga_scraper/scheduler.py
+import logging
+import shutil
+import tempfile
+
+from scrapy.core.scheduler import Scheduler
+
+logger = logging.getLogger(__name__)
+
+
+class SpillingScheduler(Scheduler):
+    """
+    Scheduler that keeps pending requests on disk even without a JOBDIR.
+
+    Scrapy only uses its disk queues when JOBDIR is set; otherwise every
+    pending request (with its Playwright meta) stays in memory. With
+    SCHEDULER_SPILL_TO_DISK the queue goes to a temporary directory that
+    is removed when the spider closes. Tasks started through the API
+    already have a JOBDIR and use that instead.
+
+    It also applies backpressure: chapter requests are counted from the
+    moment they are queued until the downloader is done with them, however
+    it finishes (response, error, or a middleware answering or ignoring the
+    request). While more than BACKPRESSURE_MAX_PENDING_CHAPTERS are
+    pending, only chapter requests are handed out; search and manga pages
+    stay queued until the count falls to half of that, so a big search
+    expands into chapters only as fast as they are rendered.
+    """
+
+    tmpdir = None
+    max_pending_chapters = 0
+    queued_chapters = 0
+    throttled = False
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        scheduler = super().from_crawler(crawler)
+        if scheduler.dqdir is None and crawler.settings.getbool(
+            "SCHEDULER_SPILL_TO_DISK"
+        ):
+            scheduler.tmpdir = tempfile.mkdtemp(prefix="manga_scraper_queue_")
+            scheduler.dqdir = scheduler._dqdir(scheduler.tmpdir)
+            logger.info(f"Spilling queued requests to {scheduler.tmpdir}")
+        scheduler.max_pending_chapters = crawler.settings.getint(
+            "BACKPRESSURE_MAX_PENDING_CHAPTERS"
+        )
+        return scheduler
+
+    @property
+    def pending_chapters(self):
+        """Chapter requests queued here or still in the downloader."""
+        downloader = self.crawler.engine.downloader
+        # Requests stay in downloader.active until fetch() completes, on
+        # every path, so nothing has to be counted back out by signal
+        active = sum("chapter_id" in r.meta for r in downloader.active)
+        return self.queued_chapters + active
+
+    def enqueue_request(self, request):
+        queued = super().enqueue_request(request)
+        if queued and self.max_pending_chapters and "chapter_id" in request.meta:
+            self.queued_chapters += 1
+            pending = self.pending_chapters
+            self.stats.max_value("backpressure/pending_chapters_max", pending)
+            if pending > self.max_pending_chapters:
+                self.throttled = True
+        return queued
+
+    def next_request(self):
+        if self.throttled:
+            if self.pending_chapters <= self.max_pending_chapters // 2:
+                self.throttled = False
+            elif not self._chapter_is_next():
+                # Not an error: the engine asks again as chapters finish
+                self.stats.inc_value("backpressure/held_back", spider=self.spider)
+                return None
+        request = super().next_request()
+        if (
+            request is not None
+            and self.max_pending_chapters
+            and "chapter_id" in request.meta
+            and self.queued_chapters
+        ):
+            self.queued_chapters -= 1
+        return request
+
+    def _chapter_is_next(self):
+        """Whether next_request would return a chapter request (or nothing)."""
+        try:
+            if len(self.mqs):
+                request = self.mqs.peek()
+            else:
+                request = self.dqs.peek() if self.dqs else None
+        except NotImplementedError:
+            return True  # Queue class cannot peek; never hold anything back
+        return request is None or "chapter_id" in request.meta
+
+    def close(self, reason):
+        result = super().close(reason)
+        if self.tmpdir is not None:
+            shutil.rmtree(self.tmpdir, ignore_errors=True)
+        return result
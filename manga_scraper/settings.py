@@ -49,12 +49,31 @@ ROBOTSTXT_OBEY = False
 # SPIDER_MIDDLEWARES = {
 #    "manga_scraper.middlewares.manga_scraperSpiderMiddleware": 543,
 # }
+SPIDER_MIDDLEWARES = {
+    # Skips chapters already stored when the spider runs with incremental=true
+    "manga_scraper.middlewares.DeltaCrawlMiddleware": 600,
+    # Queue chapter requests in / claim them from the shared frontier; runs
+    # after DeltaCrawlMiddleware so stored chapters are never queued
+    "manga_scraper.middlewares.FrontierMiddleware": 550,
+}
 
 # Enable or disable downloader middlewares
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
 # DOWNLOADER_MIDDLEWARES = {
 # "manga_scraper.middlewares.manga_scraperDownloaderMiddleware": 543,
 # }
+DOWNLOADER_MIDDLEWARES = {
+    # Per-lane (plain HTTP / Playwright) concurrency and delay control
+    "manga_scraper.middlewares.AdaptiveThrottleMiddleware": 700,
+    # Adaptive render timeouts, fast retries and the deferred retry lane
+    "manga_scraper.middlewares.RenderTimeoutMiddleware": 725,
+    # Assigns renders to recycled contexts; must run before the page pool
+    "manga_scraper.middlewares.BrowserMemoryGovernorMiddleware": 750,
+    # Reuses warm Playwright pages for chapter renders
+    "manga_scraper.middlewares.PagePoolMiddleware": 800,
+    # Serves repeat JS/JSON bundles of renders from ASSET_CACHE_DIR
+    "manga_scraper.middlewares.AssetCacheMiddleware": 850,
+}
 
 # Enable or disable extensions
 # See https://docs.scrapy.org/en/latest/topics/extensions.html
@@ -66,9 +85,56 @@ ROBOTSTXT_OBEY = False
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
 # 图片存储设置
 IMAGES_STORE = "./downloads"
+# PageImageDownloadPipeline: page images are fetched over plain HTTP in their
+# own download slot and stored as IMAGES_STORE/ab/cd/<sha256>.<ext>
+IMAGES_DOWNLOAD_ENABLED = True
+IMAGES_DOWNLOAD_SLOT = "page-images"
+IMAGES_CONCURRENCY = 32
+# Don't re-download an image URL already stored, and link new images within
+# IMAGES_PHASH_DISTANCE bits (of a 64-bit dHash) of a stored image of the
+# same size to that file instead of keeping a copy, once their 64x64
+# greyscale downscales differ by at most IMAGES_PIXEL_TOLERANCE (0-255) per
+# pixel on average
+IMAGES_DEDUP_ENABLED = True
+IMAGES_PHASH_DISTANCE = 3
+IMAGES_PIXEL_TOLERANCE = 0.5
+# PageRenditionPipeline: WebP copy and fixed-width thumbnail of every
+# downloaded page, stored next to the original and made in a pool of
+# RENDITION_PROCESSES worker processes (0: one per CPU core). The pool is
+# shared by all crawls of a process, e.g. every task of the crawl worker.
+RENDITIONS_ENABLED = True
+RENDITION_WEBP_QUALITY = 80
+RENDITION_THUMBNAIL_WIDTH = 320
+RENDITION_PROCESSES = 0
+# Image store quota (0 disables). The API evicts least recently read
+# chapters every STORAGE_EVICTION_INTERVAL seconds once IMAGES_STORE is over
+# quota, down to STORAGE_EVICTION_TARGET x quota. Chapters with pages written
+# or read in the last STORAGE_EVICTION_MIN_AGE seconds, queued in the
+# frontier, or leased by a running crawl are kept. Evicted pages are
+# re-fetched when read.
+STORAGE_QUOTA_BYTES = 20 * 1024**3
+STORAGE_EVICTION_TARGET = 0.9
+STORAGE_EVICTION_INTERVAL = 600
+STORAGE_EVICTION_MIN_AGE = 3600
+STORAGE_EVICTION_BATCH = 50  # Chapters picked per LRU query
+# Crawls lease the chapters whose stored images they link or package for
+# this long, renewed while they run (chapters.in_use_until)
+STORAGE_CHAPTER_LEASE = 1800
+# ChapterPackagingPipeline: once every page of a chapter is downloaded, build
+# PACKAGES_STORE/<manga_id>/<chapter_id>.cbz (and .pdf with "pdf" in
+# PACKAGING_FORMATS) in a pool of PACKAGING_PROCESSES worker processes,
+# shared by all crawls of a process like the rendition pool.
+PACKAGING_ENABLED = True
+PACKAGING_FORMATS = ["cbz"]
+PACKAGING_PROCESSES = 2
+PACKAGING_PAGE_WAIT = 600  # Seconds a chapter waits for its page downloads
+PACKAGES_STORE = "./packages"
 
 ITEM_PIPELINES = {
     "manga_scraper.pipelines.data_cleaning.MangaDataCleaningPipeline": 100,
+    "manga_scraper.pipelines.image_download.PageImageDownloadPipeline": 150,
+    "manga_scraper.pipelines.renditions.PageRenditionPipeline": 160,
+    "manga_scraper.pipelines.packaging.ChapterPackagingPipeline": 175,
     "manga_scraper.pipelines.postgres_pipeline.PostgreSQLPipeline": 200,
 }
 # Enable and configure the AutoThrottle extension (disabled by default)
@@ -113,18 +179,134 @@ PLAYWRIGHT_LAUNCH_OPTIONS = {
 
 BASE_URL = "https://mangapark.io"
 
+# Try to read chapter image lists from the plain HTTP response first and only
+# render the chapter in Playwright when that finds nothing.
+CHAPTER_HTTP_FAST_PATH = True
+
+# Search result pages are fetched concurrently once the first page reveals
+# the page count. Either cap stops the crawl early; 0 disables a cap.
+# Both can be overridden per crawl with -a max_pages=N / -a max_results=N.
+SEARCH_MAX_PAGES = 10
+SEARCH_MAX_RESULTS = 0
+
+
+# Every task crawls with JOBDIR=<TASK_JOBS_DIR>/<task_id> (disk request
+# queue, dupefilter, spider state) so /tasks/resume/{task_id} can continue
+# it after a stop or crash. Removed once the task finishes.
+TASK_JOBS_DIR = "jobs"
+
+# Crawl dispatch. With CRAWL_WORKER_ENABLED the API only queues tasks and a
+# resident worker (python -m manga_scraper.worker) runs them in-process,
+# skipping interpreter/Scrapy/Chromium startup for every task.
+CRAWL_WORKER_ENABLED = False
+WORKER_MAX_JOBS = 2  # Crawls running at once in one worker
+WORKER_POLL_INTERVAL = 5  # Fallback poll (s); new jobs arrive via NOTIFY
+# Keep one browser up between jobs and let crawls connect to it over CDP
+# (0 lets every crawl launch its own)
+WORKER_BROWSER_CDP_PORT = 9222
+
+
+# Keep queued requests on disk (a temp dir unless JOBDIR is set) and pop them
+# FIFO by priority: every queued chapter goes before any new manga page, and
+# mangas are finished one at a time in discovery order, newest chapter first.
+SCHEDULER = "manga_scraper.scheduler.SpillingScheduler"
+SCHEDULER_SPILL_TO_DISK = True
+SCHEDULER_DISK_QUEUE = "scrapy.squeues.PickleFifoDiskQueue"
+SCHEDULER_MEMORY_QUEUE = "scrapy.squeues.FifoMemoryQueue"
+MANGA_PAGE_PRIORITY = 10
+CHAPTER_PAGE_PRIORITY = 20
+# Chapters of the Nth manga found get CHAPTER_PAGE_PRIORITY + SPAN - N, so
+# only the first SPAN mangas of a crawl are ordered depth-first
+CHAPTER_PRIORITY_SPAN = 1000
+# The scheduler only hands out chapter requests while more chapters than
+# this are pending, until half of them are done (0 disables)
+BACKPRESSURE_MAX_PENDING_CHAPTERS = 500
+
+# Distributed chapter rendering (chapter_frontier table): consumers claim
+# this many chapters at a time and hold them under a lease they renew
+# while rendering; claims of crashed workers return after the lease expires.
+FRONTIER_BATCH_SIZE = 16
+# Consumers claim more as soon as fewer chapters than this are in flight
+FRONTIER_LOW_WATER = 4
+FRONTIER_LEASE_SECONDS = 600
+
 
 # 提高并发请求数
-CONCURRENT_REQUESTS = 16
+# Global cap; per-lane limits come from ADAPTIVE_THROTTLE_LANES below
+CONCURRENT_REQUESTS = 24
 CONCURRENT_REQUESTS_PER_DOMAIN = 8
 
 # Playwright专用设置
 PLAYWRIGHT_MAX_PAGES_PER_CONTEXT = 8
 PLAYWRIGHT_MAX_CONTEXTS = 4
+# Pooled chapter pages are closed after serving this many renders
+PLAYWRIGHT_PAGE_MAX_USES = 50
+
+# Render timeouts (seconds) follow recent render latencies: MULTIPLIER x the
+# PERCENTILE of the last WINDOW renders, clamped to [MIN, MAX]. Timed-out
+# renders get RENDER_RETRY_TIMES retries with exponential backoff, then wait
+# in a deferred lane that runs after the main crawl.
+RENDER_TIMEOUT_INITIAL = 120
+RENDER_TIMEOUT_MIN = 30
+RENDER_TIMEOUT_MAX = 600
+RENDER_TIMEOUT_PERCENTILE = 95
+RENDER_TIMEOUT_MULTIPLIER = 3
+RENDER_TIMEOUT_WINDOW = 50
+RENDER_RETRY_TIMES = 2
+RENDER_RETRY_BACKOFF = 5
+
+# Browser memory governor: move renders to a fresh context after
+# BROWSER_CONTEXT_MAX_PAGES renders or once Chromium RSS passes
+# BROWSER_MAX_RSS_MB; restart the browser past BROWSER_RESTART_RSS_MB.
+BROWSER_CONTEXT_MAX_PAGES = 500
+BROWSER_MAX_RSS_MB = 2048
+BROWSER_RESTART_RSS_MB = 4096
+BROWSER_MEMORY_CHECK_INTERVAL = 30  # seconds
+
+# Local cache for JS/JSON bundles requested by rendered pages
+ASSET_CACHE_DIR = ".asset_cache"
+ASSET_CACHE_MAX_BYTES = 200 * 1024 * 1024
+ASSET_CACHE_TTL = 86400  # seconds before an entry is revalidated
+# Third-party hosts (and their subdomains) never loaded during renders
+PLAYWRIGHT_BLOCKED_DOMAINS = [
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "adservice.google.com",
+    "cloudflareinsights.com",
+]
+# Take the chapter image list from network responses as soon as it appears
+# instead of waiting for the image elements; falls back to the DOM selector
+# if nothing is captured within PLAYWRIGHT_CAPTURE_TIMEOUT (ms).
+PLAYWRIGHT_CAPTURE_RESPONSES = False
+PLAYWRIGHT_CAPTURE_TIMEOUT = 15000
 
 
 MEDIA_ALLOW_REDIRECTS = True
-DOWNLOAD_DELAY = 2
+# Per-slot delays and concurrency are managed by AdaptiveThrottleMiddleware,
+# with separate lanes for plain HTTP fetches and Playwright renders.
+ADAPTIVE_THROTTLE_ENABLED = True
+ADAPTIVE_THROTTLE_LANES = {
+    "http": {
+        "start_concurrency": 8,
+        "min_concurrency": 1,
+        "max_concurrency": 16,
+        "start_delay": 0.5,
+        "min_delay": 0,
+        "max_delay": 30,
+        "target_latency": 2.0,  # seconds
+    },
+    "render": {
+        "start_concurrency": 4,
+        "min_concurrency": 1,
+        "max_concurrency": 8,
+        "start_delay": 1.0,
+        "min_delay": 0.25,
+        "max_delay": 60,
+        "target_latency": 30.0,  # seconds
+    },
+}
 PLAYWRIGHT_ABORT_REQUEST = lambda req: req.resource_type in {
     "font",
     "stylesheet",
@@ -138,6 +320,14 @@ POSTGRESQL_PASSWORD = "wsdfr_manga_db"  # Database password (empty if no passwor
 POSTGRESQL_HOST = "localhost"  # Database host
 POSTGRESQL_PORT = "5432"  # Database port
 
+# Bulk writer: buffer items and flush them with COPY + set-based upserts.
+# Set POSTGRESQL_BATCH_SIZE to 0 to write (and commit) every item on its own.
+POSTGRESQL_BATCH_SIZE = 500  # Flush once this many rows are buffered
+POSTGRESQL_FLUSH_INTERVAL = 5  # Flush at least every N seconds
+# Writes run on a dedicated thread; at most this many may be queued before
+# the pipeline stops accepting items (backpressure on the crawl).
+POSTGRESQL_MAX_INFLIGHT = 4
+
 
 import os
 from dotenv import load_dotenv
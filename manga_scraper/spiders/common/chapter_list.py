@@ -0,0 +1,46 @@
+# manga_scraper/spiders/common/chapter_list.py
+from lxml import etree
+from parsel.csstranslator import HTMLTranslator
+
+CHAPTER_NODE_CSS = "div[data-name='chapter-list'] [q\\:key='8t_8']"
+CHAPTER_TEXT_KEY = "8t_1"
+
+# Compiled once at import instead of on every .css() call
+_chapter_nodes = etree.XPath(HTMLTranslator().css_to_xpath(CHAPTER_NODE_CSS))
+
+
+def _first_text(element):
+    """First text node directly inside element, like parsel's ``::text``."""
+    if element.text is not None:
+        return element.text
+    for child in element:
+        if child.tail is not None:
+            return child.tail
+    return None
+
+
+def extract_chapter_list(response):
+    """
+    Extract the chapter list of a manga page in a single pass.
+
+    Equivalent to running ``a::attr(href)``, ``a::text`` and
+    ``span[q:key='8t_1']::text`` on every chapter node, but walks each node
+    once on the raw lxml tree instead of building selectors per query.
+
+    Returns:
+        list: (chapter_url, chapter_number_name, chapter_text_name) tuples
+            in page order; missing values are None
+    """
+    chapters = []
+    for node in _chapter_nodes(response.selector.root):
+        url = number = text = None
+        for element in node.iter("a", "span"):
+            if element.tag == "a":
+                if url is None:
+                    url = element.get("href")
+                if number is None:
+                    number = _first_text(element)
+            elif text is None and element.get("q:key") == CHAPTER_TEXT_KEY:
+                text = _first_text(element)
+        chapters.append((url, number, text))
+    return chapters
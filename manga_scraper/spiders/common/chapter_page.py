@@ -1,12 +1,124 @@
 # manga_scraper/spiders/parse_chapter.py
+import json
 from random import randint, random
-from manga_scraper.items import ChapterPageLinkItem, PageItem
+from manga_scraper.exceptions import RenderRetryScheduled
+from manga_scraper.items import ChapterPageLinkItem, FailedChapterItem, PageItem
+from manga_scraper.utils.chapter_utils import PAGE_IMAGE_URL_RE, find_page_image_urls
+from manga_scraper.utils.page_pool import release_page
+from manga_scraper.utils.playwright_config import get_chapter_page_meta
 
 
-async def parse_chapter_page(response):
+def extract_page_urls(response):
+    """
+    Extract chapter page image URLs from a chapter response.
+
+    Rendered pages expose them as ``image-item`` elements. Plain HTTP
+    responses usually only carry them in the embedded Qwik state
+    (``<script type="qwik/json">``), so fall back to scanning that.
+
+    Returns:
+        list: Page image URLs in reading order (empty if none found)
+    """
+    page_urls = response.css("div[data-name='image-item'] img::attr(src)").getall()
+    if page_urls:
+        return page_urls
+
+    for script in response.css("script[type='qwik/json']::text").getall():
+        try:
+            strings = [
+                o for o in json.loads(script).get("objs", []) if isinstance(o, str)
+            ]
+        except (ValueError, AttributeError):
+            strings = find_page_image_urls(script)
+        page_urls = [s for s in strings if PAGE_IMAGE_URL_RE.fullmatch(s)]
+        if page_urls:
+            # Keep the first occurrence of each URL, in document order
+            return list(dict.fromkeys(page_urls))
+    return []
+
+
+def failed_chapter_item(meta, url, error_class, error_message):
+    """Build the dead-letter record for a chapter that could not be scraped."""
+    return FailedChapterItem(
+        manga_id=meta["manga_id"],
+        chapter_id=meta["chapter_id"],
+        chapter_url=url,
+        error_class=error_class,
+        error_message=error_message,
+    )
+
+
+async def parse_chapter_page(spider, response):
+    try:
+        async for item in _parse_chapter_page(spider, response):
+            yield item
+    except Exception as e:
+        spider.crawler.stats.inc_value("dead_letter/chapters")
+        yield failed_chapter_item(response.meta, response.url, type(e).__name__, str(e))
+        raise
+    finally:
+        # Return the page to the pool even if parsing failed
+        await release_page(spider, response.meta)
+
+
+async def errback_chapter_page(spider, failure):
+    """Log a failed chapter request, dead-letter it and release its page."""
+    request = failure.request
+    if failure.check(RenderRetryScheduled):
+        spider.logger.debug(f"Chapter {request.meta.get('chapter_id')} will be retried")
+    else:
+        spider.logger.error(
+            f"Chapter {request.meta.get('chapter_id')} failed: "
+            f"{failure.getErrorMessage()}"
+        )
+        if "chapter_id" in request.meta:
+            spider.crawler.stats.inc_value("dead_letter/chapters")
+            yield failed_chapter_item(
+                request.meta,
+                request.url,
+                failure.type.__name__,
+                failure.getErrorMessage(),
+            )
+    page = request.meta.get("playwright_page")
+    if page is not None:
+        # A page whose render failed is in an unknown state; don't reuse it
+        pool = getattr(spider, "page_pool", None)
+        if pool is not None:
+            await pool.discard(page)
+        elif not page.is_closed():
+            await page.close()
+
+
+async def _parse_chapter_page(spider, response):
     chapter_id = response.meta["chapter_id"]
     manga_id = response.meta["manga_id"]
-    page_urls = response.css("div[data-name='image-item'] img::attr(src)").getall()
+    capture = response.meta.get("chapter_image_capture")
+    if capture and capture.page_urls:
+        page_urls = capture.page_urls
+    else:
+        page_urls = extract_page_urls(response)
+    rendered = bool(response.meta.get("playwright"))
+
+    if not page_urls and not rendered:
+        # Fast path found nothing, render the chapter in the browser instead
+        spider.crawler.stats.inc_value("chapter_path/playwright_fallback")
+        spider.logger.debug(f"Chapter {chapter_id}: no pages over HTTP, rendering")
+        yield response.request.replace(
+            meta=get_chapter_page_meta(
+                manga_id=manga_id, chapter_id=chapter_id, settings=spider.settings
+            ),
+            dont_filter=True,
+        )
+        return
+
+    if not rendered:
+        path = "http"
+    elif capture and capture.page_urls:
+        path = "playwright_capture"
+    else:
+        path = "playwright"
+    spider.crawler.stats.inc_value(f"chapter_path/{path}")
+    spider.logger.debug(f"Chapter {chapter_id}: {len(page_urls)} pages via {path}")
 
     for idx, url in enumerate(page_urls, start=1):
         yield PageItem(
@@ -16,12 +128,18 @@ async def parse_chapter_page(response):
             page_url=url,
         )
 
-        yield ChapterPageLinkItem(
-            manga_id=manga_id,
-            chapter_id=chapter_id,
-            page_id=idx,
-            total_pages=len(page_urls),
+    if not page_urls:
+        # Rendered but still no images; keep it for a later re-dispatch
+        spider.logger.warning(f"Chapter {chapter_id}: no pages found after render")
+        spider.crawler.stats.inc_value("dead_letter/chapters")
+        yield failed_chapter_item(
+            response.meta, response.url, "NoPagesFound", "No page images found"
         )
+        return
 
-    if "playwright_page" in response.meta:
-        await response.meta["playwright_page"].close()
+    # One aggregate count per chapter instead of one per page
+    yield ChapterPageLinkItem(
+        manga_id=manga_id,
+        chapter_id=chapter_id,
+        total_pages=len(page_urls),
+    )
@@ -1,37 +1,71 @@
 # manga_scraper/spiders/parse_manga.py
 from random import randint
+from urllib.parse import urlparse
 from manga_scraper.items import ChapterItem, MangaChapterLinkItem, MangaItem
+from manga_scraper.spiders.common.chapter_list import extract_chapter_list
 
 from manga_scraper.utils.playwright_config import get_chapter_page_meta
-from .chapter_page import parse_chapter_page
 
 
-def parse_manga_page(response):
+def manga_rank(spider, manga_id):
+    """Discovery order of a manga in this crawl (0 for the first)."""
+    return spider.manga_order.setdefault(manga_id, len(spider.manga_order))
+
+
+def chapter_priority(spider, manga_id):
+    """
+    Priority of a manga's chapter requests, highest for the first manga found.
+
+    Queues are FIFO within one priority, so a manga's chapters also keep
+    chapter-list order (newest first), and each manga is finished before
+    the next one's chapters start. Mangas past CHAPTER_PRIORITY_SPAN share
+    CHAPTER_PAGE_PRIORITY.
+    """
+    span = spider.settings.getint("CHAPTER_PRIORITY_SPAN")
+    base = spider.settings.getint("CHAPTER_PAGE_PRIORITY")
+    return base + max(span - manga_rank(spider, manga_id), 0)
+
+
+def parse_manga_page(spider, response):
     manga_id = response.meta["manga_id"]
-    chapters = response.css("div[data-name='chapter-list'] [q\\:key='8t_8']")
+    chapters = extract_chapter_list(response)
 
-    for chapter in chapters:
-        chapter_url = chapter.css("a::attr(href)").get()
+    # Manga ids given directly have no search hit to store the manga from
+    if response.meta.get("manga_item"):
+        title = response.css("meta[property='og:title']::attr(content)").get()
+        yield MangaItem(
+            manga_id=manga_id,
+            manga_name=(title or response.css("h3 a::text").get() or manga_id).strip(),
+            manga_url=urlparse(response.url).path,
+        )
+
+    priority = chapter_priority(spider, manga_id)
+    for chapter_url, number_name, text_name in chapters:
         chapter_id = chapter_url.split("/")[-1]
 
         yield ChapterItem(
             manga_id=manga_id,
             chapter_id=chapter_id,
             chapter_url=chapter_url,
-            chapter_number_name=chapter.css("a::text").get(),
-            chapter_text_name=chapter.css("span[q\\:key='8t_1']::text").get(),
-        )
-
-        yield MangaChapterLinkItem(
-            manga_id=manga_id,
-            chapter_id=chapter_id,
-            total_chapters=len(chapters),
+            chapter_number_name=number_name,
+            chapter_text_name=text_name,
         )
 
         # Optionally follow crawling chapters or not
         if response.meta.get("follow_chapters", True):
             yield response.follow(
                 chapter_url,
-                callback=parse_chapter_page,
-                meta=get_chapter_page_meta(manga_id=manga_id, chapter_id=chapter_id),
+                callback=spider.parse_chapter_page,
+                errback=spider.errback_chapter_page,
+                priority=priority,
+                meta=get_chapter_page_meta(
+                    manga_id=manga_id,
+                    chapter_id=chapter_id,
+                    render=not spider.settings.getbool("CHAPTER_HTTP_FAST_PATH"),
+                    settings=spider.settings,
+                ),
             )
+
+    # One aggregate count per manga instead of one per chapter
+    if chapters:
+        yield MangaChapterLinkItem(manga_id=manga_id, total_chapters=len(chapters))
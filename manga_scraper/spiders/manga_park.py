@@ -1,58 +1,234 @@
-from urllib.parse import urljoin, quote
+import json
+import os
+import re
+from urllib.parse import parse_qs, quote, urljoin, urlparse
 import scrapy
 from manga_scraper.items import (
     MangaItem,
     SearchKeywordMangaLinkItem,
 )
 from manga_scraper.settings import BASE_URL
-from .common.manga_page import parse_manga_page
-from .common.chapter_page import parse_chapter_page  # Add this import
+from .common.manga_page import chapter_priority, manga_rank, parse_manga_page
+from .common.chapter_list import extract_chapter_list
+from .common.chapter_page import errback_chapter_page, parse_chapter_page
 from manga_scraper.utils.playwright_config import get_chapter_page_meta
 
 
+# "1,234 results" / "Results: 1234" in the search page header
+SEARCH_RESULT_COUNT = re.compile(
+    r"(?:([\d,.]+)\s+(?:results?|comics|titles)\b|results?\s*:\s*([\d,.]+))",
+    re.IGNORECASE,
+)
+
+
 class MangaParkSpider(scrapy.Spider):
     name = "manga_park"
 
+    # Shared callbacks, bound as spider methods so they can reach stats/settings
+    parse_manga_page = parse_manga_page
+    parse_chapter_page = parse_chapter_page
+    errback_chapter_page = errback_chapter_page
+
     def __init__(
         self,
         search_term=None,
         mode="search_all",
         manga_id=None,
         chapter_ids=None,
+        search_terms=None,
+        manga_ids=None,
+        input_file=None,
+        incremental=False,
+        task_id=None,
+        distributed=False,
+        frontier_task=None,
+        max_pages=None,
+        max_results=None,
         **kwargs,
     ):
         super().__init__(**kwargs)
-        self.mode = mode  # search_all | search_only | chapters_only | chapters_select
-        self.search_term = search_term
-        self.manga_id = manga_id
+        # search_all | search_only | chapters_only | chapters_select | frontier
+        self.mode = mode
+        # Single values, comma-separated lists and a JSON input file
+        # ({"search_terms": [...], "manga_ids": [...]}) can be combined
+        self.search_terms = [search_term] if search_term else []
+        self.search_terms += search_terms.split(",") if search_terms else []
+        self.manga_ids = [manga_id] if manga_id else []
+        self.manga_ids += manga_ids.split(",") if manga_ids else []
+        self.input_batch = self._load_input_file(input_file) if input_file else {}
+        self._add_batch(self.input_batch)
         self.chapter_ids = chapter_ids.split(",") if chapter_ids else []
+        # Skip chapters already stored (see DeltaCrawlMiddleware)
+        self.incremental = str(incremental).lower() in ("true", "1", "yes")
+        # Queue chapters in chapter_frontier instead of rendering them, and
+        # render chapters claimed from another task's frontier (FrontierMiddleware)
+        self.task_id = task_id
+        self.distributed = str(distributed).lower() in ("true", "1", "yes")
+        self.frontier_task = frontier_task
+        self.max_pages = max_pages
+        self.max_results = max_results
+        # keyword -> search progress, see parse_search_page
+        self.searches = {}
+        # Mangas whose chapter list is already scheduled, shared by all
+        # keywords and manga ids of this crawl
+        self.seen_manga_ids = set()
+        # manga_id -> discovery order; earlier mangas' chapters go first
+        self.manga_order = {}
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        # Spider arguments win over settings
+        spider.max_pages = int(
+            spider.max_pages or crawler.settings.getint("SEARCH_MAX_PAGES")
+        )
+        spider.max_results = int(
+            spider.max_results or crawler.settings.getint("SEARCH_MAX_RESULTS")
+        )
+        return spider
+
+    def _load_input_file(self, path):
+        """Read a batch file and delete it; it is only needed once."""
+        try:
+            with open(path, encoding="utf-8") as f:
+                batch = json.load(f)
+        except FileNotFoundError:
+            return {}  # Resumed crawl: the batch is in the spider state
+        os.remove(path)
+        return batch
+
+    def _add_batch(self, batch):
+        self.search_terms += batch.get("search_terms", [])
+        self.manga_ids += batch.get("manga_ids", [])
+        self.search_terms = list(
+            dict.fromkeys(t.strip() for t in self.search_terms if t.strip())
+        )
+        self.manga_ids = list(
+            dict.fromkeys(m.strip() for m in self.manga_ids if m.strip())
+        )
+
+    def search_url(self, keyword, page=1):
+        url = f"{BASE_URL}/search?word={quote(keyword)}&sortby=field_follow"
+        return url if page == 1 else f"{url}&page={page}"
 
     def start_requests(self):
         # Mode: search_all → crawl full manga + chapters + images
         # Mode: search_only → only fetch search results (manga list)
-        if self.mode in ["search_all", "search_only"] and self.search_term:
-            url = (
-                f"{BASE_URL}/search?word={quote(self.search_term)}&sortby=field_follow"
-            )
-            yield scrapy.Request(url, callback=self.parse_search_page)
-
         # Mode: chapters_only → fetch all chapters for a manga
         # Mode: chapters_select → fetch selected chapters only
-        elif self.mode in ["chapters_only", "chapters_select"] and self.manga_id:
-            url = f"{BASE_URL}/comic/{self.manga_id}"
-            yield scrapy.Request(
-                url,
-                callback=self.parse_chapters_for_manga,
-                meta={"manga_id": self.manga_id},
-            )
-        else:
+        # In a batch, manga ids are crawled in search_all mode as well.
+        # Mode: frontier → render chapters claimed from frontier_task's queue
+        if self.mode == "frontier":
+            if not self.frontier_task:
+                self.logger.error("Missing frontier_task for frontier mode.")
+            return
+
+        # With a JOBDIR, SpiderState persists self.state across restarts; keep
+        # search progress there so a resumed crawl picks up where it stopped
+        state = getattr(self, "state", {})
+        self.searches = state.setdefault("searches", self.searches)
+        self.seen_manga_ids = state.setdefault("seen_manga_ids", self.seen_manga_ids)
+        self.manga_order = state.setdefault("manga_order", self.manga_order)
+        # The input file is gone after the first run; resume from its copy
+        batch = state.setdefault("input_batch", self.input_batch)
+        if batch is not self.input_batch:
+            self._add_batch(batch)
+
+        search_mode = self.mode in ["search_all", "search_only"]
+        manga_mode = self.mode in ["search_all", "chapters_only", "chapters_select"]
+        if not (search_mode and self.search_terms or manga_mode and self.manga_ids):
             self.logger.error("Missing required parameters.")
+            return
+
+        if manga_mode:
+            for manga_id in self.manga_ids:
+                self.seen_manga_ids.add(manga_id)
+                manga_rank(self, manga_id)
+                if self.mode == "search_all":
+                    # Full crawl: store the manga and its chapters, as for a
+                    # search hit, so the chapter and page rows have parents
+                    callback = self.parse_manga_page
+                    meta = {
+                        "manga_id": manga_id,
+                        "follow_chapters": True,
+                        "manga_item": True,
+                    }
+                else:
+                    callback = self.parse_chapters_for_manga
+                    meta = {"manga_id": manga_id}
+                yield scrapy.Request(
+                    f"{BASE_URL}/comic/{manga_id}",
+                    callback=callback,
+                    priority=self.settings.getint("MANGA_PAGE_PRIORITY"),
+                    meta=meta,
+                )
+
+        if search_mode:
+            for keyword in self.search_terms:
+                if keyword in self.searches:
+                    continue  # Resumed; its remaining pages are in the queue
+                self.searches[keyword] = {
+                    "per_page": None,
+                    "total_hits": None,
+                    "pending": {1},
+                    "manga_ids": {},
+                }
+                yield scrapy.Request(
+                    self.search_url(keyword),
+                    callback=self.parse_search_page,
+                    errback=self.errback_search_page,
+                    meta={"keyword": keyword, "search_page": 1},
+                )
 
     def parse_search_page(self, response):
+        """
+        Parse one page of search results.
+
+        The first page tells us how many result pages there are; the rest
+        (up to the max_pages / max_results caps) are requested at once.
+        Results are numbered by page so the max_results cap keeps the same
+        mangas no matter in which order the pages come back. The keyword's
+        SearchKeywordMangaLinkItems are emitted once its last page is done.
+        Their total_hits is the site's result count (or last page x page
+        size when the page does not state it), not the capped number
+        collected, which goes to the ``search/<keyword>/collected`` stat.
+        """
+        keyword = response.meta["keyword"]
+        page = response.meta["search_page"]
+        state = self.searches[keyword]
         manga_list = response.css("div.flex.border-b.border-b-base-200.pb-5")
-        for manga in manga_list:
+
+        if page == 1:
+            state["per_page"] = len(manga_list)
+            last_page = self._search_page_count(response)
+            # Hits on the site, not just the ones the caps let us collect
+            state["total_hits"] = self._search_result_count(response) or (
+                last_page * len(manga_list)
+            )
+            if self.max_pages:
+                last_page = min(last_page, self.max_pages)
+            if self.max_results and manga_list:
+                last_page = min(last_page, -(-self.max_results // len(manga_list)))
+            self.logger.info(f"Search '{keyword}': fetching {last_page} result page(s)")
+            for next_page in range(2, last_page + 1):
+                state["pending"].add(next_page)
+                yield scrapy.Request(
+                    self.search_url(keyword, next_page),
+                    callback=self.parse_search_page,
+                    errback=self.errback_search_page,
+                    meta={"keyword": keyword, "search_page": next_page},
+                )
+
+        offset = (page - 1) * (state["per_page"] or len(manga_list))
+        for position, manga in enumerate(manga_list, start=offset):
+            if self.max_results and position >= self.max_results:
+                self.crawler.stats.inc_value("search/results_capped")
+                break
             manga_url = manga.css("h3 a::attr(href)").get()
             manga_id = manga_url.split("/")[-1]
+            if manga_id in state["manga_ids"]:
+                continue  # Listings can shift between page requests
+            state["manga_ids"][manga_id] = position
 
             yield MangaItem(  # Store basic manga info
                 manga_name=manga.css('span[q\\:key="Ts_1"]')
@@ -65,29 +241,74 @@ class MangaParkSpider(scrapy.Spider):
                     'div[id^="comic-follow-swap-"] span::text'
                 ).get(),
             )
-            yield SearchKeywordMangaLinkItem(
-                keyword=self.search_term,
-                manga_id=manga_id,
-                total_mangas=len(manga_list),
-            )
 
-            # Only follow manga page if mode is search_all
-            if self.mode == "search_all":
+            # Only follow manga page if mode is search_all, once per crawl
+            if self.mode == "search_all" and manga_id not in self.seen_manga_ids:
+                self.seen_manga_ids.add(manga_id)
+                manga_rank(self, manga_id)
                 yield scrapy.Request(
                     urljoin(response.url, manga_url),
-                    callback=parse_manga_page,
+                    callback=self.parse_manga_page,
+                    priority=self.settings.getint("MANGA_PAGE_PRIORITY"),
                     meta={"manga_id": manga_id, "follow_chapters": True},
                 )
 
+        self.crawler.stats.inc_value("search/pages")
+        yield from self._finish_search_page(keyword, page)
+
+    def errback_search_page(self, failure):
+        meta = failure.request.meta
+        self.logger.error(
+            f"Search '{meta['keyword']}' page {meta['search_page']} failed: "
+            f"{failure.getErrorMessage()}"
+        )
+        yield from self._finish_search_page(meta["keyword"], meta["search_page"])
+
+    def _finish_search_page(self, keyword, page):
+        state = self.searches[keyword]
+        state["pending"].discard(page)
+        if state["pending"]:
+            return
+        collected = len(state["manga_ids"])
+        # No count when page 1 failed; never report fewer than were found
+        total_hits = max(state.get("total_hits") or 0, collected)
+        self.crawler.stats.set_value(f"search/{keyword}/total_hits", total_hits)
+        self.crawler.stats.set_value(f"search/{keyword}/collected", collected)
+        for manga_id in state["manga_ids"]:
+            yield SearchKeywordMangaLinkItem(
+                keyword=keyword, manga_id=manga_id, total_mangas=total_hits
+            )
+
+    def _search_result_count(self, response):
+        """Result count the search page states ("1,234 results"), or None."""
+        text = " ".join(
+            response.xpath(
+                "//body//text()[not(ancestor::script or ancestor::style)]"
+                "[normalize-space()]"
+            ).getall()
+        )
+        match = SEARCH_RESULT_COUNT.search(text)
+        if match is None:
+            return None
+        digits = re.sub(r"\D", "", match.group(1) or match.group(2))
+        return int(digits) if digits else None
+
+    def _search_page_count(self, response):
+        """Highest page number linked from the search pagination (at least 1)."""
+        pages = [1]
+        for href in response.css("a[href*='page=']::attr(href)").getall():
+            value = parse_qs(urlparse(href).query).get("page", [""])[0]
+            if value.isdigit():
+                pages.append(int(value))
+        return max(pages)
+
     def parse_chapters_for_manga(self, response):
         """
         Called when mode is chapters_only or chapters_select.
         """
         manga_id = response.meta["manga_id"]
-        chapters = response.css("div[data-name='chapter-list'] [q\\:key='8t_8']")
-
-        for chapter in chapters:
-            chapter_url = chapter.css("a::attr(href)").get()
+        priority = chapter_priority(self, manga_id)
+        for chapter_url, _, _ in extract_chapter_list(response):
             chapter_id = chapter_url.split("/")[-1]
 
             if self.mode == "chapters_select" and chapter_id not in self.chapter_ids:
@@ -95,6 +316,13 @@ class MangaParkSpider(scrapy.Spider):
 
             yield response.follow(
                 chapter_url,
-                callback=parse_chapter_page,
-                meta=get_chapter_page_meta(manga_id=manga_id, chapter_id=chapter_id),
+                callback=self.parse_chapter_page,
+                errback=self.errback_chapter_page,
+                priority=priority,
+                meta=get_chapter_page_meta(
+                    manga_id=manga_id,
+                    chapter_id=chapter_id,
+                    render=not self.settings.getbool("CHAPTER_HTTP_FAST_PATH"),
+                    settings=self.settings,
+                ),
             )
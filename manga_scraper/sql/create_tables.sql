@@ -11,9 +11,58 @@ CREATE TABLE users (
 CREATE TABLE IF NOT EXISTS tasks (
     task_id VARCHAR PRIMARY KEY,         -- Unique task identifier (UUID)
     cmd TEXT NOT NULL,                   -- Command line used to launch the task
-    status VARCHAR NOT NULL DEFAULT 'running',  -- Task status: running, finished, failed, terminated
+    status VARCHAR NOT NULL DEFAULT 'running',  -- Task status: queued, running, finished, failed, terminated
     start_time TIMESTAMPTZ NOT NULL DEFAULT NOW(),  -- Task start timestamp with timezone
     end_time TIMESTAMPTZ,                -- Task end timestamp, null if not finished yet
     pid INTEGER,                        -- Process ID of the running task (optional)
-    is_admin_only BOOLEAN DEFAULT TRUE  -- Whether only admins can manage this task
+    is_admin_only BOOLEAN DEFAULT TRUE, -- Whether only admins can manage this task
+    spider_args TEXT                    -- JSON spider arguments of jobs run by the crawl worker
+);
+
+-- Existing databases: add the crawl worker columns
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS spider_args TEXT;
+
+-- The crawl worker claims the oldest queued task
+CREATE INDEX IF NOT EXISTS tasks_queued_idx ON tasks (start_time) WHERE status = 'queued';
+
+-- Dead-letter queue: chapters whose render or parse failed (cleared on success)
+CREATE TABLE IF NOT EXISTS failed_chapters (
+    chapter_id TEXT PRIMARY KEY,         -- Chapter that failed
+    manga_id TEXT,                       -- Owning manga, used to re-dispatch
+    url TEXT,                            -- Chapter URL that was requested
+    error_class TEXT,                    -- Exception class name of the last failure
+    last_error TEXT,                     -- Last error message
+    attempts INTEGER DEFAULT 1,          -- Number of failed attempts
+    first_error_at TIMESTAMPTZ DEFAULT NOW(),  -- First failure timestamp
+    last_error_at TIMESTAMPTZ DEFAULT NOW()    -- Most recent failure timestamp
+);
+
+-- Dead-lettered bulk rows: rows the database rejected during a bulk flush
+CREATE TABLE IF NOT EXISTS failed_rows (
+    id SERIAL PRIMARY KEY,
+    table_name TEXT,                     -- Bulk buffer the row belonged to
+    row_data TEXT,                       -- Row values as JSON
+    error TEXT,                          -- Database error
+    failed_at TIMESTAMPTZ DEFAULT NOW()  -- Failure timestamp
+);
+
+-- Chapter frontier: chapters queued by distributed tasks for any render worker
+CREATE TABLE IF NOT EXISTS chapter_frontier (
+    chapter_id TEXT PRIMARY KEY,         -- Chapter to render
+    manga_id TEXT,                       -- Owning manga
+    url TEXT,                            -- Chapter URL
+    task_id TEXT,                        -- Task that discovered the chapter
+    status TEXT DEFAULT 'pending',       -- pending, claimed, done, failed
+    claimed_by TEXT,                     -- Render worker holding the claim
+    lease_expires_at TIMESTAMPTZ,        -- Claim returns to the queue after this
+    attempts INTEGER DEFAULT 0,          -- Number of claims so far
+    updated_at TIMESTAMPTZ DEFAULT NOW() -- Last state change
+);
+CREATE INDEX IF NOT EXISTS chapter_frontier_task_status_idx ON chapter_frontier (task_id, status);
+
+-- Image store counters: page reads served from disk (hits), re-fetched after
+-- eviction (misses), and pages/chapters/bytes evicted to stay under quota
+CREATE TABLE IF NOT EXISTS storage_counters (
+    name VARCHAR PRIMARY KEY,            -- Counter name
+    value BIGINT NOT NULL DEFAULT 0      -- Running total
 );
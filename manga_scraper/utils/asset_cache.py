@@ -0,0 +1,253 @@
+# manga_scraper/utils/asset_cache.py
+import asyncio
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Playwright resource types worth caching (site JS bundles and JSON data)
+CACHEABLE_RESOURCE_TYPES = {"script", "fetch", "xhr"}
+CACHEABLE_CONTENT_TYPES = ("javascript", "json", "ecmascript")
+
+# Headers that no longer describe the decoded body we store
+DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+
+class AssetCache:
+    """
+    Size-bounded, content-addressed disk cache for Playwright sub-resources.
+
+    Bodies are stored once per SHA-256 under ``blobs/``, so cache-busted URLs
+    of an unchanged bundle share one file. ``index.json`` maps URLs to blobs
+    with the response status/headers and timestamps; entries older than
+    ``ttl`` seconds are revalidated with conditional requests. When the
+    blobs exceed ``max_bytes`` the least recently used URLs are dropped.
+
+    Blob files are read and written in threads. Crawls can share the
+    directory: ``save()`` merges this crawl's entries into the index on
+    disk under a file lock instead of overwriting it.
+    """
+
+    def __init__(self, path, max_bytes=200 * 1024 * 1024, ttl=86400):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.index_path = os.path.join(path, "index.json")
+        # URL -> entry, least recently used first
+        self.entries = OrderedDict()
+        self.blob_refs = {}  # blob hash -> number of URLs using it
+        self.total_bytes = 0  # Size of all referenced blobs
+        os.makedirs(os.path.join(path, "blobs"), exist_ok=True)
+        for url, entry in sorted(
+            self._load_index().items(), key=lambda i: i[1]["last_used"]
+        ):
+            self._add(url, entry)
+
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return {}
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable asset cache index: {e}")
+            return {}
+
+    def _add(self, url, entry):
+        self._remove(url)
+        entry["url"] = url  # Lets read()/refresh() move it to the LRU end
+        self.entries[url] = entry
+        digest = entry["hash"]
+        if digest not in self.blob_refs:
+            self.blob_refs[digest] = 0
+            self.total_bytes += entry["size"]
+        self.blob_refs[digest] += 1
+
+    def _remove(self, url):
+        """Drop a URL; returns its blob hash if no other URL uses it."""
+        entry = self.entries.pop(url, None)
+        if entry is None:
+            return None
+        digest = entry["hash"]
+        self.blob_refs[digest] -= 1
+        if self.blob_refs[digest]:
+            return None
+        del self.blob_refs[digest]
+        self.total_bytes -= entry["size"]
+        return digest
+
+    def _blob_path(self, digest):
+        return os.path.join(self.path, "blobs", digest[:2], digest)
+
+    def get(self, url):
+        entry = self.entries.get(url)
+        if entry and not os.path.exists(self._blob_path(entry["hash"])):
+            self._remove(url)
+            return None
+        return entry
+
+    def is_fresh(self, entry):
+        return time.time() - entry["stored_at"] < self.ttl
+
+    async def read(self, entry):
+        self._touch(entry)
+        return await asyncio.to_thread(self._read_blob, entry["hash"])
+
+    def _read_blob(self, digest):
+        with open(self._blob_path(digest), "rb") as f:
+            return f.read()
+
+    def refresh(self, entry):
+        """Mark an entry as revalidated (304 Not Modified)."""
+        self._touch(entry)
+        entry["stored_at"] = entry["last_used"]
+
+    def _touch(self, entry):
+        entry["last_used"] = time.time()
+        self.entries.move_to_end(entry["url"])
+
+    async def put(self, url, status, headers, body):
+        digest = await asyncio.to_thread(self._write_blob, body)
+        now = time.time()
+        self._add(
+            url,
+            {
+                "hash": digest,
+                "size": len(body),
+                "status": status,
+                "headers": {
+                    k: v for k, v in headers.items() if k.lower() not in DROPPED_HEADERS
+                },
+                "stored_at": now,
+                "last_used": now,
+            },
+        )
+        self._evict()
+
+    def _write_blob(self, body):
+        """Store a body under its hash (runs in a thread); returns the hash."""
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Unique temp name: several crawls may store the same bundle
+            tmp_path = f"{path}.{os.getpid()}.{id(body)}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(body)
+            os.replace(tmp_path, path)
+        return digest
+
+    def _evict(self):
+        # Entries are kept in LRU order, so eviction pops from the front
+        while self.total_bytes > self.max_bytes and self.entries:
+            url = next(iter(self.entries))
+            digest = self._remove(url)
+            if digest is not None:
+                try:
+                    os.remove(self._blob_path(digest))
+                except OSError:
+                    pass
+
+    def save(self):
+        """Merge the entries into index.json, keeping other crawls' entries."""
+        with open(f"{self.index_path}.lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            for url, entry in self._load_index().items():
+                mine = self.entries.get(url)
+                if mine is not None and mine["last_used"] >= entry["last_used"]:
+                    continue
+                # Skip entries whose blob was evicted since
+                if os.path.exists(self._blob_path(entry["hash"])):
+                    self._add(url, entry)
+            self.entries = OrderedDict(
+                sorted(self.entries.items(), key=lambda i: i[1]["last_used"])
+            )
+            self._evict()
+            tmp_path = f"{self.index_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_path, self.index_path)
+
+
+def is_blocked(url, blocked_domains):
+    """Check whether a URL's host is (a subdomain of) a blocked domain."""
+    host = urlparse(url).hostname or ""
+    return any(host == d or host.endswith(f".{d}") for d in blocked_domains)
+
+
+def make_route_handler(cache, blocked_domains, stats, meta):
+    """
+    Build a Playwright route handler that serves repeat assets from ``cache``.
+
+    Bytes served from the cache are added to ``meta["asset_cache_bytes"]``
+    so they can be attributed to the Scrapy request being rendered.
+    Anything not handled here falls back to scrapy-playwright's own route.
+    """
+
+    async def _fulfill_from_cache(route, entry):
+        try:
+            body = await cache.read(entry)
+        except OSError:
+            # Evicted by another crawl sharing the cache
+            await route.fallback()
+            return
+        meta["asset_cache_bytes"] = meta.get("asset_cache_bytes", 0) + len(body)
+        stats.inc_value("asset_cache/bytes_saved", len(body))
+        await route.fulfill(status=entry["status"], headers=entry["headers"], body=body)
+
+    async def handle(route, request):
+        if is_blocked(request.url, blocked_domains):
+            stats.inc_value("asset_cache/blocked")
+            await route.abort()
+            return
+
+        if (
+            request.method != "GET"
+            or request.resource_type not in CACHEABLE_RESOURCE_TYPES
+        ):
+            await route.fallback()
+            return
+
+        entry = cache.get(request.url)
+        if entry and cache.is_fresh(entry):
+            stats.inc_value("asset_cache/hits")
+            await _fulfill_from_cache(route, entry)
+            return
+
+        headers = dict(request.headers)
+        if entry:
+            etag = entry["headers"].get("etag")
+            last_modified = entry["headers"].get("last-modified")
+            if etag:
+                headers["if-none-match"] = etag
+            if last_modified:
+                headers["if-modified-since"] = last_modified
+
+        try:
+            response = await route.fetch(headers=headers)
+        except Exception:
+            await route.fallback()
+            return
+
+        if entry and response.status == 304:
+            stats.inc_value("asset_cache/revalidated")
+            cache.refresh(entry)
+            await _fulfill_from_cache(route, entry)
+            return
+
+        body = await response.body()
+        content_type = response.headers.get("content-type", "")
+        if response.status == 200 and any(
+            t in content_type for t in CACHEABLE_CONTENT_TYPES
+        ):
+            stats.inc_value("asset_cache/misses")
+            await cache.put(request.url, response.status, response.headers, body)
+        await route.fulfill(response=response, body=body)
+
+    return handle
@@ -0,0 +1,32 @@
+# manga_scraper/utils/browser_memory.py
+import psutil
+
+BROWSER_PROCESS_NAMES = ("chrome", "chromium", "headless_shell")
+
+
+def browser_rss(pid=None):
+    """
+    Sum the resident memory of browser processes started by a process.
+
+    Chromium shares memory between its processes, so this overstates the
+    real footprint a little; it is meant for thresholds and trends.
+
+    Args:
+        pid (int): Parent process (defaults to the current process)
+
+    Returns:
+        int: Resident set size in bytes
+    """
+    try:
+        children = psutil.Process(pid).children(recursive=True)
+    except psutil.Error:
+        return 0
+
+    total = 0
+    for proc in children:
+        try:
+            if any(name in proc.name().lower() for name in BROWSER_PROCESS_NAMES):
+                total += proc.memory_info().rss
+        except psutil.Error:
+            continue  # Exited while we were looking
+    return total
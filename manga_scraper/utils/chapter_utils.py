@@ -1,6 +1,12 @@
 # manga_scraper/utils/chapter_utils.py
 import re
 
+# Page images are served from the site's media CDN; covers and avatars are not.
+PAGE_IMAGE_URL_RE = re.compile(
+    r"https?://[^\s\"'<>\\]+/media/[^\s\"'<>\\]+?\.(?:jpe?g|png|webp|gif|avif)",
+    re.IGNORECASE,
+)
+
 
 def extract_chapter_number(chapter_str):
     """
@@ -22,3 +28,16 @@ def extract_chapter_number(chapter_str):
         re.IGNORECASE,
     )
     return float((match or [[], ["0"]]).group(1) or 0)
+
+
+def find_page_image_urls(text):
+    """
+    Find chapter page image URLs in raw HTML, script or JSON text.
+
+    Args:
+        text (str): Response body
+
+    Returns:
+        list: Unique page image URLs in order of first appearance
+    """
+    return list(dict.fromkeys(PAGE_IMAGE_URL_RE.findall(text or "")))
@@ -0,0 +1,98 @@
+# manga_scraper/utils/db.py
+import psycopg2
+
+# Image store hit/miss/evict counters, shared by the crawler and the API
+CREATE_STORAGE_COUNTERS_TABLE = """
+    CREATE TABLE IF NOT EXISTS storage_counters (
+        name TEXT PRIMARY KEY,
+        value BIGINT NOT NULL DEFAULT 0
+    )
+"""
+
+
+def connect(settings):
+    """
+    Open a psycopg2 connection from the POSTGRESQL_* Scrapy settings.
+
+    Args:
+        settings (Settings): Crawler settings
+
+    Returns:
+        connection: psycopg2 connection with autocommit disabled
+    """
+    conn = psycopg2.connect(
+        dbname=settings.get("POSTGRESQL_DB"),
+        user=settings.get("POSTGRESQL_USER"),
+        password=settings.get("POSTGRESQL_PASSWORD"),
+        host=settings.get("POSTGRESQL_HOST"),
+        port=settings.get("POSTGRESQL_PORT"),
+    )
+    conn.autocommit = False  # Enable transactions
+    return conn
+
+
+def fetch_complete_chapter_ids(conn, manga_id=None, keyword=None):
+    """
+    Load ids of chapters whose pages are already fully stored.
+
+    A chapter is complete when it has a positive total_pages and at least
+    that many pages whose image was downloaded (failed and evicted pages
+    are fetched again).
+
+    Args:
+        conn: psycopg2 connection
+        manga_id (str): Restrict to one manga
+        keyword (str): Restrict to mangas previously found for a search keyword
+
+    Returns:
+        set: Complete chapter ids
+    """
+    query = """
+        SELECT c.id
+        FROM chapters c
+        WHERE c.total_pages > 0
+          AND (
+              SELECT COUNT(*) FROM pages p
+              WHERE p.chapter_id = c.id AND p.download_status = 'completed'
+          ) >= c.total_pages
+    """
+    params = []
+    if manga_id is not None:
+        query += " AND c.manga_id = %s"
+        params.append(manga_id)
+    if keyword is not None:
+        query += """
+          AND c.manga_id IN (
+              SELECT manga_id FROM search_keywords WHERE keyword = %s
+          )
+        """
+        params.append(keyword)
+
+    with conn.cursor() as cur:
+        cur.execute(query, params)
+        return {row[0] for row in cur.fetchall()}
+
+
+def lease_chapters(conn, chapter_ids, seconds):
+    """
+    Keep chapters out of image store eviction for the next ``seconds``.
+
+    Taken by crawls that link, render or package a chapter's stored images;
+    a longer lease already held is kept.
+
+    Args:
+        conn: psycopg2 connection in autocommit mode
+        chapter_ids (iterable): Chapters to lease
+        seconds (int): Lease duration
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE chapters
+            SET in_use_until = GREATEST(
+                in_use_until, NOW() + %s * INTERVAL '1 second'
+            )
+            WHERE id = ANY(%s)
+            """,
+            (seconds, list(chapter_ids)),
+        )
@@ -0,0 +1,167 @@
+# manga_scraper/utils/frontier.py
+import logging
+import os
+import socket
+import uuid
+
+from psycopg2.extras import execute_values
+
+logger = logging.getLogger(__name__)
+
+CREATE_FRONTIER_TABLE = """
+    CREATE TABLE IF NOT EXISTS chapter_frontier (
+        chapter_id TEXT PRIMARY KEY,
+        manga_id TEXT,
+        url TEXT,
+        task_id TEXT,
+        status TEXT DEFAULT 'pending',
+        claimed_by TEXT,
+        lease_expires_at TIMESTAMPTZ,
+        attempts INTEGER DEFAULT 0,
+        updated_at TIMESTAMPTZ DEFAULT NOW()
+    );
+    CREATE INDEX IF NOT EXISTS chapter_frontier_task_status_idx
+        ON chapter_frontier (task_id, status)
+"""
+
+CLAIM_QUERY = """
+    UPDATE chapter_frontier f
+    SET status = 'claimed',
+        claimed_by = %(worker)s,
+        lease_expires_at = NOW() + %(lease)s * INTERVAL '1 second',
+        attempts = f.attempts + 1,
+        updated_at = NOW()
+    WHERE f.chapter_id IN (
+        SELECT chapter_id FROM chapter_frontier
+        WHERE task_id = %(task_id)s
+          AND (
+            status = 'pending'
+            OR (status = 'claimed' AND lease_expires_at < NOW())
+          )
+        ORDER BY updated_at
+        FOR UPDATE SKIP LOCKED
+        LIMIT %(limit)s
+    )
+    RETURNING f.chapter_id, f.manga_id, f.url
+"""
+
+
+def frontier_worker_id():
+    """Identify one frontier consumer (a crawl, not just a process)."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class ChapterFrontier:
+    """
+    Postgres-backed queue of chapter URLs shared by every render worker.
+
+    Producers ``add`` discovered chapters under a task id. Consumers
+    ``claim`` batches with ``FOR UPDATE SKIP LOCKED`` and hold them under a
+    lease they keep renewing while rendering; a claim whose lease expired
+    (its worker died) is handed out again. Finished chapters are marked
+    ``done`` or ``failed``.
+    """
+
+    def __init__(self, conn, worker_id, lease=600):
+        self.conn = conn
+        self.conn.autocommit = True
+        self.worker_id = worker_id
+        self.lease = lease
+        with self.conn.cursor() as cur:
+            cur.execute(CREATE_FRONTIER_TABLE)
+
+    def add(self, task_id, chapters):
+        """Queue (manga_id, chapter_id, url) tuples; known chapters are re-queued."""
+        with self.conn.cursor() as cur:
+            execute_values(
+                cur,
+                """
+                INSERT INTO chapter_frontier (chapter_id, manga_id, url, task_id)
+                VALUES %s
+                ON CONFLICT (chapter_id) DO UPDATE SET
+                    url = EXCLUDED.url,
+                    task_id = EXCLUDED.task_id,
+                    status = 'pending',
+                    claimed_by = NULL,
+                    lease_expires_at = NULL,
+                    updated_at = NOW()
+                WHERE chapter_frontier.status <> 'claimed'
+                   OR chapter_frontier.lease_expires_at < NOW()
+                """,
+                [(c, m, u, task_id) for m, c, u in chapters],
+            )
+
+    def claim(self, task_id, limit):
+        with self.conn.cursor() as cur:
+            cur.execute(
+                CLAIM_QUERY,
+                {
+                    "worker": self.worker_id,
+                    "lease": self.lease,
+                    "task_id": task_id,
+                    "limit": limit,
+                },
+            )
+            return cur.fetchall()
+
+    def renew(self):
+        """Extend the lease of everything this worker still holds."""
+        with self.conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE chapter_frontier
+                SET lease_expires_at = NOW() + %s * INTERVAL '1 second'
+                WHERE claimed_by = %s AND status = 'claimed'
+                """,
+                (self.lease, self.worker_id),
+            )
+
+    def finish(self, chapter_id, status):
+        with self.conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE chapter_frontier
+                SET status = %s, lease_expires_at = NULL, updated_at = NOW()
+                WHERE chapter_id = %s AND claimed_by = %s
+                """,
+                (status, chapter_id, self.worker_id),
+            )
+
+    def release(self):
+        """Give unfinished claims back right away (clean shutdown)."""
+        with self.conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE chapter_frontier
+                SET status = 'pending', claimed_by = NULL, lease_expires_at = NULL
+                WHERE claimed_by = %s AND status = 'claimed'
+                """,
+                (self.worker_id,),
+            )
+            return cur.rowcount
+
+    def is_drained(self, task_id):
+        """True once nothing is pending or held under a live lease."""
+        with self.conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT EXISTS (
+                    SELECT 1 FROM chapter_frontier
+                    WHERE task_id = %s
+                      AND (status = 'pending'
+                           OR (status = 'claimed' AND lease_expires_at >= NOW()))
+                )
+                """,
+                (task_id,),
+            )
+            return not cur.fetchone()[0]
+
+    def producer_running(self, task_id):
+        """Whether the task that fills this frontier may still add chapters."""
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT status FROM tasks WHERE task_id = %s", (task_id,))
+            row = cur.fetchone()
+        return row is not None and row[0] in ("queued", "running")
+
+    def close(self):
+        self.conn.close()
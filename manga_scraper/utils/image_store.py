@@ -0,0 +1,330 @@
+# manga_scraper/utils/image_store.py
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+
+import requests
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+from manga_scraper.api.models import Page
+from manga_scraper.pipelines.image_download import content_path, image_extension
+from manga_scraper.settings import (
+    IMAGES_STORE,
+    STORAGE_EVICTION_BATCH,
+    STORAGE_EVICTION_INTERVAL,
+    STORAGE_EVICTION_MIN_AGE,
+    STORAGE_EVICTION_TARGET,
+    STORAGE_QUOTA_BYTES,
+)
+from manga_scraper.utils.db import CREATE_STORAGE_COUNTERS_TABLE
+from manga_scraper.utils.frontier import CREATE_FRONTIER_TABLE
+
+logger = logging.getLogger(__name__)
+
+# Store usage measured by the last eviction pass, so status requests do not
+# walk the whole store
+_usage = {"bytes": None, "measured_at": None}
+
+# Least recently read chapters first, walked on chapters_last_accessed_idx.
+# A chapter is only a candidate once it has not been read or written for the
+# grace period, no running crawl holds a lease on it (in_use_until) and it is
+# not queued in the frontier. Evicted chapters have no access time.
+LRU_CHAPTERS_QUERY = text(
+    """
+    SELECT c.id
+    FROM chapters c
+    WHERE c.last_accessed_at < NOW() - :min_age * INTERVAL '1 second'
+      AND (c.in_use_until IS NULL OR c.in_use_until < NOW())
+      AND NOT EXISTS (
+          SELECT 1 FROM chapter_frontier f
+          WHERE f.chapter_id = c.id AND f.status IN ('pending', 'claimed')
+      )
+    ORDER BY c.last_accessed_at
+    LIMIT :limit
+    """
+)
+
+
+def get_store_usage(root: str = IMAGES_STORE) -> int:
+    """Bytes used by the image store (originals and renditions)."""
+    total = 0
+    pending = [root]
+    while pending:
+        try:
+            entries = os.scandir(pending.pop())
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    total += entry.stat(follow_symlinks=False).st_size
+    return total
+
+
+def ensure_storage_tables(db: Session) -> None:
+    """Create the tables eviction and the storage status read, if missing."""
+    db.execute(text(CREATE_FRONTIER_TABLE))
+    db.execute(text(CREATE_STORAGE_COUNTERS_TABLE))
+    db.commit()
+
+
+def _record_usage(usage: int) -> int:
+    _usage["bytes"] = usage
+    _usage["measured_at"] = time.time()
+    return usage
+
+
+def count(db: Session, name: str, value: int = 1) -> None:
+    """Add to a storage counter (committed with the caller's transaction)."""
+    db.execute(
+        text(
+            """
+            INSERT INTO storage_counters (name, value) VALUES (:name, :value)
+            ON CONFLICT (name) DO UPDATE
+            SET value = storage_counters.value + EXCLUDED.value
+            """
+        ),
+        {"name": name, "value": value},
+    )
+
+
+def get_storage_status(db: Session) -> dict:
+    """Usage against the quota, page states and hit/miss/evict counters."""
+    pages = dict(
+        db.execute(
+            text("SELECT download_status, COUNT(*) FROM pages GROUP BY download_status")
+        ).all()
+    )
+    counters = dict(db.execute(text("SELECT name, value FROM storage_counters")).all())
+    if _usage["bytes"] is None:
+        _record_usage(get_store_usage())
+    return {
+        "used_bytes": _usage["bytes"],
+        "used_bytes_measured_at": _usage["measured_at"],
+        "quota_bytes": STORAGE_QUOTA_BYTES,
+        "pages": pages,
+        "counters": counters,
+    }
+
+
+def evict_to_quota(db: Session, root: str = IMAGES_STORE) -> dict:
+    """
+    Evict least recently read chapters until the store is back under quota.
+
+    Stops at STORAGE_EVICTION_TARGET x quota, so the store is not evicted
+    again on the next write. Evicted pages keep their row with status
+    ``evicted`` and are fetched again when read.
+
+    The measured usage is kept for get_storage_status.
+
+    Returns:
+        dict: Chapters, pages and bytes evicted
+    """
+    result = {"chapters": 0, "pages": 0, "bytes": 0}
+    if not STORAGE_QUOTA_BYTES:
+        return result
+    usage = _record_usage(get_store_usage(root))
+    if usage <= STORAGE_QUOTA_BYTES:
+        return result
+
+    target = STORAGE_QUOTA_BYTES * STORAGE_EVICTION_TARGET
+    while usage > target:
+        chapter_ids = db.scalars(
+            LRU_CHAPTERS_QUERY,
+            {"min_age": STORAGE_EVICTION_MIN_AGE, "limit": STORAGE_EVICTION_BATCH},
+        ).all()
+        if not chapter_ids:
+            logger.warning(
+                f"Image store over quota ({usage} bytes) but no chapter can be evicted"
+            )
+            break
+        for chapter_id in chapter_ids:
+            pages, freed = _evict_chapter(db, root, chapter_id)
+            result["chapters"] += 1
+            result["pages"] += pages
+            result["bytes"] += freed
+            usage -= freed
+            if usage <= target:
+                break
+
+    _record_usage(usage)
+    count(db, "evicted_chapters", result["chapters"])
+    count(db, "evicted_pages", result["pages"])
+    count(db, "evicted_bytes", result["bytes"])
+    db.commit()
+    logger.info(
+        f"Evicted {result['chapters']} chapters ({result['bytes']} bytes), "
+        f"store now at {usage} bytes"
+    )
+    return result
+
+
+def _evict_chapter(db: Session, root: str, chapter_id: str) -> tuple:
+    """Mark a chapter's pages evicted and delete files no other page uses."""
+    # A crawl may have leased the chapter since it was picked
+    claimed = db.scalar(
+        text(
+            """
+            UPDATE chapters SET last_accessed_at = NULL
+            WHERE id = :chapter_id
+              AND (in_use_until IS NULL OR in_use_until < NOW())
+            RETURNING id
+            """
+        ),
+        {"chapter_id": chapter_id},
+    )
+    if claimed is None:
+        db.commit()
+        return 0, 0
+    evicted = db.scalars(
+        text(
+            """
+                UPDATE pages SET download_status = 'evicted'
+                WHERE chapter_id = :chapter_id AND download_status = 'completed'
+                RETURNING content_hash
+                """
+        ),
+        {"chapter_id": chapter_id},
+    ).all()
+    hashes = {digest for digest in evicted if digest}
+    # Content-addressed files can be shared with pages of other chapters
+    still_used = set(
+        db.scalars(
+            text(
+                """
+                SELECT DISTINCT content_hash FROM pages
+                WHERE content_hash = ANY(:hashes) AND download_status = 'completed'
+                """
+            ),
+            {"hashes": list(hashes)},
+        ).all()
+    )
+    db.commit()
+
+    freed = 0
+    for digest in hashes - still_used:
+        freed += _delete_content(root, digest)
+    return len(evicted), freed
+
+
+def _delete_content(root: str, digest: str) -> int:
+    """Delete an original and its renditions; returns the bytes freed."""
+    shard = os.path.join(root, digest[:2], digest[2:4])
+    freed = 0
+    try:
+        entries = [e for e in os.scandir(shard) if e.name.startswith(digest)]
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        try:
+            size = entry.stat().st_size
+            os.remove(entry.path)
+            freed += size
+        except FileNotFoundError:
+            pass
+    return freed
+
+
+def read_page_image(db: Session, page: Page, rendition: str = "original") -> str:
+    """
+    Absolute path of a page image to serve, re-fetching it if evicted.
+
+    Records the read in ``last_accessed_at`` and the hit/miss counters.
+    Falls back to the original when the rendition was never made.
+
+    Raises:
+        FileNotFoundError: The page has no image and could not be fetched
+    """
+    path = None
+    if page.download_status == "completed" and page.file_path:
+        relative = {
+            "webp": page.webp_path,
+            "thumbnail": page.thumbnail_path,
+        }.get(rendition)
+        for candidate in (relative, page.file_path):
+            if candidate and os.path.exists(os.path.join(IMAGES_STORE, candidate)):
+                path = os.path.join(IMAGES_STORE, candidate)
+                break
+
+    if path is None:
+        count(db, "misses")
+        path = _refetch_page(db, page)
+    else:
+        count(db, "hits")
+    page.last_accessed_at = func.now()
+    db.execute(
+        text("UPDATE chapters SET last_accessed_at = NOW() WHERE id = :chapter_id"),
+        {"chapter_id": page.chapter_id},
+    )
+    db.commit()
+    return path
+
+
+def _refetch_page(db: Session, page: Page) -> str:
+    """Download an evicted or missing page image back into the store."""
+    if not page.url:
+        raise FileNotFoundError(f"Page {page.chapter_id}/{page.page_number} has no URL")
+    tmp_dir = os.path.join(IMAGES_STORE, ".tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir, suffix=".part")
+    digest = hashlib.sha256()
+    try:
+        with os.fdopen(fd, "wb") as f, requests.get(
+            page.url, stream=True, timeout=30
+        ) as response:
+            response.raise_for_status()
+            for chunk in response.iter_content(64 * 1024):
+                f.write(chunk)
+                digest.update(chunk)
+        extension = image_extension(page.url, response.headers.get("Content-Type"))
+        relative = content_path(digest.hexdigest(), extension)
+        path = os.path.join(IMAGES_STORE, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+    except (OSError, requests.RequestException) as e:
+        count(db, "refetch_failures")
+        db.commit()
+        raise FileNotFoundError(f"Could not re-fetch {page.url}: {e}") from e
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    # Renditions of the old content are gone; they are made again on a crawl
+    page.file_path = relative
+    page.content_hash = digest.hexdigest()
+    page.download_status = "completed"
+    if page.webp_path and not os.path.exists(
+        os.path.join(IMAGES_STORE, page.webp_path)
+    ):
+        page.webp_path = None
+    if page.thumbnail_path and not os.path.exists(
+        os.path.join(IMAGES_STORE, page.thumbnail_path)
+    ):
+        page.thumbnail_path = None
+    return path
+
+
+def start_eviction_loop(session_factory) -> threading.Thread:
+    """Enforce the quota every STORAGE_EVICTION_INTERVAL seconds in a thread."""
+
+    def run():
+        while True:
+            time.sleep(STORAGE_EVICTION_INTERVAL)
+            db = session_factory()
+            try:
+                evict_to_quota(db)
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Image store eviction failed: {e}")
+            finally:
+                db.close()
+
+    thread = threading.Thread(target=run, name="image-store-eviction", daemon=True)
+    thread.start()
+    return thread
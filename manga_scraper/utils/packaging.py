@@ -0,0 +1,167 @@
+# manga_scraper/utils/packaging.py
+"""
+Chapter archive builders. These run in worker processes (see
+ChapterPackagingPipeline), so they take plain paths and return plain values.
+"""
+import hashlib
+import io
+import os
+import zipfile
+
+from PIL import Image
+
+DIGEST_PREFIX = b"manga_scraper:"
+PDF_HEADER = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"
+
+
+def package_digest(content_hashes):
+    """Identify a chapter's content: the SHA-256s of its pages, in order."""
+    return hashlib.sha256("\n".join(content_hashes).encode()).hexdigest()
+
+
+def package_chapter(images, cbz_path=None, pdf_path=None, digest=""):
+    """
+    Build the requested archives of one chapter.
+
+    Args:
+        images: Absolute page image paths in reading order
+        cbz_path / pdf_path: Archive to (re)build, or None to skip
+        digest: ``package_digest`` of the pages; an archive already carrying
+            it is left alone
+
+    Returns:
+        dict: format -> True if written, False if it was already up to date
+    """
+    built = {}
+    if cbz_path:
+        built["cbz"] = _build(cbz_path, digest, _cbz_digest, _write_cbz, images)
+    if pdf_path:
+        built["pdf"] = _build(pdf_path, digest, _pdf_digest, _write_pdf, images)
+    return built
+
+
+def _build(path, digest, read_digest, write, images):
+    try:
+        if read_digest(path) == digest:
+            return False
+    except (OSError, zipfile.BadZipFile):
+        pass  # Missing or broken: rebuild
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.part"
+    try:
+        write(tmp_path, images, digest)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return True
+
+
+def _cbz_digest(path):
+    with zipfile.ZipFile(path) as archive:
+        comment = archive.comment
+    if comment.startswith(DIGEST_PREFIX):
+        return comment[len(DIGEST_PREFIX) :].decode()
+    return None
+
+
+def _write_cbz(path, images, digest):
+    # Images are already compressed: store them, copied from disk in chunks
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_STORED) as archive:
+        for number, image in enumerate(images, start=1):
+            extension = os.path.splitext(image)[1]
+            archive.write(image, arcname=f"{number:04d}{extension}")
+        archive.comment = DIGEST_PREFIX + digest.encode()
+
+
+def _pdf_digest(path):
+    with open(path, "rb") as f:
+        head = f.read(len(PDF_HEADER) + 128)
+    if not head.startswith(PDF_HEADER):
+        return None
+    line = head[len(PDF_HEADER) :].split(b"\n", 1)[0]
+    if line.startswith(b"%" + DIGEST_PREFIX):
+        return line[len(DIGEST_PREFIX) + 1 :].decode()
+    return None
+
+
+def _page_image(path):
+    """
+    (width, height, colour space, JPEG bytes or file path) of one page.
+
+    Baseline RGB/greyscale JPEGs are embedded as they are; anything else is
+    decoded and re-encoded, one page at a time.
+    """
+    with Image.open(path) as image:
+        width, height = image.size
+        if image.format == "JPEG" and image.mode in ("RGB", "L"):
+            colour = "DeviceRGB" if image.mode == "RGB" else "DeviceGray"
+            return width, height, colour, path
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        data = io.BytesIO()
+        image.save(data, format="JPEG", quality=90)
+        colour = "DeviceRGB" if image.mode == "RGB" else "DeviceGray"
+        return width, height, colour, data.getvalue()
+
+
+def _write_pdf(path, images, digest):
+    """
+    Write a one-image-per-page PDF, streaming each image into the file.
+
+    Objects are numbered up front (1 catalog, 2 page tree, then page /
+    contents / image per page), so nothing but the xref offsets is kept.
+    """
+    offsets = []
+    with open(path, "wb") as f:
+
+        def begin(number):
+            offsets.append(f.tell())
+            f.write(f"{number} 0 obj\n".encode())
+
+        f.write(PDF_HEADER + b"%" + DIGEST_PREFIX + digest.encode() + b"\n")
+        begin(1)
+        f.write(b"<< /Type /Catalog /Pages 2 0 R >>\nendobj\n")
+        kids = " ".join(f"{3 + 3 * i} 0 R" for i in range(len(images)))
+        begin(2)
+        f.write(
+            f"<< /Type /Pages /Kids [{kids}] /Count {len(images)} >>\nendobj\n".encode()
+        )
+
+        for i, image_path in enumerate(images):
+            page, contents, image = 3 + 3 * i, 4 + 3 * i, 5 + 3 * i
+            width, height, colour, data = _page_image(image_path)
+            begin(page)
+            f.write(
+                f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {width} {height}] "
+                f"/Resources << /XObject << /Im0 {image} 0 R >> >> "
+                f"/Contents {contents} 0 R >>\nendobj\n".encode()
+            )
+            draw = f"q {width} 0 0 {height} 0 0 cm /Im0 Do Q".encode()
+            begin(contents)
+            f.write(f"<< /Length {len(draw)} >>\nstream\n".encode())
+            f.write(draw + b"\nendstream\nendobj\n")
+
+            length = os.path.getsize(data) if isinstance(data, str) else len(data)
+            begin(image)
+            f.write(
+                f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} "
+                f"/ColorSpace /{colour} /BitsPerComponent 8 /Filter /DCTDecode "
+                f"/Length {length} >>\nstream\n".encode()
+            )
+            if isinstance(data, str):
+                with open(data, "rb") as source:
+                    while chunk := source.read(1024 * 1024):
+                        f.write(chunk)
+            else:
+                f.write(data)
+            f.write(b"\nendstream\nendobj\n")
+
+        xref = f.tell()
+        f.write(f"xref\n0 {len(offsets) + 1}\n0000000000 65535 f \n".encode())
+        for offset in offsets:
+            f.write(f"{offset:010d} 00000 n \n".encode())
+        f.write(
+            f"trailer\n<< /Size {len(offsets) + 1} /Root 1 0 R >>\n"
+            f"startxref\n{xref}\n%%EOF\n".encode()
+        )
@@ -0,0 +1,163 @@
+# manga_scraper/utils/page_pool.py
+import asyncio
+import logging
+import time
+from collections import defaultdict, deque
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONTEXT_NAME = "default"
+
+
+class PagePool:
+    """
+    Keep rendered Playwright pages open and hand them to the next chapter.
+
+    Pages are created by scrapy-playwright; the pool only decides whether a
+    request gets a warm page (``playwright_page`` in meta, navigated by the
+    handler) or may create a new one. It never lets more than
+    ``max_pages`` pages exist per context, so requests wait for a released
+    page instead of blocking inside the handler while idle pages hold
+    every context slot.
+    """
+
+    def __init__(self, stats, max_pages=8, max_uses=50):
+        self.stats = stats
+        self.max_pages = max_pages
+        self.max_uses = max_uses
+        self.idle = defaultdict(deque)  # context name -> idle pages
+        self.waiters = defaultdict(deque)  # context name -> futures
+        self.open_pages = defaultdict(int)  # context name -> open or reserved
+        self.pages = {}  # page -> [context name, first seen, uses]
+        self.lifetime_total = 0.0
+        self.pages_closed = 0
+
+    async def acquire(self, context_name=DEFAULT_CONTEXT_NAME):
+        """
+        Return a warm page, or None if the caller may create a new one.
+
+        Waits while the context already has ``max_pages`` pages in use.
+        """
+        idle = self.idle[context_name]
+        while idle:
+            page = idle.popleft()
+            if not page.is_closed():
+                self.stats.inc_value("page_pool/reused")
+                self._record_occupancy()
+                return page
+
+        if self.open_pages[context_name] < self.max_pages:
+            self.open_pages[context_name] += 1
+            self._record_occupancy()
+            return None
+
+        self.stats.inc_value("page_pool/waits")
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters[context_name].append(waiter)
+        page = await waiter
+        if page is not None:
+            self.stats.inc_value("page_pool/reused")
+        self._record_occupancy()
+        return page
+
+    def track(self, page, context_name=DEFAULT_CONTEXT_NAME):
+        """Start accounting for a page the handler created for us."""
+        if page in self.pages:
+            return
+        self.pages[page] = [context_name, time.monotonic(), 0]
+        self.stats.inc_value("page_pool/created")
+        page.once("close", lambda _: self._on_page_closed(page))
+
+    def cancel(self, context_name=DEFAULT_CONTEXT_NAME):
+        """Give back a reservation whose download failed before a page existed."""
+        self._free_slot(context_name)
+
+    async def release(self, page, meta=None):
+        """Return a page after its response was parsed."""
+        if page not in self.pages:
+            self.track(
+                page, (meta or {}).get("playwright_context", DEFAULT_CONTEXT_NAME)
+            )
+        # Handlers were attached for the previous request only
+        for event, handler in (
+            (meta or {}).get("playwright_page_event_handlers") or {}
+        ).items():
+            if callable(handler):
+                page.remove_listener(event, handler)
+
+        context_name, _, uses = self.pages[page]
+        self.pages[page][2] = uses = uses + 1
+        self.stats.inc_value("page_pool/released")
+        if page.is_closed():
+            return
+        if uses >= self.max_uses:
+            await self.discard(page)
+            return
+
+        waiters = self.waiters[context_name]
+        while waiters:
+            waiter = waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(page)
+                return
+        self.idle[context_name].append(page)
+        self._record_occupancy()
+
+    async def discard(self, page):
+        """Close a page that failed or is worn out."""
+        if page not in self.pages:
+            self.track(page)
+        if not page.is_closed():
+            await page.close()
+
+    async def close(self):
+        """Close every idle page (spider shutdown)."""
+        for idle in self.idle.values():
+            while idle:
+                await self.discard(idle.popleft())
+
+    def _on_page_closed(self, page):
+        context_name, first_seen, _ = self.pages.pop(page)
+        self.lifetime_total += time.monotonic() - first_seen
+        self.pages_closed += 1
+        self.stats.inc_value("page_pool/closed")
+        self.stats.set_value(
+            "page_pool/page_lifetime_avg",
+            round(self.lifetime_total / self.pages_closed, 2),
+        )
+        try:
+            self.idle[context_name].remove(page)
+        except ValueError:
+            pass
+        self._free_slot(context_name)
+
+    def _free_slot(self, context_name):
+        waiters = self.waiters[context_name]
+        while waiters:
+            waiter = waiters.popleft()
+            if not waiter.done():
+                # The waiter inherits the slot and creates a new page
+                waiter.set_result(None)
+                return
+        self.open_pages[context_name] = max(0, self.open_pages[context_name] - 1)
+        self._record_occupancy()
+
+    def _record_occupancy(self):
+        idle = sum(len(pages) for pages in self.idle.values())
+        in_use = sum(self.open_pages.values()) - idle
+        self.stats.set_value("page_pool/idle", idle)
+        self.stats.set_value("page_pool/in_use", in_use)
+        self.stats.max_value("page_pool/idle_max", idle)
+        self.stats.max_value("page_pool/in_use_max", in_use)
+
+
+async def release_page(spider, meta):
+    """Hand a response's page back to the spider's pool, or close it."""
+    page = meta.get("playwright_page")
+    if page is None:
+        return
+    pool = getattr(spider, "page_pool", None)
+    if pool is not None:
+        await pool.release(page, meta)
+    elif not page.is_closed():
+        await page.close()
@@ -0,0 +1,99 @@
+# manga_scraper/utils/phash.py
+from PIL import Image
+
+HASH_BITS = 64
+_MASK = (1 << HASH_BITS) - 1
+# Largest difference of any one downscaled pixel between two copies of an image
+MAX_PIXEL_DIFF = 32
+
+
+def dhash(path):
+    """
+    64-bit difference hash of an image, as a signed int (fits a BIGINT).
+
+    Each bit says whether a pixel is brighter than its right neighbour on
+    a 9x8 greyscale thumbnail, so re-encodes and small edits of the same
+    page land within a few bits of each other.
+    """
+    with Image.open(path) as image:
+        image.draft("L", (9 * 8, 8 * 8))  # JPEGs: decode at reduced scale
+        pixels = list(image.convert("L").resize((9, 8), Image.LANCZOS).getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            i = row * 9 + col
+            value = (value << 1) | (pixels[i] > pixels[i + 1])
+    return value - (1 << HASH_BITS) if value >> (HASH_BITS - 1) else value
+
+
+def same_image(path, other_path, tolerance, size=64):
+    """
+    Whether two images show the same picture.
+
+    Both must have the same dimensions, and their greyscale downscales to
+    size x size may differ by at most ``tolerance`` (0-255) per pixel on
+    average and by MAX_PIXEL_DIFF anywhere. Re-encodes stay well inside
+    both; different pages whose hashes collide (another speech bubble on
+    the same layout) do not.
+    """
+    thumbnails = []
+    for source in (path, other_path):
+        with Image.open(source) as image:
+            thumbnails.append((image.size, _grey_thumbnail(image, size)))
+    (size_a, pixels_a), (size_b, pixels_b) = thumbnails
+    if size_a != size_b:
+        return False
+    differences = [abs(a - b) for a, b in zip(pixels_a, pixels_b)]
+    return (
+        max(differences) <= MAX_PIXEL_DIFF
+        and sum(differences) / len(differences) <= tolerance
+    )
+
+
+def _grey_thumbnail(image, size):
+    image.draft("L", (size, size))  # JPEGs: decode at reduced scale
+    return list(image.convert("L").resize((size, size), Image.BILINEAR).getdata())
+
+
+class BandIndex:
+    """
+    Near-duplicate lookup for 64-bit hashes.
+
+    The hash is cut into ``max_distance + 1`` bands. Two hashes at most
+    ``max_distance`` bits apart must agree on at least one whole band, so
+    only entries sharing a band are compared.
+    """
+
+    def __init__(self, max_distance):
+        self.max_distance = max_distance
+        bands = max_distance + 1
+        widths = [HASH_BITS // bands + (i < HASH_BITS % bands) for i in range(bands)]
+        self.bands = []  # (shift, mask) per band
+        shift = 0
+        for width in widths:
+            self.bands.append((shift, (1 << width) - 1))
+            shift += width
+        self.buckets = [{} for _ in self.bands]
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, phash, value):
+        phash &= _MASK
+        self.size += 1
+        for (shift, mask), bucket in zip(self.bands, self.buckets):
+            bucket.setdefault((phash >> shift) & mask, []).append((phash, value))
+
+    def nearest(self, phash):
+        """(distance, value) of the closest entry within max_distance, or None."""
+        phash &= _MASK
+        best = None
+        for (shift, mask), bucket in zip(self.bands, self.buckets):
+            for other, value in bucket.get((phash >> shift) & mask, ()):
+                distance = (phash ^ other).bit_count()
+                if distance <= self.max_distance and (
+                    best is None or distance < best[0]
+                ):
+                    best = (distance, value)
+        return best
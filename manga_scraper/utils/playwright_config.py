@@ -1,23 +1,131 @@
+import asyncio
+
 from scrapy_playwright.page import PageMethod
 
+from manga_scraper.utils.chapter_utils import find_page_image_urls
+
+IMAGE_ITEM_SELECTOR = "div[data-name='image-item']"
+
+# Response types that can carry the chapter image list
+CAPTURE_RESOURCE_TYPES = {"document", "script", "xhr", "fetch"}
+
+
+class ChapterImageCapture:
+    """
+    Collect a chapter's image list from the page's network responses.
 
-def get_chapter_page_meta(manga_id: str, chapter_id: str) -> dict:
+    ``on_response`` is registered as a Playwright "response" handler and
+    ``wait_for_images`` runs as a PageMethod: it returns as soon as a
+    response containing page image URLs has been seen, falling back to
+    waiting for the image-item elements in the DOM if nothing turns up
+    within ``timeout`` milliseconds.
+    """
+
+    def __init__(self, timeout: float, dom_timeout: float):
+        self.timeout = timeout
+        self.dom_timeout = dom_timeout
+        self.page_urls = []
+        self._captured = None
+
+    def __getstate__(self):
+        # asyncio.Event is not picklable; requests may be serialized to disk
+        state = self.__dict__.copy()
+        state["_captured"] = None
+        return state
+
+    @property
+    def captured(self) -> asyncio.Event:
+        if self._captured is None:
+            self._captured = asyncio.Event()
+        return self._captured
+
+    async def on_response(self, response):
+        if (
+            self.page_urls
+            or response.request.resource_type not in CAPTURE_RESOURCE_TYPES
+        ):
+            return
+        try:
+            text = await response.text()
+        except Exception:
+            # Redirects and aborted responses have no body
+            return
+        page_urls = find_page_image_urls(text)
+        if page_urls and not self.page_urls:
+            self.page_urls = page_urls
+            self.captured.set()
+
+    async def wait_for_images(self, page):
+        try:
+            await asyncio.wait_for(self.captured.wait(), timeout=self.timeout / 1000)
+        except asyncio.TimeoutError:
+            await page.wait_for_selector(IMAGE_ITEM_SELECTOR, timeout=self.dom_timeout)
+        await page.evaluate("() => { window.stop(); }")
+
+
+def set_render_timeout(meta: dict, timeout: float) -> None:
+    """
+    Apply a render timeout to meta built by get_chapter_page_meta.
+
+    Args:
+        meta (dict): Request meta (modified in place)
+        timeout (float): Timeout in milliseconds
+    """
+    meta["playwright_page_goto_kwargs"] = {
+        **meta.get("playwright_page_goto_kwargs", {}),
+        "timeout": timeout,
+    }
+    for page_method in meta.get("playwright_page_methods", []):
+        if "timeout" in page_method.kwargs:
+            page_method.kwargs["timeout"] = timeout
+    capture = meta.get("chapter_image_capture")
+    if capture is not None:
+        capture.dom_timeout = timeout
+
+
+def get_chapter_page_meta(
+    manga_id: str, chapter_id: str, render: bool = True, settings=None
+) -> dict:
     """
     Generate Playwright meta settings for chapter pages.
 
     Args:
         manga_id (str): Manga ID
         chapter_id (str): Chapter ID
+        render (bool): Render in Playwright; if False, fetch over plain HTTP
+            and let parse_chapter_page fall back to rendering when needed
+        settings (Settings): Crawler settings; with PLAYWRIGHT_CAPTURE_RESPONSES
+            the image list is taken from network responses (ChapterImageCapture)
 
     Returns:
         dict: Meta dictionary for Scrapy Request
     """
+    if not render:
+        return {"manga_id": manga_id, "chapter_id": chapter_id}
+
+    if settings is not None and settings.getbool("PLAYWRIGHT_CAPTURE_RESPONSES"):
+        capture = ChapterImageCapture(
+            timeout=settings.getfloat("PLAYWRIGHT_CAPTURE_TIMEOUT", 15000),
+            dom_timeout=600000,
+        )
+        return {
+            "playwright": True,
+            "playwright_page_event_handlers": {"response": capture.on_response},
+            "playwright_page_methods": [PageMethod(capture.wait_for_images)],
+            "playwright_page_goto_kwargs": {
+                "wait_until": "commit",
+                "timeout": 600000,
+            },
+            "playwright_include_page": True,
+            "chapter_image_capture": capture,
+            "manga_id": manga_id,
+            "chapter_id": chapter_id,
+        }
+
     return {
         "playwright": True,
         "playwright_page_methods": [
-            PageMethod(
-                "wait_for_selector", "div[data-name='image-item']", timeout=600000
-            ),
+            PageMethod("wait_for_selector", IMAGE_ITEM_SELECTOR, timeout=600000),
             PageMethod("evaluate", "() => { window.stop(); }"),
         ],
         "playwright_page_goto_kwargs": {
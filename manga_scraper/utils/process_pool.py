@@ -0,0 +1,27 @@
+# manga_scraper/utils/process_pool.py
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+_pools = {}  # name -> ProcessPoolExecutor
+_lock = threading.Lock()
+
+
+def shared_process_pool(name, max_workers):
+    """
+    Process pool shared by every crawl running in this process.
+
+    The crawl worker runs several crawls in one process; a pool per crawl
+    would start ``max_workers`` processes for each of them. The pool is
+    created by the first crawl that asks for it (with that crawl's size),
+    replaced if a worker process died, and shut down at interpreter exit.
+    """
+    with _lock:
+        pool = _pools.get(name)
+        if pool is None or pool._broken:
+            # spawn: never fork a process running the reactor and Playwright
+            pool = _pools[name] = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return pool
@@ -0,0 +1,77 @@
+# manga_scraper/utils/renditions.py
+"""
+Page rendition builders. These run in worker processes (see
+PageRenditionPipeline), so they take plain paths and return plain values.
+"""
+import os
+import time
+
+from PIL import Image
+
+# libwebp cannot encode images with a side longer than this
+WEBP_MAX_SIDE = 16383
+
+
+def rendition_paths(file_path, quality, thumbnail_width):
+    """
+    WebP and thumbnail paths next to a content-addressed original.
+
+    Named after the original's hash and the rendition settings, so a path
+    that exists is already up to date.
+    """
+    stem = os.path.splitext(file_path)[0]
+    return f"{stem}-q{quality}.webp", f"{stem}-w{thumbnail_width}.webp"
+
+
+def render_page(source, webp_path, thumbnail_path, quality, thumbnail_width):
+    """
+    Write the missing renditions of one page image.
+
+    Images longer than WebP allows are downscaled to fit.
+
+    Returns:
+        tuple: (renditions written, CPU seconds spent in this process)
+    """
+    started = time.process_time()
+    todo = [p for p in (webp_path, thumbnail_path) if not os.path.exists(p)]
+    if webp_path in todo:
+        with Image.open(source) as image:
+            _save(_for_webp(image), webp_path, quality)
+    if thumbnail_path in todo:
+        # Opened again: draft() only helps before the image is decoded
+        with Image.open(source) as image:
+            height = max(1, round(image.height * thumbnail_width / image.width))
+            # JPEGs can be decoded straight at a reduced scale
+            image.draft("RGB", (thumbnail_width, height))
+            thumbnail = _for_webp(image)
+            thumbnail.thumbnail((thumbnail_width, height), Image.LANCZOS)
+            _save(thumbnail, thumbnail_path, quality)
+    return len(todo), time.process_time() - started
+
+
+def _for_webp(image):
+    if image.mode in ("RGB", "RGBA"):
+        return image
+    has_alpha = image.mode in ("LA", "PA") or "transparency" in image.info
+    return image.convert("RGBA" if has_alpha else "RGB")
+
+
+def _fit_webp(image):
+    """Downscale an image (e.g. a long webtoon strip) to WebP's size limit."""
+    longest = max(image.size)
+    if longest <= WEBP_MAX_SIDE:
+        return image
+    scale = WEBP_MAX_SIDE / longest
+    size = tuple(max(1, min(WEBP_MAX_SIDE, int(side * scale))) for side in image.size)
+    return image.resize(size, Image.LANCZOS)
+
+
+def _save(image, path, quality):
+    image = _fit_webp(image)
+    tmp_path = f"{path}.part"
+    try:
+        image.save(tmp_path, format="WEBP", quality=quality, method=4)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
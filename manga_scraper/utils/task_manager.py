@@ -1,39 +1,103 @@
+import json
+import os
+import shlex
+import shutil
 import subprocess
 import uuid
 import threading
 from datetime import datetime
+from sqlalchemy import func, text
 from sqlalchemy.orm import Session
-from manga_scraper.api.models import Task
+from manga_scraper.api.models import ChapterFrontier, FailedChapter, Task
+from manga_scraper.settings import CRAWL_WORKER_ENABLED, TASK_JOBS_DIR
 import psutil
 
 
+def get_job_dir(task_id: str) -> str:
+    """
+    Scrapy JOBDIR of a task (request queue, dupefilter and spider state).
+    """
+    return os.path.join(TASK_JOBS_DIR, task_id)
+
+
+def dispatch_scrapy_task(db: Session, cmd: list) -> str:
+    """
+    Run a `scrapy crawl` command, in the crawl worker if it is enabled.
+    """
+    if CRAWL_WORKER_ENABLED:
+        return enqueue_scrapy_task(db, cmd)
+    return start_async_scrapy_task(db, cmd)
+
+
+def enqueue_scrapy_task(db: Session, cmd: list) -> str:
+    """
+    Queue a crawl for the resident worker (manga_scraper.worker).
+
+    The `-a key=value` spider arguments of `cmd` are stored with the task
+    and the worker is woken up with a NOTIFY. The worker runs the crawl with
+    the task's JOBDIR (see get_job_dir).
+    """
+    task_id = str(uuid.uuid4())
+    cmd = [*cmd, "-a", f"task_id={task_id}"]
+    spider_args = dict(
+        arg.split("=", 1) for flag, arg in zip(cmd, cmd[1:]) if flag == "-a"
+    )
+
+    task = Task(
+        task_id=task_id,
+        cmd=shlex.join(cmd),
+        spider_args=json.dumps(spider_args),
+        status="queued",
+        start_time=datetime.utcnow(),
+        is_admin_only=True,
+    )
+    db.add(task)
+    db.execute(text("NOTIFY crawl_jobs"))
+    db.commit()
+    return task_id
+
+
 def start_async_scrapy_task(db: Session, cmd: list) -> str:
     """
     Start a scrapy task asynchronously, store task info in PostgreSQL.
+
+    The crawl keeps its state in the task's JOBDIR so it can be resumed
+    with resume_task after being stopped or crashing.
     """
     task_id = str(uuid.uuid4())
-
-    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    cmd = [*cmd, "-a", f"task_id={task_id}", "-s", f"JOBDIR={get_job_dir(task_id)}"]
 
     # Insert new task record
     task = Task(
         task_id=task_id,
-        cmd=" ".join(cmd),
+        cmd=shlex.join(cmd),
         status="running",
         start_time=datetime.utcnow(),
-        pid=process.pid,
         is_admin_only=True,
     )
     db.add(task)
+    _spawn_scrapy_process(db, task, cmd)
+
+    return task_id
+
+
+def _spawn_scrapy_process(db: Session, task: Task, cmd: list) -> None:
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    task.pid = process.pid
     db.commit()
+    task_id = task.task_id
 
     def watch():
         process.wait()
         # Update status after completion
         finished_time = datetime.utcnow()
         db_task = db.query(Task).filter(Task.task_id == task_id).first()
-        if process.returncode == 0:
+        if db_task.status == "terminated":
+            # Stopped through stop_task; keep the JOBDIR for a resume
+            pass
+        elif process.returncode == 0:
             db_task.status = "finished"
+            shutil.rmtree(get_job_dir(task_id), ignore_errors=True)
         else:
             db_task.status = "failed"
         db_task.end_time = finished_time
@@ -41,7 +105,28 @@ def start_async_scrapy_task(db: Session, cmd: list) -> str:
 
     threading.Thread(target=watch, daemon=True).start()
 
-    return task_id
+
+def resume_task(db: Session, task_id: str) -> bool:
+    """
+    Continue a stopped or crashed task from its JOBDIR under the same task_id.
+    """
+    task = db.query(Task).filter(Task.task_id == task_id).first()
+    if not task or task.status not in ("terminated", "failed", "running"):
+        return False
+    if task.status == "running" and task.pid and psutil.pid_exists(task.pid):
+        return False  # Still alive; only a crashed "running" task can resume
+    if not os.path.isdir(get_job_dir(task_id)):
+        return False
+
+    task.end_time = None
+    if task.spider_args is not None:
+        task.status = "queued"
+        db.execute(text("NOTIFY crawl_jobs"))
+        db.commit()
+    else:
+        task.status = "running"
+        _spawn_scrapy_process(db, task, shlex.split(task.cmd))
+    return True
 
 
 def get_task_status(db: Session, task_id: str) -> dict:
@@ -51,7 +136,7 @@ def get_task_status(db: Session, task_id: str) -> dict:
     task = db.query(Task).filter(Task.task_id == task_id).first()
     if not task:
         return {"task_id": task_id, "status": "not_found"}
-    return {
+    status = {
         "task_id": task.task_id,
         "status": task.status,
         "cmd": task.cmd,
@@ -59,6 +144,38 @@ def get_task_status(db: Session, task_id: str) -> dict:
         "end_time": task.end_time.isoformat() if task.end_time else None,
         "pid": task.pid,
     }
+    frontier = get_frontier_status(db, task_id)
+    if frontier:
+        status["frontier"] = frontier
+        # A distributed task is done when its render workers are, not when
+        # the process that discovered the chapters exits
+        if task.status == "finished" and (frontier["pending"] or frontier["claimed"]):
+            status["status"] = "running"
+    return status
+
+
+def get_frontier_status(db: Session, task_id: str) -> dict:
+    """
+    Aggregate the chapter_frontier rows of a distributed task.
+    """
+    rows = (
+        db.query(ChapterFrontier.status, func.count())
+        .filter(ChapterFrontier.task_id == task_id)
+        .group_by(ChapterFrontier.status)
+        .all()
+    )
+    if not rows:
+        return {}
+    counts = {"pending": 0, "claimed": 0, "done": 0, "failed": 0, **dict(rows)}
+    counts["workers"] = (
+        db.query(func.count(func.distinct(ChapterFrontier.claimed_by)))
+        .filter(
+            ChapterFrontier.task_id == task_id,
+            ChapterFrontier.status == "claimed",
+        )
+        .scalar()
+    )
+    return counts
 
 
 def list_all_tasks(db: Session) -> list:
@@ -81,19 +198,52 @@ def list_all_tasks(db: Session) -> list:
 
 def stop_task(db: Session, task_id: str) -> bool:
     """
-    Stop a running task by killing its process.
+    Stop a running task. The crawl shuts down gracefully, so its JOBDIR
+    can be resumed later.
     """
 
     task = db.query(Task).filter(Task.task_id == task_id).first()
-    if not task or task.status != "running" or not task.pid:
+    if not task or task.status not in ("queued", "running"):
+        return False
+
+    if task.spider_args is not None:
+        # Worker job: the worker stops the crawl when it sees the new status
+        task.status = "terminated"
+        task.end_time = datetime.utcnow()
+        db.execute(text("NOTIFY crawl_jobs"))
+        db.commit()
+        return True
+
+    if not task.pid:
         return False
 
     try:
         p = psutil.Process(task.pid)
-        p.terminate()  # or p.kill()
+        p.terminate()  # SIGTERM: Scrapy finishes in-flight requests and saves state
         task.status = "terminated"
         task.end_time = datetime.utcnow()
         db.commit()
         return True
     except Exception:
         return False
+
+
+def list_failed_chapters(db: Session, manga_id: str = None) -> list:
+    """
+    List dead-lettered chapters, optionally for a single manga.
+    """
+    query = db.query(FailedChapter)
+    if manga_id:
+        query = query.filter(FailedChapter.manga_id == manga_id)
+    return [
+        {
+            "manga_id": f.manga_id,
+            "chapter_id": f.chapter_id,
+            "url": f.url,
+            "error_class": f.error_class,
+            "last_error": f.last_error,
+            "attempts": f.attempts,
+            "last_error_at": f.last_error_at.isoformat() if f.last_error_at else None,
+        }
+        for f in query.order_by(FailedChapter.last_error_at.desc()).all()
+    ]
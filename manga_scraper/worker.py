@@ -0,0 +1,268 @@
+# manga_scraper/worker.py
+"""
+Resident crawl worker.
+
+Runs queued tasks (``tasks.status = 'queued'``, written by the API when
+CRAWL_WORKER_ENABLED is set) as crawls inside one long-lived process, so
+the reactor, the Playwright browser and the settings are only set up
+once. Start it with::
+
+    python -m manga_scraper.worker
+"""
+import json
+import logging
+import os
+import shutil
+
+from scrapy.crawler import CrawlerRunner
+from scrapy.utils.defer import deferred_from_coro
+from scrapy.utils.log import configure_logging
+from scrapy.utils.project import get_project_settings
+from scrapy.utils.reactor import install_reactor
+from twisted.internet import defer, task, threads
+from twisted.internet.interfaces import IReadDescriptor
+from zope.interface import implementer
+
+from manga_scraper.utils.db import connect
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "crawl_jobs"
+
+CLAIM_QUERY = """
+    UPDATE tasks SET status = 'running', start_time = NOW(), pid = %s
+    WHERE task_id = (
+        SELECT task_id FROM tasks
+        WHERE status = 'queued'
+        ORDER BY start_time
+        FOR UPDATE SKIP LOCKED
+        LIMIT 1
+    )
+    RETURNING task_id, spider_args
+"""
+
+
+@implementer(IReadDescriptor)
+class _NotifyReader:
+    """Wake the worker up as soon as Postgres delivers a NOTIFY."""
+
+    def __init__(self, conn, callback):
+        self.conn = conn
+        self.callback = callback
+
+    def fileno(self):
+        return self.conn.fileno()
+
+    def doRead(self):
+        self.conn.poll()
+        if self.conn.notifies:
+            self.conn.notifies.clear()
+            self.callback()
+
+    def connectionLost(self, reason):
+        logger.warning(f"Lost the job notification connection: {reason}")
+
+    def logPrefix(self):
+        return "crawl-worker"
+
+
+class CrawlWorker:
+    """
+    Claim queued tasks and run them as crawls in this process.
+
+    Jobs are claimed with ``FOR UPDATE SKIP LOCKED`` so several workers can
+    share the queue. Up to WORKER_MAX_JOBS crawls run at once; with
+    WORKER_BROWSER_CDP_PORT set they all connect to one browser that stays
+    up between jobs. Stopping a task through the API marks it terminated,
+    which the worker picks up on its next wake-up.
+    """
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.max_jobs = settings.getint("WORKER_MAX_JOBS", 1)
+        self.poll_interval = settings.getfloat("WORKER_POLL_INTERVAL", 5)
+        self.cdp_port = settings.getint("WORKER_BROWSER_CDP_PORT")
+        self.runner = None
+        self.running = {}  # task_id -> crawler
+        self.stopping = set()
+        self.browser = None
+        self.polling = False
+        self.poll_again = False
+        # LISTEN connection, read on the reactor; queries use self.db in threads
+        self.conn = connect(settings)
+        self.conn.autocommit = True
+        with self.conn.cursor() as cur:
+            cur.execute(f"LISTEN {NOTIFY_CHANNEL}")
+        self.db = connect(settings)
+        self.db.autocommit = True
+
+    async def launch_browser(self):
+        """Start the shared Chromium the crawls connect to over CDP."""
+        from playwright.async_api import async_playwright
+
+        self.playwright = await async_playwright().start()
+        launch_options = dict(self.settings.getdict("PLAYWRIGHT_LAUNCH_OPTIONS"))
+        launch_options["args"] = [
+            *launch_options.get("args", []),
+            f"--remote-debugging-port={self.cdp_port}",
+        ]
+        self.browser = await self.playwright.chromium.launch(**launch_options)
+        self.settings.set("PLAYWRIGHT_CDP_URL", f"http://127.0.0.1:{self.cdp_port}")
+        logger.info(f"Shared browser listening on CDP port {self.cdp_port}")
+
+    async def close_browser(self):
+        if self.browser is not None:
+            await self.browser.close()
+            await self.playwright.stop()
+
+    def start(self, reactor):
+        reactor.addSystemEventTrigger(
+            "before", "shutdown", lambda: deferred_from_coro(self.close_browser())
+        )
+        if self.cdp_port:
+            d = deferred_from_coro(self.launch_browser())
+        else:
+            d = defer.succeed(None)
+        d.addCallback(lambda _: self._start_polling(reactor))
+        return d
+
+    def _start_polling(self, reactor):
+        # Crawlers are created from the settings as they are now, i.e. with
+        # PLAYWRIGHT_CDP_URL pointing at the shared browser
+        self.runner = CrawlerRunner(self.settings)
+        reactor.addReader(_NotifyReader(self.conn, self.poll))
+        self.loop = task.LoopingCall(self.poll)
+        self.loop.start(self.poll_interval)
+        logger.info(f"Crawl worker ready (max {self.max_jobs} concurrent jobs)")
+
+    def poll(self):
+        """Check for stopped and queued tasks, one check at a time."""
+        if self.polling:
+            # Woken up mid-check: look again once it is done
+            self.poll_again = True
+            return None
+        self.polling = True
+        d = self._poll()
+        d.addErrback(
+            lambda failure: logger.error(
+                f"Checking for jobs failed: {failure.getErrorMessage()}"
+            )
+        )
+        d.addBoth(self._poll_done)
+        return d
+
+    def _poll_done(self, _):
+        self.polling = False
+        if self.poll_again:
+            self.poll_again = False
+            self.poll()
+
+    @defer.inlineCallbacks
+    def _poll(self):
+        # Queries run in threads so crawls keep the reactor
+        yield self._stop_terminated()
+        while len(self.running) < self.max_jobs:
+            job = yield threads.deferToThread(self._claim)
+            if job is None:
+                return
+            self._run(*job)
+
+    def _claim(self):
+        with self.db.cursor() as cur:
+            cur.execute(CLAIM_QUERY, (os.getpid(),))
+            row = cur.fetchone()
+        if row is None:
+            return None
+        task_id, spider_args = row
+        return task_id, json.loads(spider_args or "{}")
+
+    def _run(self, task_id, spider_args):
+        logger.info(f"Starting task {task_id}: {spider_args}")
+        crawler = self.runner.create_crawler("manga_park")
+        # Per-task JOBDIR, so a stopped or crashed job resumes where it was
+        crawler.settings.set("JOBDIR", self._job_dir(task_id))
+        self.running[task_id] = crawler
+        d = self.runner.crawl(crawler, **spider_args)
+        d.addCallbacks(
+            lambda _: self._finish(task_id, crawler),
+            lambda failure: self._finish(task_id, crawler, failure),
+        )
+
+    def _job_dir(self, task_id):
+        return os.path.join(self.settings.get("TASK_JOBS_DIR"), task_id)
+
+    @defer.inlineCallbacks
+    def _stop_terminated(self):
+        if not self.running:
+            return
+        terminated = yield threads.deferToThread(
+            self._fetch_terminated, list(self.running)
+        )
+        for task_id in terminated:
+            if task_id not in self.running:
+                continue
+            if task_id not in self.stopping:
+                logger.info(f"Stopping task {task_id} on request")
+                self.stopping.add(task_id)
+                self.running[task_id].stop()
+
+    def _fetch_terminated(self, task_ids):
+        with self.db.cursor() as cur:
+            cur.execute(
+                "SELECT task_id FROM tasks WHERE status = 'terminated' "
+                "AND task_id = ANY(%s)",
+                (task_ids,),
+            )
+            return [row[0] for row in cur.fetchall()]
+
+    def _finish(self, task_id, crawler, failure=None):
+        del self.running[task_id]
+        if task_id in self.stopping:
+            self.stopping.discard(task_id)
+            status = "terminated"
+        elif failure is None and crawler.stats.get_value("finish_reason") == "finished":
+            status = "finished"
+            shutil.rmtree(self._job_dir(task_id), ignore_errors=True)
+        else:
+            status = "failed"
+            if failure is not None:
+                logger.error(f"Task {task_id} crashed: {failure.getErrorMessage()}")
+
+        d = threads.deferToThread(self._set_status, task_id, status)
+        d.addCallbacks(
+            lambda _: logger.info(f"Task {task_id} {status}"),
+            lambda failure: logger.error(
+                f"Could not mark task {task_id} {status}: "
+                f"{failure.getErrorMessage()}"
+            ),
+        )
+        # A slot is free, take the next job right away
+        d.addBoth(lambda _: self.poll())
+        return d
+
+    def _set_status(self, task_id, status):
+        with self.db.cursor() as cur:
+            cur.execute(
+                "UPDATE tasks SET status = %s, end_time = NOW() WHERE task_id = %s",
+                (status, task_id),
+            )
+
+
+def main():
+    settings = get_project_settings()
+    configure_logging(settings)
+    install_reactor(settings["TWISTED_REACTOR"])
+    from twisted.internet import reactor
+
+    worker = CrawlWorker(settings)
+
+    def start():
+        d = worker.start(reactor)
+        d.addErrback(lambda failure: (logger.error(failure), reactor.stop()))
+
+    reactor.callWhenRunning(start)
+    reactor.run()
+
+
+if __name__ == "__main__":
+    main()
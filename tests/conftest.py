@@ -0,0 +1,5 @@
+# tests/conftest.py
+from scrapy.utils.reactor import install_reactor
+
+# Same reactor as the crawler (TWISTED_REACTOR); Scrapy checks it on setup
+install_reactor("twisted.internet.asyncioreactor.AsyncioSelectorReactor")
@@ -0,0 +1,44 @@
+# tests/test_packaging.py
+import zipfile
+
+from PIL import Image
+
+from manga_scraper.utils.packaging import package_chapter, package_digest
+
+
+def images(tmp_path):
+    paths = []
+    for number, (fmt, mode) in enumerate([("JPEG", "RGB"), ("PNG", "RGBA")]):
+        path = tmp_path / f"{number}.{fmt.lower()}"
+        Image.new(mode, (100, 150), "red").save(path, format=fmt)
+        paths.append(str(path))
+    return paths
+
+
+def test_package_digest_depends_on_page_order():
+    assert package_digest(["a", "b"]) != package_digest(["b", "a"])
+
+
+def test_package_chapter_builds_cbz_and_pdf(tmp_path):
+    pages = images(tmp_path)
+    cbz, pdf = tmp_path / "out" / "1.cbz", tmp_path / "out" / "1.pdf"
+    built = package_chapter(pages, str(cbz), str(pdf), digest="abc")
+    assert built == {"cbz": True, "pdf": True}
+
+    with zipfile.ZipFile(cbz) as archive:
+        assert archive.namelist() == ["0001.jpeg", "0002.png"]
+    data = pdf.read_bytes()
+    assert data.startswith(b"%PDF-1.4")
+    assert data.count(b"/Type /Page ") == 2
+    assert data.rstrip().endswith(b"%%EOF")
+
+
+def test_package_chapter_skips_up_to_date_archives(tmp_path):
+    pages = images(tmp_path)
+    cbz, pdf = str(tmp_path / "1.cbz"), str(tmp_path / "1.pdf")
+    package_chapter(pages, cbz, pdf, digest="abc")
+    assert package_chapter(pages, cbz, pdf, digest="abc") == {
+        "cbz": False,
+        "pdf": False,
+    }
+    assert package_chapter(pages, cbz, None, digest="def") == {"cbz": True}
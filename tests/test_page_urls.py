@@ -0,0 +1,41 @@
+# tests/test_page_urls.py
+import json
+
+from scrapy.http import HtmlResponse
+
+from manga_scraper.spiders.common.chapter_page import extract_page_urls
+from manga_scraper.utils.chapter_utils import find_page_image_urls
+
+PAGE_1 = "https://s01.example.org/media/mpup/abc/001.jpg"
+PAGE_2 = "https://s01.example.org/media/mpup/abc/002.webp"
+COVER = "https://example.org/thumb/cover.jpg"
+
+
+def response(body):
+    return HtmlResponse("https://example.org/title/1/c1", body=body.encode())
+
+
+def test_find_page_image_urls_keeps_first_occurrence_order():
+    text = f'"{PAGE_2}" <img src="{COVER}"> {PAGE_1} "{PAGE_2}"'
+    assert find_page_image_urls(text) == [PAGE_2, PAGE_1]
+    assert find_page_image_urls(None) == []
+
+
+def test_extract_page_urls_prefers_rendered_image_items():
+    body = "".join(
+        f"<div data-name='image-item'><img src='{url}'></div>"
+        for url in (PAGE_1, PAGE_2)
+    )
+    assert extract_page_urls(response(body)) == [PAGE_1, PAGE_2]
+
+
+def test_extract_page_urls_reads_qwik_state():
+    state = json.dumps({"objs": [COVER, PAGE_1, 3, PAGE_2, PAGE_1]})
+    body = f"<script type='qwik/json'>{state}</script>"
+    assert extract_page_urls(response(body)) == [PAGE_1, PAGE_2]
+
+
+def test_extract_page_urls_scans_unparsable_state():
+    body = f"<script type='qwik/json'>{{broken \"{PAGE_1}\"</script>"
+    assert extract_page_urls(response(body)) == [PAGE_1]
+    assert extract_page_urls(response("<p>nothing</p>")) == []
@@ -0,0 +1,48 @@
+# tests/test_phash.py
+from PIL import Image, ImageDraw
+
+from manga_scraper.utils.phash import BandIndex, dhash, same_image
+
+
+def page(path, text="Chapter 1", shift=0, size=(400, 600), fmt="PNG", quality=95):
+    image = Image.new("L", size, 255)
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((40 + shift, 40, 360 + shift, 300), outline=0, width=6)
+    draw.text((60 + shift, 400), text, fill=0)
+    image.save(path, format=fmt, quality=quality)
+    return str(path)
+
+
+def test_dhash_is_a_signed_64_bit_int(tmp_path):
+    value = dhash(page(tmp_path / "a.png"))
+    assert -(1 << 63) <= value < (1 << 63)
+
+
+def test_reencoded_page_has_a_close_hash(tmp_path):
+    original = dhash(page(tmp_path / "a.png"))
+    reencoded = dhash(page(tmp_path / "a.jpg", fmt="JPEG", quality=60))
+    assert ((original ^ reencoded) & ((1 << 64) - 1)).bit_count() <= 3
+
+
+def test_same_image_accepts_reencode(tmp_path):
+    original = page(tmp_path / "a.png")
+    reencoded = page(tmp_path / "a.jpg", fmt="JPEG", quality=80)
+    assert same_image(original, reencoded, tolerance=4)
+
+
+def test_same_image_rejects_other_page_and_size(tmp_path):
+    original = page(tmp_path / "a.png")
+    moved = page(tmp_path / "b.png", shift=30)
+    resized = page(tmp_path / "c.png", size=(400, 601))
+    assert not same_image(original, moved, tolerance=0.5)
+    assert not same_image(original, resized, tolerance=0.5)
+
+
+def test_band_index_finds_nearest_within_distance():
+    index = BandIndex(max_distance=3)
+    index.add(0b1111, "a")
+    index.add(-1, "b")  # Negative BIGINTs come back from Postgres
+    assert len(index) == 2
+    assert index.nearest(0b1110) == (1, "a")
+    assert index.nearest(0b0000_1111_0000) is None
+    assert index.nearest((1 << 64) - 2) == (1, "b")
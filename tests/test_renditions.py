@@ -0,0 +1,38 @@
+# tests/test_renditions.py
+from PIL import Image
+
+from manga_scraper.utils.renditions import WEBP_MAX_SIDE, render_page, rendition_paths
+
+
+def test_rendition_paths_carry_settings():
+    assert rendition_paths("ab/cd/abcd.png", 80, 320) == (
+        "ab/cd/abcd-q80.webp",
+        "ab/cd/abcd-w320.webp",
+    )
+
+
+def test_render_page_writes_missing_renditions_once(tmp_path):
+    source = tmp_path / "page.png"
+    Image.new("P", (640, 960)).save(source)
+    webp, thumbnail = tmp_path / "page.webp", tmp_path / "thumb.webp"
+
+    written, _ = render_page(str(source), str(webp), str(thumbnail), 80, 320)
+    assert written == 2
+    with Image.open(webp) as image:
+        assert (image.format, image.size) == ("WEBP", (640, 960))
+    with Image.open(thumbnail) as image:
+        assert image.size == (320, 480)
+
+    written, _ = render_page(str(source), str(webp), str(thumbnail), 80, 320)
+    assert written == 0
+
+
+def test_render_page_fits_long_strips_into_webp(tmp_path):
+    source = tmp_path / "strip.png"
+    Image.new("RGB", (400, 20000), "white").save(source)
+    webp, thumbnail = tmp_path / "strip.webp", tmp_path / "thumb.webp"
+
+    render_page(str(source), str(webp), str(thumbnail), 80, 320)
+    with Image.open(webp) as image:
+        assert max(image.size) <= WEBP_MAX_SIDE
+    assert not list(tmp_path.glob("*.part"))
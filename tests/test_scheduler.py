@@ -0,0 +1,87 @@
+# tests/test_scheduler.py
+from unittest import mock
+
+import pytest
+from scrapy import Request, Spider
+from scrapy.utils.test import get_crawler
+
+from manga_scraper.scheduler import SpillingScheduler
+
+
+@pytest.fixture
+def scheduler():
+    crawler = get_crawler(
+        Spider,
+        {
+            "BACKPRESSURE_MAX_PENDING_CHAPTERS": 4,
+            "SCHEDULER_SPILL_TO_DISK": True,
+            "SCHEDULER_DISK_QUEUE": "scrapy.squeues.PickleFifoDiskQueue",
+            "SCHEDULER_MEMORY_QUEUE": "scrapy.squeues.FifoMemoryQueue",
+        },
+    )
+    crawler.spider = crawler._create_spider("test")
+    crawler.engine = mock.Mock()
+    crawler.engine.downloader.active = set()
+    scheduler = SpillingScheduler.from_crawler(crawler)
+    scheduler.open(crawler.spider)
+    yield scheduler
+    scheduler.close("finished")
+
+
+def chapter(number, priority=20):
+    return Request(
+        f"https://example.org/c{number}",
+        meta={"chapter_id": str(number)},
+        priority=priority,
+    )
+
+
+def test_spills_to_a_temp_dir(scheduler):
+    assert scheduler.tmpdir is not None
+    assert scheduler.dqs is not None
+
+
+def test_counts_queued_and_downloading_chapters(scheduler):
+    active = scheduler.crawler.engine.downloader.active
+    for number in range(3):
+        scheduler.enqueue_request(chapter(number))
+    scheduler.enqueue_request(Request("https://example.org/manga", priority=10))
+    assert scheduler.pending_chapters == 3
+
+    request = scheduler.next_request()
+    active.add(request)
+    assert scheduler.queued_chapters == 2
+    assert scheduler.pending_chapters == 3
+
+    # Done however it finished, e.g. ignored by a downloader middleware
+    active.discard(request)
+    assert scheduler.pending_chapters == 2
+
+
+def test_holds_back_other_requests_until_half_are_done(scheduler):
+    active = scheduler.crawler.engine.downloader.active
+    scheduler.enqueue_request(Request("https://example.org/manga", priority=10))
+    for number in range(6):
+        scheduler.enqueue_request(chapter(number))
+    assert scheduler.throttled
+
+    handed_out = []
+    while (request := scheduler.next_request()) is not None:
+        handed_out.append(request)
+        active.add(request)
+    assert all("chapter_id" in r.meta for r in handed_out)
+    assert len(handed_out) == 6
+    assert scheduler.stats.get_value("backpressure/held_back")
+
+    for request in handed_out[:4]:
+        active.discard(request)
+    assert scheduler.next_request().url == "https://example.org/manga"
+    assert not scheduler.throttled
+
+
+def test_higher_priority_chapters_go_first(scheduler):
+    scheduler.enqueue_request(chapter(1, priority=20))
+    scheduler.enqueue_request(chapter(2, priority=21))
+    scheduler.enqueue_request(chapter(3, priority=21))
+    order = [scheduler.next_request().meta["chapter_id"] for _ in range(3)]
+    assert order == ["2", "3", "1"]